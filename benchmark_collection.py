@@ -0,0 +1,886 @@
+#!/usr/bin/env python3
+"""
+Benchmark the application data collector off a Mac.
+
+Generates synthetic .app bundles and stub `codesign`, `plutil` and `sips`
+executables that sleep for a configurable delay before producing plausible
+output. The stubs are put first on PATH so the collector runs unmodified,
+which makes it possible to measure how process-spawn latency scales with
+the number of worker threads. STUB_TOOL_HANG and STUB_TOOL_CRASH (comma
+separated tool names) make the named stubs hang or abort instead.
+
+Each synthetic app also gets a signed Mach-O main executable (see
+build_signed_macho) and an .icns icon with embedded PNGs (see build_icns),
+so the native signature and icon readers are exercised as well.
+
+Usage: python3 benchmark_collection.py --apps 100 --delay 0.05 --jobs 1 4 8
+       python3 benchmark_collection.py --scan-files 20000
+       python3 benchmark_collection.py --codesign 200
+       python3 benchmark_collection.py --catalog data
+       python3 benchmark_collection.py --search-index data
+       python3 benchmark_collection.py --suite --apps 50 --frameworks 4 --compare old_results.json
+       python3 benchmark_collection.py --pipeline 2000 --delay 0.01 --jobs 8
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import platform
+import plistlib
+import shutil
+import statistics
+import struct
+import subprocess
+import sys
+import gzip
+import tempfile
+import time
+import tracemalloc
+import zlib
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import catalog
+import collect_macos_app_data as collector
+import macho_signature
+import search_index
+from generate_webapp_data import build_apps_bundle, generate_data_index
+from pipeline import format_pipeline_summary
+from run_profile import RunProfile
+from sdef_store import is_app_directory, list_app_sdefs
+
+STUB_HEADER = f"""#!{sys.executable}
+import os, sys, time
+time.sleep(float(os.environ.get("STUB_TOOL_DELAY", "0")))
+args = sys.argv[1:]
+name = os.path.basename(sys.argv[0])
+if name in os.environ.get("STUB_TOOL_HANG", "").split(","):
+    time.sleep(3600)
+if name in os.environ.get("STUB_TOOL_CRASH", "").split(","):
+    os.abort()
+"""
+
+STUB_TOOLS = {
+    "codesign": STUB_HEADER + """
+target = os.path.basename(args[-1])
+if "--verify" in args:
+    sys.exit(0)
+sys.stderr.write(
+    f"Executable={args[-1]}\\n"
+    f"Identifier=com.example.{target}\\n"
+    "Format=app bundle with Mach-O thin (arm64)\\n"
+    "Sealed Resources version=2 rules=13 files=10\\n"
+    "TeamIdentifier=EXAMPLE123\\n"
+)
+if "--entitlements" in args:
+    sys.stdout.write(
+        '<?xml version="1.0" encoding="UTF-8"?>\\n'
+        '<plist version="1.0"><dict>'
+        '<key>com.apple.security.app-sandbox</key><true/>'
+        '</dict></plist>\\n'
+    )
+""",
+    "plutil": STUB_HEADER + """
+with open(args[-1]) as f:
+    sys.stdout.write(f.read())
+""",
+    "sips": STUB_HEADER + """
+import shutil
+shutil.copyfile(args[3], args[args.index("--out") + 1])
+""",
+}
+
+def install_stub_tools(bin_dir: Path) -> None:
+    """
+    Write stub macOS tools into bin_dir and put it first on PATH.
+
+    Args:
+        bin_dir: Directory to create the stub executables in
+    """
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    for name, source in STUB_TOOLS.items():
+        tool_path = bin_dir / name
+        tool_path.write_text(source)
+        tool_path.chmod(0o755)
+    os.environ["PATH"] = f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}"
+
+def build_png(width: int, height: int, seed: int = 0) -> bytes:
+    """Encode a small RGBA PNG filled with a seed-dependent colour."""
+    def chunk(chunk_type: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + chunk_type + data + struct.pack('>I', zlib.crc32(chunk_type + data))
+
+    row = b'\0' + bytes([seed % 256, width % 256, height % 256, 255]) * width
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(row * height))
+            + chunk(b'IEND', b''))
+
+def build_icns(chunks) -> bytes:
+    """
+    Assemble an .icns file.
+
+    Args:
+        chunks: (OSType, payload bytes) pairs, e.g. (b'ic07', build_png(128, 128))
+    """
+    body = b''.join(chunk_type + struct.pack('>I', 8 + len(data)) + data for chunk_type, data in chunks)
+    return b'icns' + struct.pack('>I', 8 + len(body)) + body
+
+def der(tag: int, content: bytes) -> bytes:
+    """Encode one definite-length DER element."""
+    if len(content) < 0x80:
+        length = bytes([len(content)])
+    else:
+        length_bytes = len(content).to_bytes((len(content).bit_length() + 7) // 8, 'big')
+        length = bytes([0x80 | len(length_bytes)]) + length_bytes
+    return bytes([tag]) + length + content
+
+def der_name(common_name: str) -> bytes:
+    """Encode an X.501 Name holding only a commonName."""
+    attribute = der(0x30, der(0x06, macho_signature.OID_COMMON_NAME) + der(0x0C, common_name.encode()))
+    return der(0x30, der(0x31, attribute))
+
+def build_cms_signature(authorities: List[str]) -> bytes:
+    """
+    Build a CMS SignedData blob whose certificates form the given chain.
+
+    Like Apple's signatures, the outer layers use indefinite lengths. The
+    certificates are stored root first to exercise chain ordering.
+
+    Args:
+        authorities: Common names, leaf first and root last
+    """
+    sha256_rsa = der(0x30, der(0x06, bytes.fromhex('2a864886f70d01010b')) + b'\x05\x00')
+    validity = der(0x30, der(0x17, b'250101000000Z') + der(0x17, b'350101000000Z'))
+    public_key = der(0x30, der(0x30, der(0x06, bytes.fromhex('2a864886f70d010101'))) + der(0x03, b'\x00'))
+
+    certificates = []
+    for index, name in enumerate(authorities):
+        issuer = authorities[min(index + 1, len(authorities) - 1)]
+        tbs = der(0x30, der(0xA0, der(0x02, b'\x02')) + der(0x02, bytes([index + 1])) + sha256_rsa
+                  + der_name(issuer) + validity + der_name(name) + public_key)
+        certificates.append(der(0x30, tbs + sha256_rsa + der(0x03, b'\x00')))
+
+    leaf_issuer = authorities[1] if len(authorities) > 1 else authorities[0]
+    signer_info = der(0x30, der(0x02, b'\x01') + der(0x30, der_name(leaf_issuer) + der(0x02, b'\x01'))
+                      + der(0x30, der(0x06, bytes.fromhex('608648016503040201'))) + sha256_rsa + der(0x04, b''))
+    signed_data = (b'\x30\x80' + der(0x02, b'\x01') + der(0x31, b'')
+                   + der(0x30, der(0x06, bytes.fromhex('2a864886f70d010701')))
+                   + der(0xA0, b''.join(reversed(certificates))) + der(0x31, signer_info) + b'\x00\x00')
+    return (b'\x30\x80' + der(0x06, bytes.fromhex('2a864886f70d010702'))
+            + b'\xa0\x80' + signed_data + b'\x00\x00' + b'\x00\x00')
+
+def build_code_directory(code: bytes, identifier: str, team_identifier: Optional[str],
+                         special_hashes: dict, hash_type: int = 2, flags: int = 0) -> bytes:
+    """Build a version 0x20400 CodeDirectory over code with 4 KiB pages."""
+    algorithm, hash_size = macho_signature.HASH_TYPES[hash_type]
+    page_size = 4096
+    n_special_slots = max(special_hashes, default=0)
+    code_hashes = [hashlib.new(algorithm, code[i:i + page_size]).digest()[:hash_size]
+                   for i in range(0, len(code), page_size)]
+
+    header_size = 88
+    ident_offset = header_size
+    strings = identifier.encode() + b'\0'
+    team_offset = 0
+    if team_identifier:
+        team_offset = header_size + len(strings)
+        strings += team_identifier.encode() + b'\0'
+    special = b''.join(special_hashes.get(slot, b'\0' * hash_size) for slot in range(n_special_slots, 0, -1))
+    hash_offset = header_size + len(strings) + len(special)
+    length = hash_offset + hash_size * len(code_hashes)
+
+    header = struct.pack('>IIIIIIIIIBBBBIIIIQQQQ', macho_signature.CSMAGIC_CODEDIRECTORY, length, 0x20400,
+                         flags, hash_offset, ident_offset, n_special_slots, len(code_hashes), len(code),
+                         hash_size, hash_type, 0, 12, 0, 0, team_offset, 0, 0, 0, 0, 0)
+    return header + strings + special + b''.join(code_hashes)
+
+def build_signed_macho(identifier: str, team_identifier: Optional[str] = None,
+                       entitlements: Optional[bytes] = None, authorities: Iterable[str] = (),
+                       sealed_resources: bool = True, signed: bool = True,
+                       cpu_type: int = macho_signature.CPU_TYPE_ARM64) -> bytes:
+    """
+    Build a thin 64-bit Mach-O executable with an embedded code signature.
+
+    The signature has a SHA-1 primary and a SHA-256 alternate CodeDirectory
+    with real page hashes, an optional entitlements blob and a CMS blob with
+    the given certificate chain (empty, i.e. ad-hoc, if there is none).
+
+    Returns:
+        The executable's bytes
+    """
+    authorities = list(authorities)
+    load_commands = struct.pack('<II16s', 0x1B, 24, hashlib.md5(identifier.encode()).digest())  # LC_UUID
+    if signed:
+        load_commands += struct.pack('<IIII', macho_signature.LC_CODE_SIGNATURE, 16, 0, 0)
+    ncmds = 2 if signed else 1
+    header = struct.pack('<IiiIIIII', macho_signature.MH_MAGIC_64, cpu_type, 0, 2, ncmds, len(load_commands), 0, 0)
+    code = bytearray((header + load_commands).ljust(8192, b'\0'))
+    if not signed:
+        return bytes(code)
+
+    special_hashes = {}
+    blobs = []
+    if sealed_resources:
+        special_hashes[macho_signature.RESOURCE_DIR_SPECIAL_SLOT] = b'resources'
+    if entitlements is not None:
+        entitlements_blob = struct.pack('>II', macho_signature.CSMAGIC_EMBEDDED_ENTITLEMENTS,
+                                        8 + len(entitlements)) + entitlements
+        special_hashes[macho_signature.CSSLOT_ENTITLEMENTS] = entitlements_blob
+        blobs.append((macho_signature.CSSLOT_ENTITLEMENTS, entitlements_blob))
+    flags = 0 if authorities else macho_signature.CS_ADHOC
+
+    # The first page covers LC_CODE_SIGNATURE itself, so hash a second time once
+    # its size is known (the size does not depend on the hash values)
+    for _ in range(2):
+        code_directories = []
+        for slot, hash_type in [(macho_signature.CSSLOT_CODEDIRECTORY, 1), (0x1000, 2)]:
+            algorithm, hash_size = macho_signature.HASH_TYPES[hash_type]
+            hashes = {s: hashlib.new(algorithm, data).digest()[:hash_size] for s, data in special_hashes.items()}
+            code_directories.append((slot, build_code_directory(bytes(code), identifier, team_identifier,
+                                                                hashes, hash_type, flags)))
+        cms = build_cms_signature(authorities) if authorities else b''
+        all_blobs = sorted(code_directories + blobs) + [
+            (macho_signature.CSSLOT_SIGNATURESLOT, struct.pack('>II', macho_signature.CSMAGIC_BLOBWRAPPER, 8 + len(cms)) + cms)
+        ]
+        index = b''
+        payload = b''
+        offset = 12 + 8 * len(all_blobs)
+        for slot, blob in all_blobs:
+            index += struct.pack('>II', slot, offset + len(payload))
+            payload += blob
+        superblob = struct.pack('>III', macho_signature.CSMAGIC_EMBEDDED_SIGNATURE,
+                                offset + len(payload), len(all_blobs)) + index + payload
+        struct.pack_into('<II', code, 32 + 24 + 8, len(code), len(superblob))
+    return bytes(code) + superblob
+
+def build_fat_macho(slices: Iterable[bytes]) -> bytes:
+    """Combine thin Mach-O executables into a fat binary with 16 KiB aligned slices."""
+    slices = list(slices)
+    alignment = 1 << 14
+    header = struct.pack('>II', macho_signature.FAT_MAGIC, len(slices))
+    body = b''
+    offset = alignment
+    for data in slices:
+        cpu_type = struct.unpack_from('<i', data, 4)[0]
+        header += struct.pack('>iiIII', cpu_type, 0, offset, len(data), 14)
+        padded = data.ljust((len(data) + alignment - 1) // alignment * alignment, b'\0')
+        body += padded
+        offset += len(padded)
+    return header.ljust(alignment, b'\0') + body
+
+def create_synthetic_app(root: Path, name: str, frameworks: int = 0) -> Path:
+    """
+    Create a minimal .app bundle with an XML Info.plist, a signed executable,
+    an icon and one SDEF.
+
+    Args:
+        root: Directory to create the bundle in
+        name: Bundle name without the .app extension
+        frameworks: Number of nested frameworks to add (every other one ships an SDEF)
+
+    Returns:
+        Path to the created bundle
+    """
+    app_path = root / f"{name}.app"
+    contents = app_path / "Contents"
+    resources = contents / "Resources"
+    resources.mkdir(parents=True, exist_ok=True)
+
+    info = {
+        "CFBundleIdentifier": f"com.example.{name}",
+        "CFBundleName": name,
+        "CFBundleVersion": "1.0",
+        "CFBundleExecutable": name,
+        "CFBundleIconFile": name,
+    }
+    with open(contents / "Info.plist", 'wb') as f:
+        plistlib.dump(info, f)
+
+    (contents / "MacOS").mkdir(exist_ok=True)
+    (contents / "MacOS" / name).write_bytes(build_signed_macho(
+        f"com.example.{name}", team_identifier="EXAMPLE123",
+        entitlements=plistlib.dumps({"com.apple.security.app-sandbox": True}),
+        authorities=[f"Developer ID Application: Example ({name})", "Developer ID Certification Authority",
+                     "Apple Root CA"],
+    ))
+    (resources / f"{name}.icns").write_bytes(build_icns([
+        (b'ic07', build_png(128, 128, zlib.crc32(name.encode()))),
+        (b'ic08', build_png(256, 256, zlib.crc32(name.encode()))),
+    ]))
+    (resources / f"{name}.sdef").write_text(
+        f'<?xml version="1.0"?>\n<dictionary title="{name}"><suite name="{name} Suite" code="ex{len(name):02d}"/></dictionary>\n'
+    )
+    for framework_index in range(frameworks):
+        framework_name = f"{name}Kit{framework_index}"
+        version_dir = contents / "Frameworks" / f"{framework_name}.framework" / "Versions" / "A"
+        (version_dir / "Resources").mkdir(parents=True)
+        with open(version_dir / "Resources" / "Info.plist", 'wb') as f:
+            plistlib.dump({"CFBundleIdentifier": f"com.example.{name}.kit{framework_index}",
+                           "CFBundleExecutable": framework_name}, f)
+        (version_dir / framework_name).write_bytes(b'\0' * 4096)
+        if framework_index % 2 == 0:
+            (version_dir / "Resources" / f"{framework_name}.sdef").write_text(
+                f'<?xml version="1.0"?>\n<dictionary title="{framework_name}"/>\n'
+            )
+    return app_path
+
+def create_large_bundle(root: Path, file_count: int) -> Path:
+    """
+    Create a bundle shaped like a large IDE: many nested frameworks with
+    headers, localizations and signature folders, plus a few SDEFs and icons.
+
+    Args:
+        root: Directory to create the bundle in
+        file_count: Approximate number of files to generate
+
+    Returns:
+        Path to the created bundle
+    """
+    app_path = create_synthetic_app(root, "Large")
+    contents = app_path / "Contents"
+    (contents / "_CodeSignature").mkdir()
+    (contents / "_CodeSignature" / "CodeResources").write_text("<plist/>")
+
+    files_per_framework = 500
+    for framework_index in range(max(1, file_count // files_per_framework)):
+        version_dir = contents / "Frameworks" / f"Kit{framework_index:03d}.framework" / "Versions" / "A"
+        headers = version_dir / "Headers"
+        resources = version_dir / "Resources"
+        headers.mkdir(parents=True)
+        for i in range(300):
+            (headers / f"Header{i}.h").write_text("")
+        for lang in range(10):
+            lproj = resources / f"lang{lang}.lproj"
+            lproj.mkdir(parents=True)
+            for i in range(15):
+                (lproj / f"Strings{i}.strings").write_text("")
+        for i in range(48):
+            (resources / f"asset{i}.dat").write_text("")
+        (version_dir / "_CodeSignature").mkdir()
+        (version_dir / "_CodeSignature" / "CodeResources").write_text("<plist/>")
+        if framework_index % 10 == 0:
+            (resources / f"Kit{framework_index:03d}.sdef").write_text("<dictionary/>")
+    return app_path
+
+def run_scan_benchmark(file_count: int, repeat: int = 5) -> int:
+    """
+    Compare the legacy rglob/glob passes against a single scan_bundle() walk.
+
+    Returns:
+        Process exit code (non-zero if the two found different SDEF files)
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        app_path = create_large_bundle(Path(tmp), file_count)
+        total_files = sum(1 for p in app_path.rglob("*") if p.is_file())
+        print(f"🔧 Synthetic bundle with {total_files} files")
+
+        def legacy():
+            sdefs = sorted(p for p in app_path.rglob("*.sdef") if p.is_file())
+            icons = list((app_path / "Contents" / "Resources").glob("*.icns"))
+            return sdefs, icons
+
+        def scanned():
+            scan = collector.scan_bundle(app_path)
+            return scan['sdef_files'], scan['icon_files']
+
+        timings = {}
+        outputs = {}
+        for label, func in [("rglob + glob", legacy), ("scan_bundle", scanned)]:
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                outputs[label] = func()
+                best = min(best, time.perf_counter() - start)
+            timings[label] = best
+            print(f"  {label:<14} {best * 1000:8.1f} ms (best of {repeat})")
+
+        print(f"  speedup        {timings['rglob + glob'] / timings['scan_bundle']:8.1f}x")
+        return 0 if outputs["rglob + glob"][0] == outputs["scan_bundle"][0] else 1
+
+def run_codesign_benchmark(binary_count: int, repeat: int = 3) -> int:
+    """
+    Compare the native signature reader against `codesign -dv --entitlements :-`.
+
+    Off a Mac the codesign stub is timed instead, which only measures
+    process-spawn overhead and is therefore a lower bound for the real tool.
+
+    Returns:
+        Process exit code (non-zero if the native reader failed on a fixture)
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        if not shutil.which("codesign"):
+            install_stub_tools(tmp_dir / "bin")
+            os.environ["STUB_TOOL_DELAY"] = "0"
+            print("⚠️ codesign not found, timing the stub tool instead")
+
+        apps_root = tmp_dir / "Applications"
+        bundles = [collector.BundleContext(create_synthetic_app(apps_root, f"App{i:04d}"))
+                   for i in range(binary_count)]
+        print(f"🔧 {binary_count} signed synthetic executables")
+
+        def native():
+            return [macho_signature.read_code_signature(bundle.executable_path) for bundle in bundles]
+
+        def subprocess_path():
+            return [collector.run_tool(['codesign', '-dv', '--entitlements', ':-', str(bundle.app_path)])
+                    for bundle in bundles]
+
+        timings = {}
+        for label, func in [("native", native), ("codesign", subprocess_path)]:
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                results = func()
+                best = min(best, time.perf_counter() - start)
+            timings[label] = best
+            print(f"  {label:<9} {best * 1000 / binary_count:8.3f} ms per app (best of {repeat})")
+            if label == "native" and not all(result and result['authorities'] for result in results):
+                return 1
+
+        print(f"  speedup   {timings['codesign'] / timings['native']:8.1f}x")
+        return 0
+
+def run_catalog_benchmark(data_dir: Path, repeat: int = 5) -> int:
+    """
+    Compare catalog queries against answering the same questions by scanning data_dir.
+
+    Returns:
+        Process exit code (non-zero if a query and its scan disagreed)
+    """
+    queries = [
+        ("entitlement", "com.apple.security.cs.disable-library-validation"),
+        ("team", "Unknown"),
+        ("command", "open location"),
+    ]
+
+    def scan(kind: str, value: str) -> List[str]:
+        matches = []
+        for app_dir in sorted(data_dir.iterdir()):
+            if not is_app_directory(app_dir):
+                continue
+            if kind == "entitlement":
+                try:
+                    found = value in collector.load_plist_string((app_dir / "entitlements.plist").read_text())
+                except (OSError, ValueError):
+                    found = False
+            elif kind == "team":
+                try:
+                    manifest = json.loads((app_dir / "manifest.json").read_text())
+                except (OSError, ValueError):
+                    continue
+                found = (manifest.get("codesign") or {}).get("team_identifier") == value
+            else:
+                found = any(command['name'] and command['name'].lower() == value.lower()
+                            for sdef_path in list_app_sdefs(app_dir).values()
+                            for suite in catalog.parse_sdef_suites(sdef_path)
+                            for command in suite['commands'])
+            if found:
+                matches.append(app_dir.name)
+        return matches
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "catalog.sqlite"
+        start = time.perf_counter()
+        app_count = catalog.build_catalog(data_dir, db_path)
+        print(f"🔧 Catalogued {app_count} apps in {time.perf_counter() - start:.2f}s "
+              f"({db_path.stat().st_size:,} bytes)")
+
+        connection = catalog.connect(db_path)
+        lookups = {
+            "entitlement": catalog.apps_with_entitlement,
+            "team": catalog.apps_by_team,
+            "command": catalog.apps_with_command,
+        }
+        exit_code = 0
+        for kind, value in queries:
+            timings = {}
+            results = {}
+            for label, func in [("catalog", lambda: sorted({row['name'] for row in lookups[kind](connection, value)})),
+                                ("scan", lambda: scan(kind, value))]:
+                best = float("inf")
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    results[label] = func()
+                    best = min(best, time.perf_counter() - start)
+                timings[label] = best
+            agree = results["catalog"] == results["scan"]
+            if not agree:
+                exit_code = 1
+            print(f"  {kind:<12} {len(results['catalog']):4d} apps  catalog {timings['catalog'] * 1000:8.2f} ms  "
+                  f"scan {timings['scan'] * 1000:8.1f} ms  {timings['scan'] / timings['catalog']:7.0f}x  "
+                  f"{'same results' if agree else 'RESULTS DIFFER'}")
+        connection.close()
+        return exit_code
+
+def run_search_index_benchmark(data_dir: Path, repeat: int = 5) -> int:
+    """
+    Measure the webapp search index: build time, size and time to first search.
+
+    Every query's results are checked against the catalog so an index
+    lookup never misses an app that has the entitlement, team or command.
+
+    Returns:
+        Process exit code (non-zero if the index missed an app)
+    """
+    queries = [
+        ("entitlement", "com.apple.security.cs.disable-library-validation", catalog.apps_with_entitlement),
+        ("team", "ABCDE12345", catalog.apps_by_team),
+        ("command", "open location", catalog.apps_with_command),
+        ("name", "xcode", None),
+    ]
+
+    apps = build_apps_bundle(sorted(d for d in data_dir.iterdir() if is_app_directory(d)))
+    start = time.perf_counter()
+    index = search_index.build_search_index(apps, data_dir)
+    build_time = time.perf_counter() - start
+
+    content = json.dumps(index, separators=(',', ':')).encode('utf-8')
+    bundle_size = len(json.dumps({"apps": apps}, separators=(',', ':')).encode('utf-8'))
+    counts = search_index.index_stats(index)
+    print(f"🔎 Indexed {counts['apps']} apps ({counts['terms']:,} terms, {counts['postings']:,} postings) "
+          f"in {build_time:.2f}s")
+    print(f"   index {len(content):,} bytes ({len(gzip.compress(content)):,} gzipped), "
+          f"apps bundle {bundle_size:,} bytes")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "catalog.sqlite"
+        catalog.build_catalog(data_dir, db_path)
+        connection = catalog.connect(db_path)
+
+        exit_code = 0
+        for kind, value, lookup in queries:
+            best_parse = best_search = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                loaded = json.loads(content)
+                parsed = time.perf_counter()
+                results = search_index.search_apps(loaded, value)
+                best_parse = min(best_parse, parsed - start)
+                best_search = min(best_search, time.perf_counter() - parsed)
+
+            status = ""
+            if lookup is not None:
+                missed = {row['name'] for row in lookup(connection, value)} - set(results)
+                if missed:
+                    exit_code = 1
+                status = f"missed {len(missed)}" if missed else "none missed"
+            print(f"  {kind:<12} {len(results):4d} apps  parse {best_parse * 1000:6.2f} ms  "
+                  f"first search {best_search * 1000:6.2f} ms  {status}")
+        connection.close()
+        return exit_code
+
+def hash_tree(directory: Path) -> str:
+    """Hash every file under a directory (relative path + content)."""
+    digest = hashlib.sha256()
+    for file_path in sorted(p for p in directory.rglob("*") if p.is_file()):
+        digest.update(str(file_path.relative_to(directory)).encode())
+        digest.update(file_path.read_bytes())
+    return digest.hexdigest()
+
+def run_benchmark(app_count: int, delay: float, job_counts) -> int:
+    """
+    Time collect_applications() for each worker count on the same bundles.
+
+    Returns:
+        Process exit code (non-zero if outputs differed between runs)
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        install_stub_tools(tmp_dir / "bin")
+        os.environ["STUB_TOOL_DELAY"] = str(delay)
+
+        apps_root = tmp_dir / "Applications"
+        app_bundles = {create_synthetic_app(apps_root, f"App{i:04d}") for i in range(app_count)}
+
+        print(f"🔧 {app_count} synthetic apps, {delay:.3f}s per tool call")
+
+        baseline_hash = None
+        exit_code = 0
+        for jobs in job_counts:
+            data_dir = tmp_dir / f"data-j{jobs}"
+            data_dir.mkdir()
+
+            start = time.perf_counter()
+            results = collector.collect_applications(app_bundles, data_dir, jobs=jobs)
+            elapsed = time.perf_counter() - start
+
+            succeeded = sum(1 for result in results if result['status'] != collector.STATUS_FAILED)
+            tree_hash = hash_tree(data_dir)
+            if baseline_hash is None:
+                baseline_hash = tree_hash
+            identical = tree_hash == baseline_hash
+            if not identical:
+                exit_code = 1
+
+            print(f"  jobs={jobs:<3} {elapsed:8.2f}s  {app_count / elapsed:7.1f} apps/s  "
+                  f"ok={succeeded}/{app_count}  output {'identical' if identical else 'DIFFERS'}")
+
+        # A second run over unchanged bundles should only pay for fingerprinting
+        start = time.perf_counter()
+        results = collector.collect_applications(app_bundles, data_dir, jobs=job_counts[-1])
+        elapsed = time.perf_counter() - start
+        skipped = sum(1 for result in results if result['status'] == collector.STATUS_SKIPPED)
+        print(f"  rerun    {elapsed:8.2f}s  skipped {skipped}/{app_count} unchanged apps")
+
+        return exit_code
+
+def run_pipeline_benchmark(app_count: int, delay: float, jobs: int, queue_size: int = 32) -> int:
+    """
+    Compare batch collection (discover everything, then process) with the
+    streaming pipeline on a synthetic tree, including peak traced memory.
+
+    Returns:
+        Process exit code (non-zero if the two data directories differ)
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        install_stub_tools(tmp_dir / "bin")
+        os.environ["STUB_TOOL_DELAY"] = str(delay)
+        apps_root = tmp_dir / "Applications"
+        create_synthetic_tree(apps_root, app_count)
+        print(f"🔧 {app_count} synthetic apps, {delay:.3f}s per tool call, {jobs} extract workers, "
+              f"queues of {queue_size}")
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        bundles = collector.find_all_applications([str(apps_root)])
+        discovered = time.perf_counter() - start
+        (tmp_dir / "batch").mkdir()
+        collector.collect_applications(bundles, tmp_dir / "batch", jobs=jobs)
+        batch_seconds = time.perf_counter() - start
+        batch_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del bundles
+
+        tracemalloc.start()
+        (tmp_dir / "streamed").mkdir()
+        _, summary = collector.collect_applications_pipelined(
+            collector.iter_applications([str(apps_root)]), tmp_dir / "streamed",
+            stage_workers={'extract': jobs}, queue_size=queue_size,
+        )
+        streamed_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        print(f"  batch      {batch_seconds:8.2f}s  processing starts after {discovered:6.2f}s  "
+              f"peak {batch_peak / 2**20:6.1f} MiB")
+        print(f"  pipelined  {summary['wall_time']:8.2f}s  first app written after {summary['first_output']:6.2f}s  "
+              f"peak {streamed_peak / 2**20:6.1f} MiB")
+        for line in format_pipeline_summary(summary):
+            print(f"    {line}")
+
+        identical = hash_tree(tmp_dir / "batch") == hash_tree(tmp_dir / "streamed")
+        print(f"  output {'identical' if identical else 'DIFFERS'}")
+        return 0 if identical else 1
+
+def create_synthetic_tree(root: Path, app_count: int, frameworks: int = 0) -> List[Path]:
+    """
+    Spread synthetic apps over an Applications-like tree: most at the top
+    level, every fifth in Utilities/ and every tenth in a vendor folder.
+
+    Returns:
+        Paths to the created bundles
+    """
+    bundles = []
+    for i in range(app_count):
+        parent = root / "Utilities" if i % 5 == 4 else root / "Vendor" if i % 10 == 9 else root
+        bundles.append(create_synthetic_app(parent, f"App{i:04d}", frameworks=frameworks))
+    return bundles
+
+def git_revision() -> Optional[str]:
+    """Short hash of the checked-out commit, if this is a git checkout."""
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=Path(__file__).parent,
+                                capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
+
+def time_best(func, repeat: int):
+    """Run func repeat times and return (best seconds, last result)."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def run_suite(app_count: int, frameworks: int, delay: float, repeat: int = 3) -> Dict:
+    """
+    Time find_all_applications(), process_application() and
+    generate_data_index() on a synthetic tree, each stage best of `repeat`.
+
+    process_application() runs sequentially so per-app latencies are not
+    skewed by thread scheduling; use the default benchmark for --jobs scaling.
+
+    Returns:
+        JSON-serializable results (see README "Benchmarking")
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        install_stub_tools(tmp_dir / "bin")
+        os.environ["STUB_TOOL_DELAY"] = str(delay)
+        apps_root = tmp_dir / "Applications"
+        create_synthetic_tree(apps_root, app_count, frameworks)
+
+        find_seconds, bundles = time_best(lambda: collector.find_all_applications([str(apps_root)]), repeat)
+        bundles = sorted(bundles)
+
+        best_process = None
+        for attempt in range(repeat):
+            data_dir = tmp_dir / f"data-{attempt}"
+            data_dir.mkdir()
+            profile = RunProfile()
+            collector.RUN_PROFILE = profile
+            spawns_before = Counter(collector.TOOL_SPAWN_COUNTS)
+            icons = collector.IconPipeline()
+            per_app = []
+            for bundle in bundles:
+                start = time.perf_counter()
+                collector.process_application(bundle, data_dir, icons=icons)
+                per_app.append(time.perf_counter() - start)
+            if best_process is None or sum(per_app) < sum(best_process[0]):
+                spawns = Counter(collector.TOOL_SPAWN_COUNTS) - spawns_before
+                best_process = (per_app, profile.to_dict(top=0), spawns, data_dir)
+        collector.RUN_PROFILE = RunProfile()
+        per_app, profile_summary, spawns, data_dir = best_process
+
+        webapp_dirs = iter(tmp_dir / f"webapp-{attempt}" for attempt in range(repeat))
+        with contextlib.redirect_stdout(io.StringIO()):
+            index_seconds, index_stats = time_best(lambda: generate_data_index(data_dir, next(webapp_dirs)), repeat)
+
+        quantiles = statistics.quantiles(per_app, n=20) if len(per_app) > 1 else per_app * 19
+        process_seconds = sum(per_app)
+        return {
+            'benchmark': 'suite',
+            'generated': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'parameters': {'apps': app_count, 'frameworks': frameworks, 'delay': delay, 'repeat': repeat},
+            'results': {
+                'find_all_applications': {'seconds': round(find_seconds, 6), 'apps_found': len(bundles)},
+                'process_application': {
+                    'seconds': round(process_seconds, 6),
+                    'mean_seconds': round(process_seconds / max(1, len(per_app)), 6),
+                    'p50_seconds': round(statistics.median(per_app), 6) if per_app else 0.0,
+                    'p95_seconds': round(quantiles[18], 6) if per_app else 0.0,
+                    'stages': profile_summary['stages'],
+                    'tool_spawns': dict(sorted(spawns.items())),
+                    'bytes_written': profile_summary['bytes_written'],
+                },
+                'generate_data_index': {
+                    'seconds': round(index_seconds, 6),
+                    'files_copied': index_stats['files_copied'] if index_stats else 0,
+                },
+                'total_seconds': round(find_seconds + process_seconds + index_seconds, 6),
+            },
+        }
+
+def compare_results(baseline: Dict, current: Dict, threshold: float) -> List[str]:
+    """
+    Compare the timed stages of two suite results.
+
+    Args:
+        baseline: Earlier run_suite() results
+        current: Latest run_suite() results
+        threshold: Allowed slowdown as a fraction (0.1 = 10% slower)
+
+    Returns:
+        Names of the stages that regressed beyond the threshold
+    """
+    regressions = []
+    if baseline.get('parameters') != current.get('parameters'):
+        print(f"⚠️ Parameters differ from the baseline: {baseline.get('parameters')}")
+    print(f"📊 Compared with {baseline.get('git_revision') or 'baseline'} ({baseline.get('generated')})")
+    for stage in ('find_all_applications', 'process_application', 'generate_data_index'):
+        before = baseline['results'][stage]['seconds']
+        after = current['results'][stage]['seconds']
+        ratio = after / before if before else float("inf")
+        regressed = ratio > 1 + threshold
+        if regressed:
+            regressions.append(stage)
+        print(f"  {stage:<22} {before:8.3f}s -> {after:8.3f}s  {ratio:5.2f}x{'  ⚠️ regression' if regressed else ''}")
+    return regressions
+
+def run_suite_benchmark(app_count: int, frameworks: int, delay: float, repeat: int, output: Path,
+                        baseline_path: Optional[Path] = None, threshold: float = 0.1) -> int:
+    """
+    Run the suite, write its results to output and optionally compare them
+    with a baseline results file.
+
+    Returns:
+        Process exit code (non-zero if any stage regressed beyond the threshold)
+    """
+    print(f"🔧 Suite: {app_count} synthetic apps with {frameworks} frameworks each, "
+          f"{delay:.3f}s per tool call, best of {repeat}")
+    results = run_suite(app_count, frameworks, delay, repeat)
+    for stage, values in results['results'].items():
+        seconds = values if stage == 'total_seconds' else values['seconds']
+        print(f"  {stage:<22} {seconds:8.3f}s")
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+        f.write("\n")
+    print(f"💾 Results written to {output}")
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        if compare_results(baseline, results, threshold):
+            return 1
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the collector with stub macOS tools")
+    parser.add_argument('--apps', type=int, default=50, help="Number of synthetic apps (default: 50)")
+    parser.add_argument('--delay', type=float, default=0.05, help="Seconds each stub tool sleeps (default: 0.05)")
+    parser.add_argument('--jobs', type=int, nargs='+', default=[1, 4, 8], help="Worker counts to compare")
+    parser.add_argument('--scan-files', type=int, metavar='N',
+                        help="Instead, benchmark the bundle walk on a synthetic bundle with ~N files")
+    parser.add_argument('--codesign', type=int, metavar='N',
+                        help="Instead, compare the native signature reader with codesign on N apps")
+    parser.add_argument('--catalog', type=Path, metavar='DATA_DIR',
+                        help="Instead, compare catalog queries with scanning DATA_DIR")
+    parser.add_argument('--search-index', type=Path, metavar='DATA_DIR',
+                        help="Instead, measure the webapp search index built from DATA_DIR")
+    parser.add_argument('--pipeline', type=int, metavar='N',
+                        help="Instead, compare batch and streaming collection of N synthetic apps")
+    parser.add_argument('--queue-size', type=int, default=32, help="Pipeline queue capacity (default: 32)")
+    parser.add_argument('--suite', action='store_true',
+                        help="Instead, time discovery, per-app processing and index generation and save JSON results")
+    parser.add_argument('--frameworks', type=int, default=0,
+                        help="Nested frameworks per synthetic app (default: 0)")
+    parser.add_argument('--repeat', type=int, default=3, help="Suite repetitions per stage, best kept (default: 3)")
+    parser.add_argument('--output', type=Path, default=Path("benchmark_results.json"),
+                        help="Where --suite writes its results (default: benchmark_results.json)")
+    parser.add_argument('--compare', type=Path, metavar='RESULTS',
+                        help="Compare --suite results with an earlier results file")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="Slowdown counted as a regression by --compare (default: 0.1 = 10%%)")
+    args = parser.parse_args()
+
+    collector.logger.setLevel("WARNING")
+    if args.catalog:
+        sys.exit(run_catalog_benchmark(args.catalog))
+    if args.search_index:
+        sys.exit(run_search_index_benchmark(args.search_index))
+    if args.scan_files:
+        sys.exit(run_scan_benchmark(args.scan_files))
+    if args.codesign:
+        sys.exit(run_codesign_benchmark(args.codesign))
+    if args.pipeline:
+        sys.exit(run_pipeline_benchmark(args.pipeline, args.delay, max(args.jobs), args.queue_size))
+    if args.suite:
+        sys.exit(run_suite_benchmark(args.apps, args.frameworks, args.delay, args.repeat, args.output,
+                                     args.compare, args.threshold))
+    sys.exit(run_benchmark(args.apps, args.delay, args.jobs))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+SQLite catalog of the collected application data.
+
+Ingests the data/ tree (manifests, entitlements, Info.plist and SDEF files)
+into a normalized database so questions like "which apps have entitlement
+X?" or "everything signed by team Y" are indexed lookups instead of a scan
+over every app directory.
+
+Usage: python3 catalog.py build [--data-dir data] [--db catalog.sqlite]
+       python3 catalog.py entitlement com.apple.security.cs.disable-library-validation
+       python3 catalog.py team ABCDE12345
+       python3 catalog.py command "open location"
+       python3 catalog.py plist LSUIElement --value true
+       python3 catalog.py sql "SELECT name FROM apps WHERE sdef_count > 2"
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from collect_macos_app_data import load_plist_string, plist_json_default
+from sdef_store import is_app_directory, list_app_sdefs
+
+DEFAULT_DB_NAME = "catalog.sqlite"
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS apps (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    path TEXT,
+    bundle_id TEXT,
+    version TEXT,
+    short_version TEXT,
+    has_icon INTEGER,
+    sdef_count INTEGER
+);
+CREATE TABLE IF NOT EXISTS codesign (
+    app_id INTEGER PRIMARY KEY REFERENCES apps(id) ON DELETE CASCADE,
+    signature_status TEXT,
+    authority TEXT,
+    identifier TEXT,
+    team_identifier TEXT,
+    sealed_resources TEXT,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS sandbox (
+    app_id INTEGER PRIMARY KEY REFERENCES apps(id) ON DELETE CASCADE,
+    sandboxed TEXT,
+    sandbox_type TEXT,
+    hardened_runtime TEXT,
+    library_validation TEXT,
+    entitlements_count TEXT
+);
+CREATE TABLE IF NOT EXISTS entitlements (
+    app_id INTEGER NOT NULL REFERENCES apps(id) ON DELETE CASCADE,
+    key TEXT NOT NULL,
+    value TEXT,
+    value_type TEXT
+);
+CREATE TABLE IF NOT EXISTS info_plist (
+    app_id INTEGER NOT NULL REFERENCES apps(id) ON DELETE CASCADE,
+    key TEXT NOT NULL,
+    value TEXT,
+    value_type TEXT
+);
+CREATE TABLE IF NOT EXISTS sdef_suites (
+    id INTEGER PRIMARY KEY,
+    app_id INTEGER NOT NULL REFERENCES apps(id) ON DELETE CASCADE,
+    file_name TEXT,
+    name TEXT,
+    code TEXT,
+    description TEXT
+);
+CREATE TABLE IF NOT EXISTS sdef_commands (
+    suite_id INTEGER NOT NULL REFERENCES sdef_suites(id) ON DELETE CASCADE,
+    app_id INTEGER NOT NULL REFERENCES apps(id) ON DELETE CASCADE,
+    name TEXT,
+    code TEXT,
+    description TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_apps_bundle_id ON apps(bundle_id);
+CREATE INDEX IF NOT EXISTS idx_codesign_team ON codesign(team_identifier);
+CREATE INDEX IF NOT EXISTS idx_codesign_identifier ON codesign(identifier);
+CREATE INDEX IF NOT EXISTS idx_entitlements_key ON entitlements(key, value);
+CREATE INDEX IF NOT EXISTS idx_entitlements_app ON entitlements(app_id);
+CREATE INDEX IF NOT EXISTS idx_info_plist_key ON info_plist(key, value);
+CREATE INDEX IF NOT EXISTS idx_info_plist_app ON info_plist(app_id);
+CREATE INDEX IF NOT EXISTS idx_sdef_suites_app ON sdef_suites(app_id);
+CREATE INDEX IF NOT EXISTS idx_sdef_commands_name ON sdef_commands(name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_sdef_commands_app ON sdef_commands(app_id);
+"""
+
+PLIST_VALUE_TYPES = [
+    (bool, 'bool'),
+    (int, 'integer'),
+    (float, 'real'),
+    (str, 'string'),
+    (datetime, 'date'),
+    (bytes, 'data'),
+    (list, 'array'),
+    (dict, 'dict'),
+]
+
+def encode_plist_value(value) -> str:
+    """Encode a plist value as JSON text (dates as ISO 8601, data as base64)."""
+    return json.dumps(value, default=plist_json_default, sort_keys=True, ensure_ascii=False)
+
+def plist_value_type(value) -> str:
+    """Name of the plist type of a parsed value."""
+    return next((name for value_type, name in PLIST_VALUE_TYPES if isinstance(value, value_type)), 'unknown')
+
+def parse_sdef_suites(sdef_path: Path) -> List[Dict]:
+    """
+    Read the suites and commands of an SDEF file.
+
+    Returns:
+        List of suites (name, code, description, commands), empty if the
+        file cannot be parsed
+    """
+    try:
+        root = ET.parse(sdef_path).getroot()
+    except (ET.ParseError, OSError):
+        return []
+
+    suites = []
+    for suite in root.iter('suite'):
+        suites.append({
+            'name': suite.get('name'),
+            'code': suite.get('code'),
+            'description': suite.get('description'),
+            'commands': [
+                {'name': command.get('name'), 'code': command.get('code'), 'description': command.get('description')}
+                for command in suite.findall('command')
+            ],
+        })
+    return suites
+
+def _load_plist_file(path: Path) -> Optional[Dict]:
+    try:
+        return load_plist_string(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+
+def connect(db_path: Path) -> sqlite3.Connection:
+    """Open a catalog database, creating the schema if needed."""
+    connection = sqlite3.connect(db_path)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA foreign_keys = ON")
+    connection.executescript(SCHEMA)
+    connection.execute("INSERT OR REPLACE INTO meta VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+    return connection
+
+def ingest_app(connection: sqlite3.Connection, app_dir: Path) -> bool:
+    """
+    Replace one app's rows with the contents of its data directory.
+
+    Args:
+        connection: Open catalog connection (the caller commits)
+        app_dir: Application directory inside the data directory
+
+    Returns:
+        True if the app was ingested, False if it has no manifest.json
+    """
+    connection.execute("DELETE FROM apps WHERE name = ?", (app_dir.name,))
+    try:
+        with open(app_dir / "manifest.json") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+
+    info_plist = _load_plist_file(app_dir / "info.plist") or {}
+    cursor = connection.execute(
+        "INSERT INTO apps (name, path, bundle_id, version, short_version, has_icon, sdef_count) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (app_dir.name, manifest.get('path'), info_plist.get('CFBundleIdentifier'),
+         info_plist.get('CFBundleVersion'), info_plist.get('CFBundleShortVersionString'),
+         int(bool(manifest.get('has_icon'))), manifest.get('sdef_count', 0)),
+    )
+    app_id = cursor.lastrowid
+
+    codesign = manifest.get('codesign') or {}
+    connection.execute(
+        "INSERT INTO codesign VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (app_id, codesign.get('signature_status'), codesign.get('authority'), codesign.get('identifier'),
+         codesign.get('team_identifier'), codesign.get('sealed_resources'), codesign.get('error')),
+    )
+    sandbox = manifest.get('sandbox') or {}
+    connection.execute(
+        "INSERT INTO sandbox VALUES (?, ?, ?, ?, ?, ?)",
+        (app_id, sandbox.get('sandboxed'), sandbox.get('sandbox_type'), sandbox.get('hardened_runtime'),
+         sandbox.get('library_validation'), sandbox.get('entitlements_count')),
+    )
+
+    entitlements = _load_plist_file(app_dir / "entitlements.plist") or {}
+    connection.executemany(
+        "INSERT INTO entitlements VALUES (?, ?, ?, ?)",
+        [(app_id, key, encode_plist_value(value), plist_value_type(value)) for key, value in entitlements.items()],
+    )
+    connection.executemany(
+        "INSERT INTO info_plist VALUES (?, ?, ?, ?)",
+        [(app_id, key, encode_plist_value(value), plist_value_type(value)) for key, value in info_plist.items()],
+    )
+
+    for file_name, sdef_path in list_app_sdefs(app_dir).items():
+        for suite in parse_sdef_suites(sdef_path):
+            suite_id = connection.execute(
+                "INSERT INTO sdef_suites (app_id, file_name, name, code, description) VALUES (?, ?, ?, ?, ?)",
+                (app_id, file_name, suite['name'], suite['code'], suite['description']),
+            ).lastrowid
+            connection.executemany(
+                "INSERT INTO sdef_commands VALUES (?, ?, ?, ?, ?)",
+                [(suite_id, app_id, command['name'], command['code'], command['description'])
+                 for command in suite['commands']],
+            )
+    return True
+
+def build_catalog(data_dir: Path, db_path: Path) -> int:
+    """
+    Build a fresh catalog from a data directory.
+
+    The database is written under a temporary name and renamed into place,
+    so readers never see a half-built catalog.
+
+    Returns:
+        Number of apps ingested
+    """
+    tmp_path = db_path.with_name(f"{db_path.name}.{os.getpid()}.tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    connection = connect(tmp_path)
+    try:
+        count = sum(ingest_app(connection, app_dir)
+                    for app_dir in sorted(data_dir.iterdir()) if is_app_directory(app_dir))
+        connection.execute("INSERT OR REPLACE INTO meta VALUES ('built', ?)", (datetime.now().isoformat(),))
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(tmp_path, db_path)
+    return count
+
+def update_catalog(data_dir: Path, db_path: Path, app_names: Iterable[str]) -> int:
+    """
+    Re-ingest only the given apps and drop apps no longer in data_dir.
+
+    Builds the catalog from scratch if it does not exist yet.
+
+    Returns:
+        Number of apps ingested
+    """
+    if not db_path.exists():
+        return build_catalog(data_dir, db_path)
+
+    connection = connect(db_path)
+    try:
+        present = {app_dir.name for app_dir in data_dir.iterdir() if is_app_directory(app_dir)}
+        stale = [row['name'] for row in connection.execute("SELECT name FROM apps") if row['name'] not in present]
+        connection.executemany("DELETE FROM apps WHERE name = ?", [(name,) for name in stale])
+        count = sum(ingest_app(connection, data_dir / name) for name in sorted(set(app_names)) if name in present)
+        connection.execute("INSERT OR REPLACE INTO meta VALUES ('built', ?)", (datetime.now().isoformat(),))
+        connection.commit()
+    finally:
+        connection.close()
+    return count
+
+def apps_with_entitlement(connection: sqlite3.Connection, key: str, value: Optional[str] = None) -> List[sqlite3.Row]:
+    """Apps declaring an entitlement, optionally with a given JSON-encoded value (e.g. 'true')."""
+    query = ("SELECT apps.name, apps.bundle_id, entitlements.value FROM entitlements "
+             "JOIN apps ON apps.id = entitlements.app_id WHERE entitlements.key = ?")
+    params = [key]
+    if value is not None:
+        query += " AND entitlements.value = ?"
+        params.append(value)
+    return connection.execute(query + " ORDER BY apps.name", params).fetchall()
+
+def apps_with_plist_key(connection: sqlite3.Connection, key: str, value: Optional[str] = None) -> List[sqlite3.Row]:
+    """Apps whose Info.plist has a top-level key, optionally with a given JSON-encoded value."""
+    query = ("SELECT apps.name, apps.bundle_id, info_plist.value FROM info_plist "
+             "JOIN apps ON apps.id = info_plist.app_id WHERE info_plist.key = ?")
+    params = [key]
+    if value is not None:
+        query += " AND info_plist.value = ?"
+        params.append(value)
+    return connection.execute(query + " ORDER BY apps.name", params).fetchall()
+
+def apps_by_team(connection: sqlite3.Connection, team_identifier: str) -> List[sqlite3.Row]:
+    """Apps signed with a team identifier."""
+    return connection.execute(
+        "SELECT apps.name, apps.bundle_id, codesign.authority FROM codesign "
+        "JOIN apps ON apps.id = codesign.app_id WHERE codesign.team_identifier = ? ORDER BY apps.name",
+        (team_identifier,),
+    ).fetchall()
+
+def apps_with_command(connection: sqlite3.Connection, command: str) -> List[sqlite3.Row]:
+    """Apps whose SDEFs define a command (case-insensitive)."""
+    return connection.execute(
+        "SELECT DISTINCT apps.name, sdef_suites.name AS suite, sdef_commands.code FROM sdef_commands "
+        "JOIN sdef_suites ON sdef_suites.id = sdef_commands.suite_id "
+        "JOIN apps ON apps.id = sdef_commands.app_id "
+        "WHERE sdef_commands.name = ? COLLATE NOCASE ORDER BY apps.name, suite",
+        (command,),
+    ).fetchall()
+
+def print_rows(rows: List[sqlite3.Row]) -> None:
+    if not rows:
+        print("No matches")
+        return
+    columns = rows[0].keys()
+    widths = [max(len(column), *(len(str(row[column])) for row in rows)) for column in columns]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(row[column]).ljust(width) for column, width in zip(columns, widths)))
+    print(f"({len(rows)} rows)")
+
+def main():
+    script_dir = Path(__file__).parent
+    parser = argparse.ArgumentParser(description="Build and query the SQLite catalog of collected app data")
+    parser.add_argument('--db', type=Path, default=script_dir / DEFAULT_DB_NAME,
+                        help=f"Catalog database (default: ./{DEFAULT_DB_NAME})")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help="Build the catalog from a data directory")
+    build_parser.add_argument('--data-dir', type=Path, default=script_dir / "data",
+                              help="Collected data directory (default: ./data)")
+
+    for name, help_text in [('entitlement', "Apps with an entitlement key"),
+                            ('plist', "Apps with a top-level Info.plist key")]:
+        query_parser = subparsers.add_parser(name, help=help_text)
+        query_parser.add_argument('key')
+        query_parser.add_argument('--value', help="Only this JSON-encoded value, e.g. true or '\"string\"'")
+    subparsers.add_parser('team', help="Apps signed by a team identifier").add_argument('team_identifier')
+    subparsers.add_parser('command', help="Apps whose SDEFs define a command").add_argument('name')
+    subparsers.add_parser('sql', help="Run a read-only SQL query").add_argument('query')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        if not args.data_dir.is_dir():
+            print(f"❌ Data directory not found: {args.data_dir}")
+            return
+        count = build_catalog(args.data_dir, args.db)
+        print(f"✅ Catalogued {count} applications in {args.db} ({args.db.stat().st_size:,} bytes)")
+        return
+
+    if not args.db.exists():
+        print(f"❌ Catalog not found: {args.db}. Run `python3 catalog.py build` first.")
+        return
+
+    connection = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+    connection.row_factory = sqlite3.Row
+    if args.command == 'entitlement':
+        rows = apps_with_entitlement(connection, args.key, args.value)
+    elif args.command == 'plist':
+        rows = apps_with_plist_key(connection, args.key, args.value)
+    elif args.command == 'team':
+        rows = apps_by_team(connection, args.team_identifier)
+    elif args.command == 'command':
+        rows = apps_with_command(connection, args.name)
+    else:
+        rows = connection.execute(args.query).fetchall()
+    print_rows(rows)
+
+if __name__ == "__main__":
+    main()
@@ -9,75 +9,244 @@ This script searches for all applications on a Mac system and collects:
 - Info.plist data
 - Sandbox information
 
-Organizes data in structure: data/<ApplicationName>/[sdef/, codesign.txt, entitlements.plist, info.plist, sandbox.txt]
+Organizes data in structure: data/<ApplicationName>/[sdef_refs.json, codesign.txt, entitlements.plist, entitlements.json, info.plist, sandbox.txt]
+with SDEF contents stored once in data/_blobs/<sha256>
 """
 
+import base64
 import os
 import shutil
 import subprocess
+import tempfile
 import xml.etree.ElementTree as ET
 from pathlib import Path
 import re
-from typing import Optional, Set, Dict, Tuple
+from typing import Optional, Set, Dict, Tuple, List, Iterable, Iterator, Callable, Sequence, Union
 import logging
 import sys
 import json
 import plistlib
+import argparse
+import hashlib
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from xml.parsers.expat import ExpatError
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from icns_reader import IcnsError, extract_png
+from macho_signature import MachOError, read_code_signature
+from output_writer import OUTPUT_WRITER
+from pipeline import Pipeline, Stage, format_pipeline_summary
+from progress_journal import JOURNAL_NAME, ProgressJournal
+from sdef_store import SdefStore, is_app_directory, list_app_sdefs
+from run_profile import RunProfile
+from tool_policy import ToolPolicy, ToolUnavailableError
+from tool_runner import ToolRunner
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def find_all_applications() -> Set[Path]:
+# Number of external tool processes spawned, keyed by tool name
+TOOL_SPAWN_COUNTS: Counter = Counter()
+_spawn_count_lock = threading.Lock()
+
+# Shared asyncio runner that bounds concurrent processes per tool
+TOOL_RUNNER = ToolRunner()
+
+# Stage timings, spawns and bytes written for the current run (see run_profile.py)
+RUN_PROFILE = RunProfile()
+
+def count_tool_spawn(tool: str) -> None:
+    """Count one external tool process for the run totals and the run profile."""
+    with _spawn_count_lock:
+        TOOL_SPAWN_COUNTS[tool] += 1
+    RUN_PROFILE.count_spawn(tool)
+
+# Adaptive timeouts, retries and a circuit breaker per tool operation (see tool_policy.py)
+TOOL_POLICY = ToolPolicy(TOOL_RUNNER, on_spawn=count_tool_spawn)
+
+def run_tool(args: List[str], timeout: float = 30) -> subprocess.CompletedProcess:
+    """
+    Run an external tool through TOOL_POLICY, capturing text output and counting spawns.
+    
+    Args:
+        args: Command line, starting with the tool name
+        timeout: Longest time before the process is killed (the policy uses a
+                 shorter timeout once it has seen how long the tool usually takes)
+        
+    Returns:
+        Completed process
+        
+    Raises:
+        ToolUnavailableError: If the tool kept failing and is being skipped
+        subprocess.TimeoutExpired: If the tool ran longer than timeout (it is killed)
+        subprocess.SubprocessError: If the call was cancelled
+        OSError: If the tool could not be started
+    """
+    return TOOL_POLICY.run(args, timeout=timeout)
+
+# Common locations where applications are found
+APPLICATION_SEARCH_PATHS = [
+    "/Applications",
+    "/System/Applications", 
+    "/System/Library/CoreServices",
+    "/Developer/Applications",
+    "~/Applications",
+    "/Library/Application Support",
+    "/System/Library/Frameworks",
+]
+
+# How deep below each search root bundles are looked for by default
+DEFAULT_SEARCH_DEPTH = 3
+
+def scan_for_applications(root: Path, max_depth: int = DEFAULT_SEARCH_DEPTH,
+                          errors: Optional[List[str]] = None) -> List[Tuple[Path, Tuple[int, int]]]:
+    """
+    Find .app bundles under one root with os.scandir.
+    
+    Descent stops at the first .app in each branch (helpers inside a bundle are
+    not reported). Directory symlinks are followed, but each directory is only
+    visited once, keyed by (device, inode), so links and loops are harmless.
+    
+    Args:
+        root: Directory to search
+        max_depth: Deepest level at which a bundle is reported (root's children are 1)
+        errors: If given, a "path: error" entry is appended for every
+                directory that could not be read (the scan skips it)
+        
+    Returns:
+        List of (bundle path, (st_dev, st_ino)) in sorted traversal order
+    """
+    return list(iter_scan_for_applications(root, max_depth, errors))
+
+def iter_scan_for_applications(root: Path, max_depth: int = DEFAULT_SEARCH_DEPTH,
+                               errors: Optional[List[str]] = None) -> Iterator[Tuple[Path, Tuple[int, int]]]:
+    """Generator behind scan_for_applications(), yielding each bundle as soon as it is found."""
+    def skip(path: str, error: OSError) -> None:
+        logger.debug(f"Cannot scan {path}: {error}")
+        if errors is not None:
+            errors.append(f"{path}: {error}")
+    
+    visited = set()
+    try:
+        root_stat = os.stat(root)
+        visited.add((root_stat.st_dev, root_stat.st_ino))
+    except OSError as e:
+        skip(str(root), e)
+        return
+    stack = [(str(root), 0)]
+    
+    while stack:
+        directory, depth = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError as e:
+            skip(directory, e)
+            continue
+        
+        subdirs = []
+        for entry in entries:
+            try:
+                if not entry.is_dir():
+                    continue
+                stat_result = entry.stat()
+            except OSError as e:
+                skip(entry.path, e)
+                continue
+            
+            key = (stat_result.st_dev, stat_result.st_ino)
+            if key in visited:
+                continue
+            visited.add(key)
+            
+            if entry.name.endswith('.app'):
+                yield Path(entry.path), key
+            elif depth + 1 < max_depth:
+                subdirs.append((entry.path, depth + 1))
+        
+        # Reversed so the stack pops subdirectories in sorted order
+        stack.extend(reversed(subdirs))
+
+def find_all_applications(search_paths: Optional[List[str]] = None,
+                          max_depth: int = DEFAULT_SEARCH_DEPTH) -> Set[Path]:
     """
     Find all .app bundles on the system.
     
+    Search roots are walked concurrently. A bundle reachable through several
+    paths (e.g. a symlink in /Applications to a cryptex) is only returned once,
+    under the first path found in search_paths order.
+    
+    Args:
+        search_paths: Roots to search (defaults to APPLICATION_SEARCH_PATHS)
+        max_depth: Deepest level below each root at which bundles are reported
+    
     Returns:
         Set of Path objects pointing to .app bundles
     """
-    app_bundles = set()
-    
-    # Common locations where applications are found
-    search_paths = [
-        "/Applications",
-        "/System/Applications", 
-        "/System/Library/CoreServices",
-        "/Developer/Applications",
-        "~/Applications",
-        "/Library/Application Support",
-        "/System/Library/Frameworks",
-    ]
+    if search_paths is None:
+        search_paths = APPLICATION_SEARCH_PATHS
     
     logger.info("Searching for application bundles...")
     
+    roots = []
     for search_path in search_paths:
         expanded_path = Path(search_path).expanduser()
-        if expanded_path.exists():
-            logger.info(f"Searching in: {expanded_path}")
-            try:
-                # Find .app bundles recursively
-                result = subprocess.run([
-                    'find', str(expanded_path), '-name', '*.app', '-type', 'd', '-maxdepth', '3'
-                ], capture_output=True, text=True, timeout=60)
-                
-                if result.returncode == 0:
-                    for line in result.stdout.strip().split('\n'):
-                        if line and Path(line).exists():
-                            app_bundles.add(Path(line))
-                            
-            except (subprocess.TimeoutExpired, subprocess.SubprocessError) as e:
-                logger.warning(f"Error searching {expanded_path}: {e}")
-                # Fallback to Python's glob
-                try:
-                    for app_bundle in expanded_path.rglob("*.app"):
-                        if app_bundle.is_dir():
-                            app_bundles.add(app_bundle)
-                except PermissionError:
-                    logger.warning(f"Permission denied accessing {expanded_path}")
+        if expanded_path.is_dir():
+            roots.append(expanded_path)
+    
+    def timed_scan(root: Path):
+        start = time.perf_counter()
+        bundles = scan_for_applications(root, max_depth)
+        return bundles, time.perf_counter() - start
+    
+    app_bundles = set()
+    seen = set()
+    with ThreadPoolExecutor(max_workers=max(1, len(roots))) as executor:
+        for root, (bundles, elapsed) in zip(roots, executor.map(timed_scan, roots)):
+            new_bundles = 0
+            for bundle_path, key in bundles:
+                if key not in seen:
+                    seen.add(key)
+                    app_bundles.add(bundle_path)
+                    new_bundles += 1
+            logger.info(f"Searched {root}: {len(bundles)} bundles ({new_bundles} new) in {elapsed:.2f}s")
     
     logger.info(f"Found {len(app_bundles)} application bundles")
     return app_bundles
 
+def iter_applications(search_paths: Optional[List[str]] = None, max_depth: int = DEFAULT_SEARCH_DEPTH,
+                      errors: Optional[List[str]] = None) -> Iterator[Path]:
+    """
+    Yield .app bundles as they are found, for streaming into the collection pipeline.
+    
+    Roots are walked one after another in search_paths order, so a bundle
+    reachable through several paths is reported under the same path as
+    find_all_applications() would report it.
+    
+    Args:
+        search_paths: Roots to search (defaults to APPLICATION_SEARCH_PATHS)
+        max_depth: Deepest level below each root at which bundles are reported
+        errors: If given, every directory that could not be read is appended
+                (see scan_for_applications)
+    """
+    if search_paths is None:
+        search_paths = APPLICATION_SEARCH_PATHS
+    
+    seen = set()
+    for search_path in search_paths:
+        root = Path(search_path).expanduser()
+        if not root.is_dir():
+            continue
+        for bundle_path, key in iter_scan_for_applications(root, max_depth, errors):
+            if key not in seen:
+                seen.add(key)
+                yield bundle_path
+
 def get_application_name(app_path: Path) -> str:
     """
     Get a clean application name from the app bundle path.
@@ -96,17 +265,280 @@ def get_application_name(app_path: Path) -> str:
     app_name = re.sub(r'[<>:"/\\|?*]', '_', app_name)
     return app_name
 
-def extract_code_signing_info(app_path: Path) -> Dict[str, str]:
+# Directories inside a bundle that never contain SDEF files or app icons
+BUNDLE_SCAN_SKIP_DIRS = {'_CodeSignature', 'Headers', 'PrivateHeaders'}
+BUNDLE_SCAN_SKIP_SUFFIXES = ('.lproj',)
+
+def scan_bundle(app_path: Path) -> Dict:
     """
-    Extract code signing information from an application.
+    Walk a bundle once with os.scandir, collecting everything the extractors need.
+    
+    Code signature folders, localization folders and framework headers are
+    pruned, and directory symlinks are not followed (framework Versions/Current
+    links would otherwise be walked twice). Entries are visited in sorted order
+    so results are deterministic.
     
     Args:
         app_path: Path to the .app bundle
         
     Returns:
-        Dictionary with code signing information
+        Dictionary with 'sdef_files' and 'icon_files' (sorted Path lists; icon
+        candidates are the .icns files directly in Contents/Resources),
+        'file_count', 'dir_count' and 'pruned_dirs'
+    """
+    resources_dir = str(app_path / "Contents" / "Resources")
+    result = {
+        'sdef_files': [],
+        'icon_files': [],
+        'file_count': 0,
+        'dir_count': 0,
+        'pruned_dirs': 0,
+    }
+    
+    stack = [str(app_path)]
+    while stack:
+        directory = stack.pop()
+        result['dir_count'] += 1
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError as e:
+            logger.debug(f"Cannot scan {directory}: {e}")
+            continue
+        
+        subdirs = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name in BUNDLE_SCAN_SKIP_DIRS or entry.name.endswith(BUNDLE_SCAN_SKIP_SUFFIXES):
+                        result['pruned_dirs'] += 1
+                    else:
+                        subdirs.append(entry.path)
+                    continue
+                if not entry.is_file():
+                    continue
+            except OSError:
+                continue
+            
+            result['file_count'] += 1
+            name = entry.name
+            if name.endswith('.sdef'):
+                result['sdef_files'].append(Path(entry.path))
+            elif name.endswith('.icns') and directory == resources_dir:
+                result['icon_files'].append(Path(entry.path))
+        
+        # Reversed so the stack pops subdirectories in sorted order
+        stack.extend(reversed(subdirs))
+    
+    return result
+
+class BundleContext:
+    """
+    Per-application state shared by the extractors.
+    
+    Info.plist is loaded once with plistlib (binary or XML, no subprocess) and
+    the parsed dictionary is reused for the info.plist output, the sandbox
+    analysis and the icon lookup. The code signature is read from the main
+    executable in-process, falling back to codesign when that is not possible.
+    """
+    
+    def __init__(self, app_path: Path):
+        self.app_path = app_path
+        self.info_plist_path = app_path / "Contents" / "Info.plist"
+        self._info_plist: Optional[Dict] = None
+        self._info_plist_loaded = False
+        self._codesign_probe: Optional[Tuple[Dict, Optional[str]]] = None
+        self._entitlements: Optional[Dict] = None
+        self._entitlements_loaded = False
+        self._scan: Optional[Dict] = None
+        # External tool calls that timed out, crashed or were skipped, e.g. "codesign --verify: ..."
+        self.tool_failures: List[str] = []
+    
+    @property
+    def scan(self) -> Dict:
+        """Result of a single pruned walk of the bundle (see scan_bundle)."""
+        if self._scan is None:
+            self._scan = scan_bundle(self.app_path)
+        return self._scan
+    
+    @property
+    def info_plist(self) -> Optional[Dict]:
+        """Parsed Info.plist dictionary, or None if missing or unreadable."""
+        if not self._info_plist_loaded:
+            self._info_plist_loaded = True
+            try:
+                with open(self.info_plist_path, 'rb') as f:
+                    plist_data = plistlib.load(f)
+                if isinstance(plist_data, dict):
+                    self._info_plist = plist_data
+                else:
+                    logger.debug(f"Info.plist for {self.app_path} is not a dictionary")
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError, ExpatError) as e:
+                logger.debug(f"Could not read Info.plist for {self.app_path}: {e}")
+        return self._info_plist
+    
+    @property
+    def icon_filename(self) -> Optional[str]:
+        """Icon file name declared in Info.plist (CFBundleIconFile or CFBundleIcons)."""
+        plist_data = self.info_plist
+        if not plist_data:
+            return None
+        
+        icon_filename = plist_data.get('CFBundleIconFile')
+        
+        # Some apps might use CFBundleIcons instead
+        if not icon_filename:
+            icons_dict = plist_data.get('CFBundleIcons')
+            if icons_dict and isinstance(icons_dict, dict):
+                primary_icon = icons_dict.get('CFBundlePrimaryIcon')
+                if primary_icon and isinstance(primary_icon, dict):
+                    icon_files = primary_icon.get('CFBundleIconFiles')
+                    if icon_files and isinstance(icon_files, list):
+                        icon_filename = icon_files[0]
+        
+        return icon_filename if isinstance(icon_filename, str) else None
+    
+    @property
+    def executable_path(self) -> Optional[Path]:
+        """Main executable named by CFBundleExecutable, or None if not declared."""
+        executable = (self.info_plist or {}).get('CFBundleExecutable')
+        if not isinstance(executable, str) or not executable:
+            return None
+        return self.app_path / "Contents" / "MacOS" / executable
+    
+    def codesign_probe(self) -> Tuple[Dict, Optional[str]]:
+        """
+        Read the signing details and entitlements once and cache the result.
+        
+        The embedded signature of the main executable is decoded natively
+        (see macho_signature). Bundles without a readable executable fall back
+        to a single `codesign -dv --entitlements :-`, whose stderr holds the
+        signing details and stdout the entitlements plist.
+        
+        Returns:
+            Tuple of (codesign_info dict, raw entitlements XML or None)
+        """
+        if self._codesign_probe is None:
+            self._codesign_probe = self._read_native_signature() or self._run_codesign_display()
+        info, entitlements_xml = self._codesign_probe
+        return dict(info), entitlements_xml
+    
+    @property
+    def entitlements(self) -> Optional[Dict]:
+        """Parsed entitlements dictionary, or None if there are none or they cannot be parsed."""
+        if not self._entitlements_loaded:
+            self._entitlements_loaded = True
+            _, raw_xml = self.codesign_probe()
+            if raw_xml:
+                try:
+                    self._entitlements = load_plist_string(raw_xml)
+                except ValueError as e:
+                    logger.debug(f"Could not parse the entitlements of {self.app_path}: {e}")
+        return self._entitlements
+    
+    def _read_native_signature(self) -> Optional[Tuple[Dict, Optional[str]]]:
+        executable_path = self.executable_path
+        if executable_path is None:
+            return None
+        try:
+            signature = read_code_signature(executable_path)
+        except (OSError, MachOError) as e:
+            logger.debug(f"Could not read the signature of {executable_path}, using codesign: {e}")
+            return None
+        
+        if signature is not None and signature['der_entitlements'] and not signature['entitlements']:
+            # Only DER-encoded entitlements: let codesign render them as XML
+            return None
+        return codesign_info_from_signature(signature, self.app_path), signature and signature['entitlements']
+    
+    def _run_codesign_display(self) -> Tuple[Dict, Optional[str]]:
+        try:
+            result = run_tool(['codesign', '-dv', '--entitlements', ':-', str(self.app_path)])
+            if result.returncode < 0:
+                raise subprocess.SubprocessError(f"codesign was killed by signal {-result.returncode}")
+            return parse_codesign_display(result.returncode, result.stderr, result.stdout)
+        except (subprocess.TimeoutExpired, subprocess.SubprocessError, OSError) as e:
+            logger.debug(f"Code signing check failed for {self.app_path}: {e}")
+            self.tool_failures.append(f"codesign -dv: {e}")
+            info = new_codesign_info()
+            info['error'] = str(e)
+            return info, None
+
+def format_plist_xml(plist_data: Dict) -> str:
+    """
+    Render a parsed plist as XML with consistent two-space indentation.
+    
+    Args:
+        plist_data: Parsed plist dictionary
+        
+    Returns:
+        XML string with an XML declaration
+    """
+    raw_xml = plistlib.dumps(plist_data, fmt=plistlib.FMT_XML, sort_keys=False).decode('utf-8')
+    root = ET.fromstring(raw_xml)
+    ET.indent(root, space="  ", level=0)
+    return ET.tostring(root, encoding='unicode', xml_declaration=True)
+
+# Characters XML 1.0 cannot hold, which plistlib refuses to write (binary plists can contain them)
+PLIST_CONTROL_CHARACTERS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+def escape_plist_control_characters(value):
+    """
+    Copy a parsed plist value with control characters in its strings and keys
+    written as \\uXXXX escapes, so it can be rendered as XML.
+    """
+    if isinstance(value, str):
+        return PLIST_CONTROL_CHARACTERS.sub(lambda match: f"\\u{ord(match.group()):04x}", value)
+    if isinstance(value, dict):
+        return {escape_plist_control_characters(key): escape_plist_control_characters(item)
+                for key, item in value.items()}
+    if isinstance(value, list):
+        return [escape_plist_control_characters(item) for item in value]
+    return value
+
+def load_plist_string(plist_text: str) -> Dict:
+    """
+    Parse plist XML text as written to the data directory.
+    
+    Leading comment headers (e.g. "<!-- Info.plist for ... -->") are skipped.
+    
+    Args:
+        plist_text: Plist XML, optionally preceded by comments
+        
+    Returns:
+        Parsed plist dictionary
+        
+    Raises:
+        ValueError: If the text does not contain a plist dictionary
     """
-    info = {
+    xml_start = plist_text.find('<?xml')
+    if xml_start == -1:
+        xml_start = plist_text.find('<plist')
+    if xml_start == -1:
+        raise ValueError("No plist content found")
+    
+    try:
+        plist_data = plistlib.loads(plist_text[xml_start:].encode('utf-8'), fmt=plistlib.FMT_XML)
+    except ExpatError as e:
+        raise ValueError(str(e)) from e
+    
+    if not isinstance(plist_data, dict):
+        raise ValueError("Plist root is not a dictionary")
+    return plist_data
+
+def plist_json_default(obj):
+    """json.dumps default for plist values JSON lacks: dates as ISO 8601, data as base64."""
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if isinstance(obj, bytes):
+        return base64.b64encode(obj).decode('ascii')
+    raise TypeError(f"Unsupported plist value {type(obj).__name__}")
+
+def new_codesign_info() -> Dict[str, Optional[str]]:
+    """Return a codesign_info dict with every field set to its unknown default."""
+    return {
         'signature_status': 'Unknown',
         'authority': 'Unknown',
         'identifier': 'Unknown',
@@ -114,212 +546,249 @@ def extract_code_signing_info(app_path: Path) -> Dict[str, str]:
         'sealed_resources': 'Unknown',
         'error': None
     }
+
+def parse_codesign_display(returncode: int, stderr: str, stdout: str) -> Tuple[Dict, Optional[str]]:
+    """
+    Parse the output of `codesign -dv --entitlements :- <app>`.
+    
+    Args:
+        returncode: codesign exit status
+        stderr: Signing details (codesign writes these to stderr)
+        stdout: Entitlements plist XML, if any
+        
+    Returns:
+        Tuple of (codesign_info dict, raw entitlements XML or None)
+    """
+    info = new_codesign_info()
+    
+    if returncode != 0:
+        info['signature_status'] = 'Invalid or Unsigned'
+        info['error'] = stderr.strip()
+        return info, None
+    
+    info['signature_status'] = 'Valid'
+    for line in stderr.split('\n'):
+        if line.startswith('Sealed Resources'):
+            info['sealed_resources'] = 'Yes' if 'version' in line else 'No'
+            continue
+        
+        key, separator, value = line.partition('=')
+        if not separator:
+            continue
+        if key == 'Authority':
+            # The leaf certificate is listed first
+            if info['authority'] == 'Unknown':
+                info['authority'] = value.strip()
+        elif key == 'Identifier':
+            info['identifier'] = value.strip()
+        elif key == 'TeamIdentifier':
+            info['team_identifier'] = value.strip()
+    
+    entitlements_xml = stdout if stdout.strip() else None
+    return info, entitlements_xml
+
+def codesign_info_from_signature(signature: Optional[Dict], app_path: Path) -> Dict:
+    """
+    Build a codesign_info dict from a natively read signature.
+    
+    The fields match what parse_codesign_display() reads from codesign;
+    the authority is the leaf of the CMS signer chain.
+    
+    Args:
+        signature: Result of read_code_signature(), or None if unsigned
+        app_path: Path to the .app bundle
+        
+    Returns:
+        Dictionary with code signing information
+    """
+    info = new_codesign_info()
+    if signature is None:
+        info['signature_status'] = 'Invalid or Unsigned'
+        info['error'] = f"{app_path}: code object is not signed at all"
+        return info
+    
+    info['signature_status'] = 'Valid'
+    if signature['authorities']:
+        info['authority'] = signature['authorities'][0]
+    info['identifier'] = signature['identifier']
+    info['team_identifier'] = signature['team_identifier'] or 'not set'
+    info['sealed_resources'] = 'Yes' if signature['sealed_resources'] else 'No'
+    return info
+
+def extract_code_signing_info(app_path: Path, bundle: Optional[BundleContext] = None,
+                              verify: bool = True) -> Dict[str, str]:
+    """
+    Extract code signing information from an application.
+    
+    A codesign call that timed out, crashed or was skipped by the circuit
+    breaker is recorded in bundle.tool_failures.
+    
+    Args:
+        app_path: Path to the .app bundle
+        bundle: Shared bundle context (created if not given)
+        verify: Also run `codesign --verify` (one extra process)
+        
+    Returns:
+        Dictionary with code signing information
+    """
+    bundle = bundle or BundleContext(app_path)
+    info, _ = bundle.codesign_probe()
+    
+    # Skip verification if codesign could not be run at all
+    if not verify or info['signature_status'] == 'Unknown':
+        return info
     
     try:
-        # Get basic code signature info
-        result = subprocess.run([
-            'codesign', '-dv', str(app_path)
-        ], capture_output=True, text=True, timeout=30)
-        
-        if result.returncode == 0:
-            info['signature_status'] = 'Valid'
-            output = result.stderr  # codesign outputs to stderr
-            
-            # Parse codesign output
-            for line in output.split('\n'):
-                if 'Authority=' in line:
-                    info['authority'] = line.split('Authority=')[1].strip()
-                elif 'Identifier=' in line:
-                    info['identifier'] = line.split('Identifier=')[1].strip()
-                elif 'TeamIdentifier=' in line:
-                    info['team_identifier'] = line.split('TeamIdentifier=')[1].strip()
-                elif 'Sealed Resources' in line:
-                    info['sealed_resources'] = 'Yes' if 'version' in line else 'No'
-        else:
-            info['signature_status'] = 'Invalid or Unsigned'
-            info['error'] = result.stderr.strip()
-            
-        # Additional verification
-        verify_result = subprocess.run([
-            'codesign', '--verify', '--verbose', str(app_path)
-        ], capture_output=True, text=True, timeout=30)
+        verify_result = run_tool(['codesign', '--verify', '--verbose', str(app_path)])
+        if verify_result.returncode < 0:
+            raise subprocess.SubprocessError(f"codesign was killed by signal {-verify_result.returncode}")
         
         if verify_result.returncode != 0:
             info['signature_status'] += ' (Verification Failed)'
             
-    except (subprocess.TimeoutExpired, subprocess.SubprocessError) as e:
+    except ToolUnavailableError as e:
+        info['signature_status'] += ' (Verification Unavailable)'
+        info['error'] = str(e)
+        bundle.tool_failures.append(f"codesign --verify: {e}")
+    except (subprocess.TimeoutExpired, subprocess.SubprocessError, OSError) as e:
         info['error'] = str(e)
-        logger.debug(f"Code signing check failed for {app_path}: {e}")
+        bundle.tool_failures.append(f"codesign --verify: {e}")
+        logger.debug(f"Code signing verification failed for {app_path}: {e}")
     
     return info
 
-def extract_entitlements(app_path: Path) -> Optional[str]:
+def format_entitlements_xml(raw_xml: str, app_path: Path) -> str:
     """
-    Extract and format entitlements from an application.
+    Format raw entitlements XML from codesign with a header comment.
     
     Args:
+        raw_xml: Entitlements plist as printed by codesign
         app_path: Path to the .app bundle
         
     Returns:
-        Entitlements as nicely formatted XML string, or None if not found
+        Entitlements as nicely formatted XML string
     """
     try:
-        result = subprocess.run([
-            'codesign', '-d', '--entitlements', ':-', str(app_path)
-        ], capture_output=True, text=True, timeout=30)
+        # Parse the XML
+        root = ET.fromstring(raw_xml)
         
-        raw_xml = None
-        if result.returncode == 0 and result.stdout.strip():
-            raw_xml = result.stdout
-        else:
-            # Try alternative method for some apps
-            result = subprocess.run([
-                'codesign', '--display', '--entitlements', ':-', str(app_path)
-            ], capture_output=True, text=True, timeout=30)
-            
-            if result.returncode == 0 and result.stdout.strip():
-                raw_xml = result.stdout
+        # Create a formatted XML string with proper indentation
+        ET.indent(root, space="  ", level=0)
+        formatted_xml = ET.tostring(root, encoding='unicode', xml_declaration=True)
         
-        if raw_xml:
-            # Format the XML nicely
-            try:
-                # Parse the XML
-                root = ET.fromstring(raw_xml)
-                
-                # Create a formatted XML string with proper indentation
-                ET.indent(root, space="  ", level=0)
-                formatted_xml = ET.tostring(root, encoding='unicode', xml_declaration=True)
-                
-                # Add a header comment for clarity
-                header = f"""<!-- Entitlements for {app_path.name} -->
+        # Add a header comment for clarity
+        header = f"""<!-- Entitlements for {app_path.name} -->
 
 """
-                return header + formatted_xml
-                
-            except ET.ParseError as e:
-                logger.debug(f"XML parsing failed for {app_path}, returning raw data: {e}")
-                # If parsing fails, at least clean up the raw XML a bit
-                lines = raw_xml.strip().split('\n')
-                cleaned_lines = []
-                for line in lines:
-                    stripped = line.strip()
-                    if stripped:  # Skip empty lines
-                        cleaned_lines.append(stripped)
-                
-                # Add basic indentation
-                formatted_lines = []
-                indent_level = 0
-                for line in cleaned_lines:
-                    if line.startswith('</') and not line.startswith('<?'):
-                        indent_level = max(0, indent_level - 1)
-                    
-                    formatted_lines.append('  ' * indent_level + line)
-                    
-                    if line.startswith('<') and not line.startswith('<?') and not line.startswith('</') and not line.endswith('/>'):
-                        indent_level += 1
-                
-                header = f"""<!-- Entitlements for {app_path.name} -->
+        return header + formatted_xml
+        
+    except ET.ParseError as e:
+        logger.debug(f"XML parsing failed for {app_path}, returning raw data: {e}")
+        # If parsing fails, at least clean up the raw XML a bit
+        lines = raw_xml.strip().split('\n')
+        cleaned_lines = []
+        for line in lines:
+            stripped = line.strip()
+            if stripped:  # Skip empty lines
+                cleaned_lines.append(stripped)
+        
+        # Add basic indentation
+        formatted_lines = []
+        indent_level = 0
+        for line in cleaned_lines:
+            if line.startswith('</') and not line.startswith('<?'):
+                indent_level = max(0, indent_level - 1)
+            
+            formatted_lines.append('  ' * indent_level + line)
+            
+            if line.startswith('<') and not line.startswith('<?') and not line.startswith('</') and not line.endswith('/>'):
+                indent_level += 1
+        
+        header = f"""<!-- Entitlements for {app_path.name} -->
 <!-- Note: XML formatting may be basic due to parsing issues -->
 
 """
-                return header + '\n'.join(formatted_lines)
-                
-    except (subprocess.TimeoutExpired, subprocess.SubprocessError) as e:
-        logger.debug(f"Entitlements extraction failed for {app_path}: {e}")
+        return header + '\n'.join(formatted_lines)
+
+def extract_entitlements(app_path: Path, bundle: Optional[BundleContext] = None) -> Optional[str]:
+    """
+    Extract and format entitlements from an application.
+    
+    The entitlements come from the same codesign invocation as the signing
+    details, so no extra process is spawned when a bundle context is shared.
+    
+    Args:
+        app_path: Path to the .app bundle
+        bundle: Shared bundle context (created if not given)
+        
+    Returns:
+        Entitlements as nicely formatted XML string, or None if not found
+    """
+    bundle = bundle or BundleContext(app_path)
+    _, raw_xml = bundle.codesign_probe()
+    
+    if raw_xml:
+        return format_entitlements_xml(raw_xml, app_path)
     
     return None
 
-def extract_info_plist(app_path: Path) -> Optional[str]:
+def extract_info_plist(app_path: Path, bundle: Optional[BundleContext] = None) -> Optional[str]:
     """
     Extract and format Info.plist from an application as nicely formatted XML.
     
     Args:
         app_path: Path to the .app bundle
+        bundle: Shared bundle context (created if not given)
         
     Returns:
         Formatted Info.plist as XML string, or None if not found
     """
-    info_plist_path = app_path / "Contents" / "Info.plist"
+    bundle = bundle or BundleContext(app_path)
+    plist_data = bundle.info_plist
     
-    if not info_plist_path.exists():
+    if plist_data is None:
         return None
     
-    try:
-        # Use plutil to convert to nicely formatted XML
-        result = subprocess.run([
-            'plutil', '-convert', 'xml1', '-o', '-', str(info_plist_path)
-        ], capture_output=True, text=True, timeout=30)
-        
-        if result.returncode == 0 and result.stdout.strip():
-            raw_xml = result.stdout
-            
-            try:
-                # Parse and reformat the XML for consistent indentation
-                root = ET.fromstring(raw_xml)
-                ET.indent(root, space="  ", level=0)
-                formatted_xml = ET.tostring(root, encoding='unicode', xml_declaration=True)
-                
-                # Add a header comment for clarity
-                header = f"""<!-- Info.plist for {app_path.name} -->
-<!-- Source: {info_plist_path} -->
+    header = f"""<!-- Info.plist for {app_path.name} -->
+<!-- Source: {bundle.info_plist_path} -->
 
 """
-                return header + formatted_xml
-                
-            except ET.ParseError as e:
-                logger.debug(f"XML formatting failed for {app_path}, returning raw plutil output: {e}")
-                # Add basic header even if formatting fails
-                header = f"""<!-- Info.plist for {app_path.name} -->
-<!-- Source: {info_plist_path} -->
-
-"""
-                return header + raw_xml
-        
-    except (subprocess.TimeoutExpired, subprocess.SubprocessError) as e:
-        logger.debug(f"plutil conversion failed for {app_path}: {e}")
     
-    # Fallback: try reading the plist directly and convert manually
     try:
-        with open(info_plist_path, 'rb') as f:
-            plist_data = plistlib.load(f)
-        
-        # Convert back to plist XML format using plistlib
-        xml_bytes = plistlib.dumps(plist_data, fmt=plistlib.FMT_XML)
-        raw_xml = xml_bytes.decode('utf-8')
-        
         try:
-            # Parse and reformat for consistent indentation
-            root = ET.fromstring(raw_xml)
-            ET.indent(root, space="  ", level=0)
-            formatted_xml = ET.tostring(root, encoding='unicode', xml_declaration=True)
-            
-            header = f"""<!-- Info.plist for {app_path.name} -->
-<!-- Source: {info_plist_path} -->
-
-"""
-            return header + formatted_xml
-            
-        except ET.ParseError:
-            # Last resort: return raw XML with header
-            header = f"""<!-- Info.plist for {app_path.name} -->
-<!-- Source: {info_plist_path} -->
-
-"""
-            return header + raw_xml
-        
-    except (OSError, plistlib.InvalidFileException) as e:
-        logger.debug(f"Direct plist reading failed for {app_path}: {e}")
+            plist_xml = format_plist_xml(plist_data)
+        except ValueError as e:
+            logger.debug(f"Escaping control characters in the Info.plist of {app_path}: {e}")
+            plist_xml = format_plist_xml(escape_plist_control_characters(plist_data))
+        return header + plist_xml
+    except (TypeError, OverflowError, ValueError, ET.ParseError) as e:
+        logger.debug(f"Info.plist formatting failed for {app_path}: {e}")
     
     return None
 
-def analyze_sandbox_info(app_path: Path, info_plist_data: Optional[str], entitlements: Optional[str]) -> Dict[str, str]:
+# Entitlements looked up by analyze_sandbox_info()
+SANDBOX_ENTITLEMENT = 'com.apple.security.app-sandbox'
+DISABLE_LIBRARY_VALIDATION_ENTITLEMENT = 'com.apple.security.cs.disable-library-validation'
+HARDENED_RUNTIME_EXCEPTIONS = (
+    'com.apple.security.cs.allow-jit',
+    'com.apple.security.cs.allow-unsigned-executable-memory',
+)
+# Hardened runtime exception entitlements; their presence implies the runtime is enabled
+HARDENED_RUNTIME_ENTITLEMENTS = HARDENED_RUNTIME_EXCEPTIONS + (
+    'com.apple.security.cs.allow-dyld-environment-variables',
+    DISABLE_LIBRARY_VALIDATION_ENTITLEMENT,
+    'com.apple.security.cs.disable-executable-page-protection',
+    'com.apple.security.cs.debugger',
+)
+
+def analyze_sandbox_info(app_path: Path, info_plist_data, entitlements_data) -> Dict[str, str]:
     """
     Analyze sandbox information for an application.
     
     Args:
         app_path: Path to the .app bundle
-        info_plist_data: Info.plist data as XML string
-        entitlements: Entitlements as XML string
+        info_plist_data: Parsed Info.plist dictionary (XML text is also accepted)
+        entitlements_data: Parsed entitlements dictionary (XML text is also accepted)
         
     Returns:
         Dictionary with sandbox analysis
@@ -333,93 +802,62 @@ def analyze_sandbox_info(app_path: Path, info_plist_data: Optional[str], entitle
         'analysis_notes': []
     }
     
-    # Check entitlements for sandbox indicators
-    if entitlements:
+    entitlements = None
+    if isinstance(entitlements_data, str) and entitlements_data:
         try:
-            # Count entitlements
-            entitlement_lines = [line for line in entitlements.split('\n') if '<key>' in line and '</key>' in line]
-            sandbox_info['entitlements_count'] = str(len(entitlement_lines))
-            
-            # Check for sandbox entitlement
-            if 'com.apple.security.app-sandbox' in entitlements:
-                if '<true/>' in entitlements.split('com.apple.security.app-sandbox')[1].split('</dict>')[0]:
-                    sandbox_info['sandboxed'] = 'Yes'
-                    sandbox_info['sandbox_type'] = 'App Sandbox'
-                else:
-                    sandbox_info['sandboxed'] = 'No'
-            
-            # Check for hardened runtime
-            if 'com.apple.security.cs.allow-jit' in entitlements or 'com.apple.security.cs.allow-unsigned-executable-memory' in entitlements:
-                sandbox_info['hardened_runtime'] = 'Yes (with exceptions)'
-            elif any(key in entitlements for key in ['com.apple.security.cs.', 'hardened-runtime']):
-                sandbox_info['hardened_runtime'] = 'Yes'
-            
-            # Check for library validation
-            if 'com.apple.security.cs.disable-library-validation' in entitlements:
-                sandbox_info['library_validation'] = 'Disabled'
-            else:
-                sandbox_info['library_validation'] = 'Enabled'
-            
-        except Exception as e:
+            entitlements = load_plist_string(entitlements_data)
+        except ValueError as e:
             sandbox_info['analysis_notes'].append(f"Entitlements parsing error: {e}")
+    elif isinstance(entitlements_data, dict):
+        entitlements = entitlements_data
+    
+    # Check entitlements for sandbox indicators
+    if entitlements is not None:
+        sandbox_info['entitlements_count'] = str(len(entitlements))
+        
+        if SANDBOX_ENTITLEMENT in entitlements:
+            if entitlements[SANDBOX_ENTITLEMENT] is True:
+                sandbox_info['sandboxed'] = 'Yes'
+                sandbox_info['sandbox_type'] = 'App Sandbox'
+            else:
+                sandbox_info['sandboxed'] = 'No'
+        
+        if any(entitlements.get(key) is True for key in HARDENED_RUNTIME_EXCEPTIONS):
+            sandbox_info['hardened_runtime'] = 'Yes (with exceptions)'
+        elif any(key in entitlements for key in HARDENED_RUNTIME_ENTITLEMENTS):
+            sandbox_info['hardened_runtime'] = 'Yes'
+        
+        if entitlements.get(DISABLE_LIBRARY_VALIDATION_ENTITLEMENT) is True:
+            sandbox_info['library_validation'] = 'Disabled'
+        else:
+            sandbox_info['library_validation'] = 'Enabled'
     
     # Check Info.plist for additional sandbox indicators
-    if info_plist_data:
+    plist_dict = None
+    if isinstance(info_plist_data, str):
         try:
-            # Parse XML plist data
-            # First, try to extract just the plist content (remove comments)
-            plist_content = info_plist_data
-            if '<?xml' in plist_content:
-                # Find the start of the actual plist
-                plist_start = plist_content.find('<?xml')
-                plist_content = plist_content[plist_start:]
-            
-            # Parse the XML and convert to a dictionary
-            root = ET.fromstring(plist_content)
-            
-            # Find the main dict element
-            dict_element = root.find('dict')
-            if dict_element is not None:
-                # Parse plist dict structure
-                plist_dict = {}
-                children = list(dict_element)
-                for i in range(0, len(children), 2):
-                    if i + 1 < len(children) and children[i].tag == 'key':
-                        key = children[i].text
-                        value_elem = children[i + 1]
-                        
-                        # Extract value based on type
-                        if value_elem.tag == 'true':
-                            plist_dict[key] = True
-                        elif value_elem.tag == 'false':
-                            plist_dict[key] = False
-                        elif value_elem.tag == 'string':
-                            plist_dict[key] = value_elem.text or ''
-                        elif value_elem.tag == 'integer':
-                            plist_dict[key] = int(value_elem.text or 0)
-                        else:
-                            plist_dict[key] = value_elem.text or ''
-                
-                # Check for LSUIElement (background app)
-                if plist_dict.get('LSUIElement'):
-                    sandbox_info['analysis_notes'].append('Background app (LSUIElement)')
-                
-                # Check for LSBackgroundOnly
-                if plist_dict.get('LSBackgroundOnly'):
-                    sandbox_info['analysis_notes'].append('Background only app')
-                
-                # Check for specific frameworks that indicate sandboxing
-                if plist_dict.get('LSRequiresIPhoneOS'):
-                    sandbox_info['analysis_notes'].append('iOS app on macOS')
-                
-                # Check for app transport security
-                if 'NSAppTransportSecurity' in plist_dict:
-                    sandbox_info['analysis_notes'].append('Uses App Transport Security')
-                    
-        except (ET.ParseError, ValueError) as e:
+            plist_dict = load_plist_string(info_plist_data)
+        except ValueError as e:
             sandbox_info['analysis_notes'].append(f"Info.plist XML parsing error: {e}")
-        except Exception as e:
-            sandbox_info['analysis_notes'].append(f"Info.plist analysis error: {e}")
+    elif isinstance(info_plist_data, dict):
+        plist_dict = info_plist_data
+    
+    if plist_dict is not None:
+        # Check for LSUIElement (background app)
+        if plist_dict.get('LSUIElement'):
+            sandbox_info['analysis_notes'].append('Background app (LSUIElement)')
+        
+        # Check for LSBackgroundOnly
+        if plist_dict.get('LSBackgroundOnly'):
+            sandbox_info['analysis_notes'].append('Background only app')
+        
+        # Check for specific frameworks that indicate sandboxing
+        if plist_dict.get('LSRequiresIPhoneOS'):
+            sandbox_info['analysis_notes'].append('iOS app on macOS')
+        
+        # Check for app transport security
+        if 'NSAppTransportSecurity' in plist_dict:
+            sandbox_info['analysis_notes'].append('Uses App Transport Security')
     
     # Additional system-level checks
     try:
@@ -464,9 +902,9 @@ def find_sdef_files() -> Set[Path]:
             logger.info(f"Searching in: {expanded_path}")
             try:
                 # Use find command for better performance on large directories
-                result = subprocess.run([
+                result = run_tool([
                     'find', str(expanded_path), '-name', '*.sdef', '-type', 'f'
-                ], capture_output=True, text=True, timeout=300)
+                ], timeout=300)
                 
                 if result.returncode == 0:
                     for line in result.stdout.strip().split('\n'):
@@ -602,158 +1040,223 @@ def copy_sdef_file(sdef_path: Path, data_dir: Path) -> bool:
         logger.error(f"Failed to copy {sdef_path}: {e}")
         return False
 
-def extract_app_icon(app_path: Path, app_dir: Path) -> Optional[str]:
+def convert_icon_with_icns_reader(icon_path: Path, output_path: Path, size: Optional[int] = None) -> bool:
     """
-    Extract and convert app icon to PNG format.
+    Copy the PNG embedded in an .icns file out without spawning a process.
     
     Args:
-        app_path: Path to the .app bundle
-        app_dir: Application data directory where icon should be saved
+        icon_path: Source icon
+        output_path: Destination PNG path
+        size: Wanted width in pixels (closest embedded size at least that wide); None for the largest
         
     Returns:
-        Relative path to the extracted icon, or None if not found
+        True if the PNG was written, False for other formats and legacy RLE-only icons
     """
+    if icon_path.suffix.lower() != '.icns':
+        return False
     try:
-        # First, try to find the icon file from Info.plist
-        info_plist_path = app_path / "Contents" / "Info.plist"
-        icon_filename = None
-        
-        if info_plist_path.exists():
-            try:
-                with open(info_plist_path, 'rb') as f:
-                    plist_data = plistlib.load(f)
-                    icon_filename = plist_data.get('CFBundleIconFile')
-                    
-                    # Some apps might use CFBundleIcons instead
-                    if not icon_filename:
-                        icons_dict = plist_data.get('CFBundleIcons')
-                        if icons_dict and isinstance(icons_dict, dict):
-                            primary_icon = icons_dict.get('CFBundlePrimaryIcon')
-                            if primary_icon and isinstance(primary_icon, dict):
-                                icon_files = primary_icon.get('CFBundleIconFiles')
-                                if icon_files and isinstance(icon_files, list) and icon_files:
-                                    icon_filename = icon_files[0]
-            except Exception as e:
-                logger.debug(f"Could not read Info.plist for {app_path.name}: {e}")
-        
-        # Look for icon files in Resources directory
-        resources_dir = app_path / "Contents" / "Resources"
-        icon_path = None
-        
-        if icon_filename:
-            # Try the exact filename
-            potential_paths = [
-                resources_dir / icon_filename,
-                resources_dir / f"{icon_filename}.icns",
-                resources_dir / f"{icon_filename}.png"
-            ]
-            
-            for potential_path in potential_paths:
-                if potential_path.exists():
-                    icon_path = potential_path
-                    break
-        
-        # If no icon found via plist, search for common icon files
-        if not icon_path and resources_dir.exists():
-            common_icon_names = [
-                "AppIcon.icns", "app.icns", "icon.icns", "Icon.icns",
-                f"{app_path.stem}.icns", f"{app_path.stem.lower()}.icns"
-            ]
-            
-            for icon_name in common_icon_names:
-                potential_path = resources_dir / icon_name
-                if potential_path.exists():
-                    icon_path = potential_path
-                    break
-            
-            # If still no icon, try any .icns file
-            if not icon_path:
-                icns_files = list(resources_dir.glob("*.icns"))
-                if icns_files:
-                    # Use the first .icns file found
-                    icon_path = icns_files[0]
-        
-        if not icon_path:
-            logger.debug(f"No icon found for {app_path.name}")
-            return None
+        return extract_png(icon_path, output_path, size)
+    except (OSError, IcnsError) as e:
+        logger.debug(f"Could not read {icon_path} natively: {e}")
+        return False
+
+def convert_icon_with_sips(icon_path: Path, output_path: Path, size: Optional[int] = None) -> bool:
+    """
+    Convert an icon to PNG using sips (available on macOS).
+    
+    Args:
+        icon_path: Source icon (.icns or any format sips understands)
+        output_path: Destination PNG path
+        size: Resample so the longest side is at most this many pixels
         
-        # Convert icon to PNG using sips (available on macOS)
-        output_icon_path = app_dir / "icon.png"
+    Returns:
+        True if the PNG was written
+    """
+    args = ['sips', '-s', 'format', 'png', str(icon_path), '--out', str(output_path)]
+    if size is not None:
+        args[1:1] = ['-Z', str(size)]
+    try:
+        result = run_tool(args)
+        if result.returncode == 0 and output_path.exists():
+            return True
+        logger.debug(f"sips failed for {icon_path}: {result.stderr.strip()}")
+    except (subprocess.TimeoutExpired, subprocess.SubprocessError, OSError) as e:
+        logger.debug(f"sips failed for {icon_path}: {e}")
+    return False
+
+# Tried in order until one succeeds: sips is only needed for legacy icons
+DEFAULT_ICON_CONVERTERS = (convert_icon_with_icns_reader, convert_icon_with_sips)
+
+class IconPipeline:
+    """
+    Converts app icons to PNG through a chain of converters, with an optional
+    content-addressed cache.
+    
+    Converted PNGs are cached as <cache_dir>/<sha256 of source icon>.png, so an
+    icon that has not changed is never converted again, even across runs.
+    PNG sources are copied as-is. A converter is any callable taking
+    (source path, output path, size) and returning True on success; the
+    converters are tried in order until one succeeds.
+    """
+    
+    def __init__(self, cache_dir: Optional[Path] = None,
+                 converters: Sequence[Callable[[Path, Path, Optional[int]], bool]] = DEFAULT_ICON_CONVERTERS,
+                 size: Optional[int] = None):
+        self.cache_dir = cache_dir
+        self.converters = list(converters)
+        self.size = size
+        self.stats = Counter()
+        self.converter_stats = Counter()
+        self._lock = threading.Lock()
+    
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+    
+    def convert(self, icon_path: Path, output_path: Path) -> bool:
+        """
+        Write icon_path to output_path as PNG.
         
-        try:
-            # Use sips to convert icns to png
-            result = subprocess.run([
-                'sips', '-s', 'format', 'png', str(icon_path), '--out', str(output_icon_path)
-            ], capture_output=True, text=True, timeout=30)
+        Args:
+            icon_path: Source icon file
+            output_path: Destination PNG path
             
-            if result.returncode == 0 and output_icon_path.exists():
-                logger.debug(f"Extracted icon for {app_path.name}")
-                return "icon.png"
-            else:
-                logger.debug(f"Failed to convert icon for {app_path.name}: {result.stderr}")
-                
-                # Fallback: if it's already a PNG, just copy it
-                if icon_path.suffix.lower() == '.png':
-                    shutil.copy2(icon_path, output_icon_path)
-                    return "icon.png"
-                
-        except (subprocess.TimeoutExpired, subprocess.SubprocessError) as e:
-            logger.debug(f"Icon conversion failed for {app_path.name}: {e}")
+        Returns:
+            True if the PNG was written
+        """
+        if icon_path.suffix.lower() == '.png':
+            shutil.copyfile(icon_path, output_path)
+            self._count('copied')
+            return True
         
-        return None
+        cached_path = None
+        if self.cache_dir is not None:
+            digest = hashlib.sha256(icon_path.read_bytes()).hexdigest()
+            size_suffix = f"-{self.size}" if self.size is not None else ""
+            cached_path = self.cache_dir / f"{digest}{size_suffix}.png"
+            if cached_path.exists():
+                shutil.copyfile(cached_path, output_path)
+                self._count('cache_hits')
+                return True
         
-    except Exception as e:
-        logger.debug(f"Icon extraction failed for {app_path.name}: {e}")
-        return None
+        converter = next((c for c in self.converters if c(icon_path, output_path, self.size)), None)
+        if converter is None:
+            self._count('failed')
+            return False
+        self._count('converted')
+        with self._lock:
+            self.converter_stats[getattr(converter, '__name__', repr(converter))] += 1
+        
+        if cached_path is not None:
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                # Write under a unique name first so concurrent workers never see a partial file
+                tmp_path = cached_path.with_name(f"{cached_path.name}.{threading.get_ident()}.tmp")
+                shutil.copyfile(output_path, tmp_path)
+                os.replace(tmp_path, cached_path)
+            except OSError as e:
+                logger.debug(f"Could not cache icon {icon_path}: {e}")
+        return True
 
-def process_application(app_path: Path, data_dir: Path) -> bool:
+def find_app_icon(app_path: Path, bundle: Optional[BundleContext] = None) -> Optional[Path]:
     """
-    Process a single application and collect all its data.
+    Locate a bundle's icon file.
     
     Args:
         app_path: Path to the .app bundle
-        data_dir: Base data directory
+        bundle: Shared bundle context (created if not given)
         
     Returns:
-        True if any data was collected, False otherwise
+        Path to the icon file, or None if not found
     """
-    app_name = get_application_name(app_path)
-    app_dir = data_dir / app_name
+    # First, try to find the icon file from Info.plist
+    bundle = bundle or BundleContext(app_path)
+    icon_filename = bundle.icon_filename
     
-    try:
-        # Create application directory
-        app_dir.mkdir(parents=True, exist_ok=True)
+    # Look for icon files in Resources directory
+    resources_dir = app_path / "Contents" / "Resources"
+    
+    if icon_filename:
+        # Try the exact filename
+        potential_paths = [
+            resources_dir / icon_filename,
+            resources_dir / f"{icon_filename}.icns",
+            resources_dir / f"{icon_filename}.png"
+        ]
         
-        collected_data = False
+        for potential_path in potential_paths:
+            if potential_path.exists():
+                return potential_path
+    
+    # If no icon found via plist, search for common icon files
+    if resources_dir.exists():
+        common_icon_names = [
+            "AppIcon.icns", "app.icns", "icon.icns", "Icon.icns",
+            f"{app_path.stem}.icns", f"{app_path.stem.lower()}.icns"
+        ]
         
-        # 1. Collect SDEF files
-        sdef_count = 0
-        for sdef_file in app_path.rglob("*.sdef"):
-            if sdef_file.is_file():
-                # Use the existing copy_sdef_file but modify for new structure
-                sdef_dir = app_dir / "sdef"
-                sdef_dir.mkdir(exist_ok=True)
-                
-                dest_path = sdef_dir / sdef_file.name
-                counter = 1
-                original_dest = dest_path
-                while dest_path.exists():
-                    name_parts = original_dest.stem, counter, original_dest.suffix
-                    dest_path = sdef_dir / f"{name_parts[0]}_{name_parts[1]}{name_parts[2]}"
-                    counter += 1
-                
-                try:
-                    shutil.copy2(sdef_file, dest_path)
-                    sdef_count += 1
-                    collected_data = True
-                except (OSError, PermissionError) as e:
-                    logger.debug(f"Failed to copy SDEF {sdef_file}: {e}")
+        for icon_name in common_icon_names:
+            potential_path = resources_dir / icon_name
+            if potential_path.exists():
+                return potential_path
         
-        # 2. Collect code signing information
-        logger.debug(f"Collecting code signing info for {app_name}")
-        codesign_info = extract_code_signing_info(app_path)
+        # If still no icon, use the first .icns file found by the bundle scan
+        icns_files = bundle.scan['icon_files']
+        if icns_files:
+            return icns_files[0]
+    
+    logger.debug(f"No icon found for {app_path.name}")
+    return None
+
+def render_app_icon(icon_path: Path, icons: Optional[IconPipeline] = None) -> Optional[bytes]:
+    """
+    Convert an icon file to PNG bytes.
+    
+    Args:
+        icon_path: Source icon (.icns or .png)
+        icons: Icon conversion pipeline (uncached sips if not given)
+        
+    Returns:
+        The PNG data, or None if conversion failed
+    """
+    icons = icons or IconPipeline()
+    with tempfile.TemporaryDirectory(prefix="icon-") as staging_dir:
+        staged_icon_path = Path(staging_dir) / "icon.png"
+        if not icons.convert(icon_path, staged_icon_path):
+            logger.debug(f"Failed to convert icon {icon_path}")
+            return None
+        return staged_icon_path.read_bytes()
+
+def extract_app_icon(app_path: Path, app_dir: Path, bundle: Optional[BundleContext] = None,
+                     icons: Optional[IconPipeline] = None) -> Optional[str]:
+    """
+    Extract and convert app icon to PNG format.
+    
+    Args:
+        app_path: Path to the .app bundle
+        app_dir: Application data directory where icon should be saved
+        bundle: Shared bundle context (created if not given)
+        icons: Icon conversion pipeline (uncached sips if not given)
+        
+    Returns:
+        Relative path to the extracted icon, or None if not found
+    """
+    try:
+        icon_path = find_app_icon(app_path, bundle)
+        data = render_app_icon(icon_path, icons) if icon_path else None
+        if data is None:
+            return None
+        write_output(app_dir / "icon.png", data)
+        logger.debug(f"Extracted icon for {app_path.name}")
+        return "icon.png"
         
-        codesign_text = f"""Code Signing Information for {app_name}
+    except Exception as e:
+        logger.debug(f"Icon extraction failed for {app_path.name}: {e}")
+        return None
+
+def format_codesign_report(app_name: str, app_path: Path, codesign_info: Dict) -> str:
+    """Render codesign_info as the text written to codesign.txt."""
+    codesign_text = f"""Code Signing Information for {app_name}
 Application Path: {app_path}
 
 Signature Status: {codesign_info['signature_status']}
@@ -762,46 +1265,49 @@ Identifier: {codesign_info['identifier']}
 Team Identifier: {codesign_info['team_identifier']}
 Sealed Resources: {codesign_info['sealed_resources']}
 """
+    
+    if codesign_info['error']:
+        codesign_text += f"\nError: {codesign_info['error']}"
+    return codesign_text
+
+# codesign.txt labels -> codesign_info keys
+CODESIGN_REPORT_FIELDS = {
+    'Signature Status': 'signature_status',
+    'Authority': 'authority',
+    'Identifier': 'identifier',
+    'Team Identifier': 'team_identifier',
+    'Sealed Resources': 'sealed_resources',
+}
+
+def parse_codesign_report(text: str) -> Tuple[Optional[str], Dict]:
+    """
+    Read back a codesign.txt written by format_codesign_report().
+    
+    Args:
+        text: Contents of codesign.txt
         
-        if codesign_info['error']:
-            codesign_text += f"\nError: {codesign_info['error']}"
-        
-        codesign_file = app_dir / "codesign.txt"
-        with open(codesign_file, 'w') as f:
-            f.write(codesign_text)
-        collected_data = True
-        
-        # 3. Collect entitlements
-        logger.debug(f"Collecting entitlements for {app_name}")
-        entitlements = extract_entitlements(app_path)
-        
-        entitlements_file = app_dir / "entitlements.plist"
-        if entitlements:
-            with open(entitlements_file, 'w') as f:
-                f.write(entitlements)
-        else:
-            with open(entitlements_file, 'w') as f:
-                f.write(f"No entitlements found for {app_name}\n")
-        collected_data = True
-        
-        # 4. Collect Info.plist
-        logger.debug(f"Collecting Info.plist for {app_name}")
-        info_plist_data = extract_info_plist(app_path)
-        
-        info_plist_file = app_dir / "info.plist"
-        if info_plist_data:
-            with open(info_plist_file, 'w') as f:
-                f.write(info_plist_data)
-        else:
-            with open(info_plist_file, 'w') as f:
-                f.write(f"{{\n  \"error\": \"No Info.plist found or could not be read for {app_name}\"\n}}")
-        collected_data = True
-        
-        # 5. Analyze sandbox information
-        logger.debug(f"Analyzing sandbox info for {app_name}")
-        sandbox_info = analyze_sandbox_info(app_path, info_plist_data, entitlements)
-        
-        sandbox_text = f"""Sandbox Analysis for {app_name}
+    Returns:
+        Tuple of (application path or None, codesign_info dict)
+    """
+    codesign_info = new_codesign_info()
+    app_path = None
+    
+    report, _, error = text.partition("\nError: ")
+    if error:
+        codesign_info['error'] = error
+    for line in report.splitlines():
+        label, separator, value = line.partition(': ')
+        if not separator:
+            continue
+        if label == 'Application Path':
+            app_path = value
+        elif label in CODESIGN_REPORT_FIELDS:
+            codesign_info[CODESIGN_REPORT_FIELDS[label]] = value
+    return app_path, codesign_info
+
+def format_sandbox_report(app_name: str, app_path: Path, sandbox_info: Dict) -> str:
+    """Render the result of analyze_sandbox_info() as the text written to sandbox.txt."""
+    sandbox_text = f"""Sandbox Analysis for {app_name}
 Application Path: {app_path}
 
 Sandboxed: {sandbox_info['sandboxed']}
@@ -812,66 +1318,847 @@ Library Validation: {sandbox_info['library_validation']}
 
 Analysis Notes:
 """
+    
+    for note in sandbox_info['analysis_notes']:
+        sandbox_text += f"- {note}\n"
+    
+    if not sandbox_info['analysis_notes']:
+        sandbox_text += "- No additional notes\n"
+    return sandbox_text
+
+def format_entitlements_json(entitlements: Dict) -> str:
+    """Render parsed entitlements as the text written to entitlements.json."""
+    return json.dumps(entitlements, indent=2, default=plist_json_default)
+
+def build_manifest(app_name: str, app_path: Path, sdef_count: int, icon_path: Optional[str],
+                   codesign_info: Dict, sandbox_info: Dict) -> Dict:
+    """Assemble the manifest.json summary the webapp reads."""
+    return {
+        "name": app_name,
+        "path": str(app_path),
+        "sdef_count": sdef_count,
+        "has_icon": icon_path is not None,
+        "icon_path": icon_path,
+        "codesign": codesign_info,
+        "sandbox": sandbox_info
+    }
+
+def format_manifest(manifest: Dict) -> str:
+    """Render a manifest as the text written to manifest.json."""
+    return json.dumps(manifest, indent=2)
+
+def write_output(path: Path, content: Union[str, bytes]) -> None:
+    """
+    Write one output file through OUTPUT_WRITER (atomically, and only if its
+    content changed), recording the time and bytes written in RUN_PROFILE.
+    """
+    data = content.encode('utf-8') if isinstance(content, str) else content
+    with RUN_PROFILE.stage('write'):
+        written = OUTPUT_WRITER.write(path, data)
+    if written:
+        RUN_PROFILE.count_bytes(len(data))
+
+def process_application(app_path: Path, data_dir: Path, verify_signature: bool = True,
+                        icons: Optional[IconPipeline] = None, sdef_store: Optional[SdefStore] = None) -> bool:
+    """
+    Process a single application and collect all its data.
+    
+    Time spent in each stage, tool spawns and bytes written are recorded in
+    RUN_PROFILE under the application's name.
+    
+    Args:
+        app_path: Path to the .app bundle
+        data_dir: Base data directory
+        verify_signature: Run `codesign --verify` in addition to the display probe
+        icons: Icon conversion pipeline (uncached sips if not given)
+        sdef_store: Blob store for SDEF files (data_dir/_blobs if not given)
+        
+    Returns:
+        True if any data was collected, False otherwise
+    """
+    return collect_application(app_path, data_dir, verify_signature, icons, sdef_store) != STATUS_FAILED
+
+def collect_application(app_path: Path, data_dir: Path, verify_signature: bool = True,
+                        icons: Optional[IconPipeline] = None, sdef_store: Optional[SdefStore] = None) -> str:
+    """
+    Process a single application like process_application(), returning its result status.
+    
+    Returns:
+        STATUS_PROCESSED, STATUS_INCOMPLETE if an external tool failed while
+        collecting (see application_status), or STATUS_FAILED
+    """
+    app_name = get_application_name(app_path)
+    with RUN_PROFILE.app(app_name):
+        return _collect_application_data(app_path, data_dir / app_name, data_dir, verify_signature,
+                                         icons, sdef_store)
+
+def _collect_application_data(app_path: Path, app_dir: Path, data_dir: Path, verify_signature: bool,
+                              icons: Optional[IconPipeline], sdef_store: Optional[SdefStore]) -> str:
+    try:
+        extracted = extract_application_data(app_path, verify_signature, icons)
+        analyzed = analyze_application_data(app_dir.name, extracted)
+        if not write_application_data(app_dir, data_dir, analyzed, sdef_store):
+            return STATUS_FAILED
+    except Exception as e:
+        log_application_failure(app_path, e)
+        return STATUS_FAILED
+    return application_status(app_dir.name, extracted)
+
+def log_application_failure(app_path: Path, error: Exception) -> None:
+    """
+    Log why an application could not be processed.
+    
+    Any exception only fails the application it came from, so the rest of the
+    run continues; unexpected ones (not OSError) are logged with a traceback.
+    """
+    if isinstance(error, OSError):
+        logger.error(f"Failed to process application {app_path}: {error}")
+    else:
+        logger.error(f"Unexpected error processing application {app_path}: {error!r}", exc_info=True)
+
+def application_status(app_name: str, extracted: Dict) -> str:
+    """
+    Status of an application whose data was written.
+    
+    Fields an external tool could not fill in (it timed out, crashed or was
+    skipped by the circuit breaker) are written as errors or "Unavailable",
+    so such an application is STATUS_INCOMPLETE: it is kept out of the
+    fingerprint index and the journal's completions and collected again by
+    the next run.
+    
+    Args:
+        app_name: Application (data directory) name
+        extracted: Result of extract_application_data()
         
-        for note in sandbox_info['analysis_notes']:
-            sandbox_text += f"- {note}\n"
-        
-        if not sandbox_info['analysis_notes']:
-            sandbox_text += "- No additional notes\n"
-        
-        sandbox_file = app_dir / "sandbox.txt"
-        with open(sandbox_file, 'w') as f:
-            f.write(sandbox_text)
-        collected_data = True
-        
-        # 6. Extract app icon
-        logger.debug(f"Extracting icon for {app_name}")
-        icon_path = extract_app_icon(app_path, app_dir)
-        if icon_path:
-            logger.debug(f"Icon extracted for {app_name}: {icon_path}")
-        
-        # 7. Create JSON manifest for the app
-        manifest = {
-            "name": app_name,
-            "path": str(app_path),
-            "sdef_count": sdef_count,
-            "has_icon": icon_path is not None,
-            "icon_path": icon_path,
-            "codesign": codesign_info,
-            "sandbox": sandbox_info
-        }
-        
-        manifest_file = app_dir / "manifest.json"
-        with open(manifest_file, 'w') as f:
-            json.dump(manifest, f, indent=2)
-        collected_data = True
-        
-        # 6. Extract app icon
-        logger.debug(f"Extracting app icon for {app_name}")
-        icon_path = extract_app_icon(app_path, app_dir)
-        
-        if icon_path:
-            # If icon extraction was successful, move the icon to the app directory
-            shutil.move(icon_path, app_dir / "icon.png")
-            logger.info(f"Extracted app icon for {app_name}")
+    Returns:
+        STATUS_INCOMPLETE or STATUS_PROCESSED
+    """
+    if extracted['tool_failures']:
+        logger.warning(f"Incomplete data for {app_name}, collecting it again next run: "
+                       f"{'; '.join(extracted['tool_failures'])}")
+        return STATUS_INCOMPLETE
+    return STATUS_PROCESSED
+
+def extract_application_data(app_path: Path, verify_signature: bool = True,
+                             icons: Optional[IconPipeline] = None) -> Dict:
+    """
+    Read everything collected about a bundle, without writing to data/.
+    
+    This is the I/O-bound part of processing an application (bundle walk,
+    code signature, plists, icon conversion).
+    
+    Args:
+        app_path: Path to the .app bundle
+        verify_signature: Run `codesign --verify` in addition to the display probe
+        icons: Icon conversion pipeline (uncached sips if not given)
+        
+    Returns:
+        Dictionary with the bundle's SDEF files, codesign info, raw and parsed
+        entitlements, Info.plist text and parsed dict, PNG icon bytes, and
+        the external tool calls that failed
+    """
+    app_name = get_application_name(app_path)
+    bundle = BundleContext(app_path)
+    
+    # 1. Find SDEF files
+    with RUN_PROFILE.stage('sdef'):
+        scan = bundle.scan
+        logger.debug(f"Scanned {app_name}: {scan['file_count']} files in {scan['dir_count']} directories "
+                     f"({scan['pruned_dirs']} pruned)")
+    
+    # 2. Collect code signing information
+    logger.debug(f"Collecting code signing info for {app_name}")
+    with RUN_PROFILE.stage('codesign'):
+        codesign_info = extract_code_signing_info(app_path, bundle, verify=verify_signature)
+    
+    # 3. Collect entitlements
+    logger.debug(f"Collecting entitlements for {app_name}")
+    with RUN_PROFILE.stage('entitlements'):
+        entitlements = extract_entitlements(app_path, bundle)
+        parsed_entitlements = bundle.entitlements
+    
+    # 4. Collect Info.plist
+    logger.debug(f"Collecting Info.plist for {app_name}")
+    with RUN_PROFILE.stage('info_plist'):
+        info_plist_data = extract_info_plist(app_path, bundle)
+    
+    # 5. Convert the app icon
+    logger.debug(f"Extracting icon for {app_name}")
+    with RUN_PROFILE.stage('icon'):
+        icon = None
+        try:
+            icon_path = find_app_icon(app_path, bundle)
+            icon = render_app_icon(icon_path, icons) if icon_path else None
+        except Exception as e:
+            logger.debug(f"Icon extraction failed for {app_path.name}: {e}")
+    
+    return {
+        'app_path': app_path,
+        'sdef_files': scan['sdef_files'],
+        'codesign_info': codesign_info,
+        'entitlements': entitlements,
+        'parsed_entitlements': parsed_entitlements,
+        'info_plist_data': info_plist_data,
+        'info_plist': bundle.info_plist,
+        'icon': icon,
+        'tool_failures': bundle.tool_failures,
+    }
+
+def analyze_application_data(app_name: str, extracted: Dict) -> Dict:
+    """
+    Derive the per-app reports from extract_application_data() output.
+    
+    Args:
+        app_name: Application (data directory) name
+        extracted: Result of extract_application_data()
+        
+    Returns:
+        The extracted data plus sandbox_info and the report files to write,
+        as a list of (file name, content) where None means "remove the file"
+    """
+    app_path = extracted['app_path']
+    entitlements = extracted['entitlements']
+    parsed_entitlements = extracted['parsed_entitlements']
+    
+    logger.debug(f"Analyzing sandbox info for {app_name}")
+    with RUN_PROFILE.stage('sandbox'):
+        sandbox_info = analyze_sandbox_info(
+            app_path, extracted['info_plist'],
+            parsed_entitlements if parsed_entitlements is not None else entitlements
+        )
+    
+    files = [
+        ("codesign.txt", format_codesign_report(app_name, app_path, extracted['codesign_info'])),
+        ("entitlements.plist", entitlements or f"No entitlements found for {app_name}\n"),
+        # Machine-readable copy of the parsed entitlements ({} when there are none)
+        ("entitlements.json", format_entitlements_json(parsed_entitlements or {})
+         if parsed_entitlements is not None or not entitlements else None),
+        ("info.plist", extracted['info_plist_data'] or
+         f"{{\n  \"error\": \"No Info.plist found or could not be read for {app_name}\"\n}}"),
+        ("sandbox.txt", format_sandbox_report(app_name, app_path, sandbox_info)),
+    ]
+    return dict(extracted, app_name=app_name, sandbox_info=sandbox_info, files=files)
+
+def write_application_data(app_dir: Path, data_dir: Path, analyzed: Dict,
+                           sdef_store: Optional[SdefStore] = None) -> bool:
+    """
+    Write an application's data directory from analyze_application_data() output.
+    
+    Args:
+        app_dir: Application directory in data/
+        data_dir: Base data directory
+        analyzed: Result of analyze_application_data()
+        sdef_store: Blob store for SDEF files (data_dir/_blobs if not given)
+        
+    Returns:
+        True if any data was collected, False otherwise
+    """
+    app_name = app_dir.name
+    app_dir.mkdir(parents=True, exist_ok=True)
+    
+    with RUN_PROFILE.stage('sdef'):
+        sdef_store = sdef_store or SdefStore(data_dir)
+        sdef_count = 0
+        for sdef_file in analyzed['sdef_files']:
+            try:
+                sdef_store.add_to_app(app_dir, sdef_file)
+                sdef_count += 1
+            except OSError as e:
+                logger.debug(f"Failed to store SDEF {sdef_file}: {e}")
+    
+    for file_name, content in analyzed['files']:
+        if content is None:
+            OUTPUT_WRITER.remove(app_dir / file_name)
         else:
-            logger.debug(f"No app icon found for {app_name}")
+            write_output(app_dir / file_name, content)
+    
+    icon_path = None
+    if analyzed['icon'] is not None:
+        write_output(app_dir / "icon.png", analyzed['icon'])
+        icon_path = "icon.png"
+        logger.debug(f"Icon extracted for {app_name}: {icon_path}")
+    else:
+        # Drop the icon of an earlier version that had one
+        OUTPUT_WRITER.remove(app_dir / "icon.png")
+        logger.debug(f"No app icon found for {app_name}")
+    
+    # Create JSON manifest for the app
+    manifest = build_manifest(app_name, analyzed['app_path'], sdef_count, icon_path,
+                              analyzed['codesign_info'], analyzed['sandbox_info'])
+    write_output(app_dir / "manifest.json", format_manifest(manifest))
+    
+    logger.info(f"Processed {app_name}: {sdef_count} SDEF files + metadata")
+    return True
+
+def group_applications_by_name(app_bundles: Iterable[Path]) -> List[Tuple[str, List[Path]]]:
+    """
+    Group application bundles by the data directory name they map to.
+    
+    Bundles that share a name (e.g. two copies of the same app in different
+    locations) write into the same data directory, so they have to be processed
+    one after another in a stable order.
+    
+    Args:
+        app_bundles: Application bundle paths
         
-        if collected_data:
-            logger.info(f"Processed {app_name}: {sdef_count} SDEF files + metadata")
+    Returns:
+        Sorted list of (application name, sorted bundle paths) tuples
+    """
+    groups: Dict[str, List[Path]] = {}
+    for app_bundle in sorted(app_bundles):
+        groups.setdefault(get_application_name(app_bundle), []).append(app_bundle)
+    return sorted(groups.items())
+
+FINGERPRINT_INDEX_NAME = "fingerprints.json"
+
+STATUS_PROCESSED = "processed"
+STATUS_SKIPPED = "skipped"
+STATUS_FAILED = "failed"
+# Written, but an external tool failed: retried next run (see application_status)
+STATUS_INCOMPLETE = "incomplete"
+
+def compute_bundle_fingerprint(app_path: Path) -> Dict[str, Optional[str]]:
+    """
+    Compute a cheap fingerprint that changes whenever a bundle is updated.
+    
+    Only a few stat() calls and one small plist read are needed, so this is
+    far cheaper than running the extractors.
+    
+    Args:
+        app_path: Path to the .app bundle
         
-        return collected_data
+    Returns:
+        Dictionary with the fingerprint fields (None where unavailable)
+    """
+    info_plist_path = app_path / "Contents" / "Info.plist"
+    code_resources_path = app_path / "Contents" / "_CodeSignature" / "CodeResources"
+    
+    fingerprint = {
+        'path': str(app_path),
+        'info_plist_mtime': None,
+        'info_plist_size': None,
+        'bundle_version': None,
+        'code_resources_mtime': None,
+    }
+    
+    try:
+        stat_result = info_plist_path.stat()
+        fingerprint['info_plist_mtime'] = stat_result.st_mtime
+        fingerprint['info_plist_size'] = stat_result.st_size
+        with open(info_plist_path, 'rb') as f:
+            bundle_version = plistlib.load(f).get('CFBundleVersion')
+        if bundle_version is not None:
+            fingerprint['bundle_version'] = str(bundle_version)
+    except (OSError, plistlib.InvalidFileException, ValueError, AttributeError) as e:
+        logger.debug(f"Could not fingerprint Info.plist for {app_path}: {e}")
+    
+    try:
+        fingerprint['code_resources_mtime'] = code_resources_path.stat().st_mtime
+    except OSError:
+        pass
+    
+    return fingerprint
+
+def load_fingerprint_index(data_dir: Path) -> Dict[str, Dict]:
+    """
+    Load the fingerprint index written by the previous run.
+    
+    Args:
+        data_dir: Base data directory
         
-    except (OSError, PermissionError) as e:
-        logger.error(f"Failed to process application {app_path}: {e}")
+    Returns:
+        Mapping of bundle path to fingerprint (empty if missing or unreadable)
+    """
+    index_file = data_dir / FINGERPRINT_INDEX_NAME
+    try:
+        with open(index_file) as f:
+            index = json.load(f)
+        return index.get('bundles', {})
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError, AttributeError) as e:
+        logger.warning(f"Ignoring unreadable fingerprint index {index_file}: {e}")
+        return {}
+
+def save_fingerprint_index(data_dir: Path, index: Dict[str, Dict]) -> None:
+    """
+    Write the fingerprint index, replacing the previous one atomically.
+    
+    Args:
+        data_dir: Base data directory
+        index: Mapping of bundle path to fingerprint
+    """
+    OUTPUT_WRITER.write(data_dir / FINGERPRINT_INDEX_NAME,
+                        json.dumps({'bundles': index}, indent=2, sort_keys=True) + "\n")
+
+def process_application_group(app_bundles: List[Path], data_dir: Path,
+                              fingerprint_index: Optional[Dict[str, Dict]] = None,
+                              force: bool = False, verify_signature: bool = True,
+                              icons: Optional[IconPipeline] = None,
+                              sdef_store: Optional[SdefStore] = None,
+                              journal: Optional[ProgressJournal] = None,
+                              resume: bool = False) -> List[Dict]:
+    """
+    Process bundles that share a data directory, in order.
+    
+    The group is skipped when every bundle's fingerprint matches the index and
+    the app's manifest exists. If any bundle changed the whole group is
+    reprocessed, so the directory ends up exactly as a full run would leave it.
+    
+    With a journal, the group's start and completion are recorded. A group the
+    previous run was interrupted in has its directory removed and is always
+    reprocessed; with resume, a group the journal shows as completed (same
+    fingerprints, outputs intact) is skipped.
+    
+    Args:
+        app_bundles: Bundles mapping to the same application name
+        data_dir: Base data directory
+        fingerprint_index: Fingerprints from the previous run, or None to disable skipping
+        force: Reprocess even if fingerprints are unchanged
+        verify_signature: Run `codesign --verify` for each bundle
+        icons: Icon conversion pipeline shared by all bundles
+        sdef_store: Blob store for SDEF files (data_dir/_blobs if not given)
+        journal: Progress journal to record the group in
+        resume: Skip the group if the journal shows it completed
+        
+    Returns:
+        List of result dicts (path, status, fingerprint) in processing order
+    """
+    fingerprints = [compute_bundle_fingerprint(app_bundle) for app_bundle in app_bundles]
+    app_dir = data_dir / get_application_name(app_bundles[0])
+    
+    if can_skip_application_group(app_bundles, fingerprints, data_dir, fingerprint_index, force, journal, resume):
+        return [
+            {'path': app_bundle, 'status': STATUS_SKIPPED, 'fingerprint': fingerprint}
+            for app_bundle, fingerprint in zip(app_bundles, fingerprints)
+        ]
+    
+    sdef_store = sdef_store or SdefStore(data_dir)
+    with recording_application_group(app_bundles, fingerprints, app_dir, sdef_store, journal) as results:
+        for app_bundle, fingerprint in zip(app_bundles, fingerprints):
+            logger.info(f"Processing: {app_bundle.name}")
+            results.append({
+                'path': app_bundle,
+                'status': collect_application(app_bundle, data_dir, verify_signature, icons, sdef_store),
+                'fingerprint': fingerprint,
+            })
+    return results
+
+def can_skip_application_group(app_bundles: List[Path], fingerprints: List[Dict], data_dir: Path,
+                               fingerprint_index: Optional[Dict[str, Dict]] = None, force: bool = False,
+                               journal: Optional[ProgressJournal] = None, resume: bool = False) -> bool:
+    """
+    Decide whether a group of bundles sharing a data directory needs processing.
+    
+    A group the journal shows as interrupted has its directory removed and is
+    never skipped. Otherwise it is skipped when resuming and the journal shows
+    it completed, or when every fingerprint matches the index and the app's
+    manifest exists.
+    
+    Returns:
+        True if the group's data directory is up to date
+    """
+    app_name = get_application_name(app_bundles[0])
+    app_dir = data_dir / app_name
+    bundle_fingerprints = {str(app_bundle): fingerprint for app_bundle, fingerprint in zip(app_bundles, fingerprints)}
+    
+    if journal is not None and journal.was_interrupted(app_name):
+        logger.info(f"Redoing interrupted application: {app_name}")
+        if app_dir.is_dir():
+            shutil.rmtree(app_dir)
+        return False
+    if force:
+        return False
+    if journal is not None and resume and journal.is_complete(app_name, bundle_fingerprints, app_dir):
+        logger.debug(f"Already completed before the interruption: {app_name}")
+        return True
+    
+    if fingerprint_index is not None:
+        unchanged = all(
+            fingerprint_index.get(str(app_bundle)) == fingerprint
+            for app_bundle, fingerprint in zip(app_bundles, fingerprints)
+        )
+        if unchanged and (app_dir / "manifest.json").exists():
+            logger.debug(f"Skipping unchanged: {', '.join(b.name for b in app_bundles)}")
+            return True
+    return False
+
+@contextmanager
+def recording_application_group(app_bundles: List[Path], fingerprints: List[Dict], app_dir: Path,
+                                sdef_store: SdefStore,
+                                journal: Optional[ProgressJournal] = None) -> Iterator[List[Dict]]:
+    """
+    Bracket (re)writing a group's data directory: journal the start, start the
+    app's SDEF list afresh so removed SDEFs do not linger, then write the SDEF
+    list and journal the completion with the output hashes.
+    
+    The caller appends each bundle's result dict to the yielded list. The
+    completion is only journalled if every bundle was processed; otherwise
+    the start entry is left, so the next run redoes the application.
+    """
+    results: List[Dict] = []
+    if journal is not None:
+        journal.record_start(app_dir.name, app_bundles)
+    sdef_store.reset_app(app_dir)
+    yield results
+    sdef_store.finish_app(app_dir)
+    if journal is not None and results and all(result['status'] == STATUS_PROCESSED for result in results):
+        journal.record_complete(app_dir.name, {
+            str(app_bundle): fingerprint for app_bundle, fingerprint in zip(app_bundles, fingerprints)
+        }, app_dir)
+
+def collect_applications(app_bundles: Iterable[Path], data_dir: Path, jobs: int = 1,
+                         incremental: bool = True, force: bool = False,
+                         verify_signature: bool = True,
+                         icons: Optional[IconPipeline] = None,
+                         sdef_store: Optional[SdefStore] = None,
+                         journal: Optional[ProgressJournal] = None,
+                         resume: bool = False) -> List[Dict]:
+    """
+    Process application bundles, optionally fanning out over a worker pool.
+    
+    The work is I/O bound (each app waits on codesign/plutil/sips), so a thread
+    pool is used. Results are returned in the same sorted order regardless of
+    the number of workers.
+    
+    When incremental, bundles whose fingerprint is unchanged since the last run
+    are skipped, and the fingerprint index in data_dir is updated afterwards.
+    
+    Args:
+        app_bundles: Application bundle paths
+        data_dir: Base data directory
+        jobs: Number of worker threads (1 processes sequentially)
+        incremental: Skip unchanged bundles and maintain the fingerprint index
+        force: Reprocess every bundle (the index is still updated)
+        verify_signature: Run `codesign --verify` for each bundle
+        icons: Icon conversion pipeline shared by all bundles
+        sdef_store: Blob store for SDEF files shared by all bundles (data_dir/_blobs if not given)
+        journal: Opened progress journal recording each application (see progress_journal.py)
+        resume: Skip applications the journal shows as completed by an interrupted run
+        
+    Returns:
+        List of result dicts (path, status, fingerprint), sorted by application name
+    """
+    groups = [bundles for _, bundles in group_applications_by_name(app_bundles)]
+    fingerprint_index = load_fingerprint_index(data_dir) if incremental else None
+    sdef_store = sdef_store or SdefStore(data_dir)
+    log_journal_state(journal, resume)
+    
+    def run_group(bundles: List[Path]) -> List[Dict]:
+        return process_application_group(bundles, data_dir, fingerprint_index, force, verify_signature,
+                                         icons, sdef_store, journal, resume)
+    
+    results: List[Dict] = []
+    if jobs <= 1:
+        for bundles in groups:
+            results.extend(run_group(bundles))
+    else:
+        logger.info(f"Processing {len(groups)} applications with {jobs} workers")
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            for group_results in executor.map(run_group, groups):
+                results.extend(group_results)
+    
+    if incremental:
+        save_results_fingerprints(data_dir, results)
+    
+    return results
+
+def log_journal_state(journal: Optional[ProgressJournal], resume: bool) -> None:
+    """Report what the progress journal found from the previous run."""
+    if journal is None:
+        return
+    interrupted = journal.interrupted_apps()
+    if interrupted:
+        logger.warning(f"Previous run was interrupted in {len(interrupted)} application(s), "
+                       f"redoing: {', '.join(interrupted)}")
+    if resume:
+        logger.info(f"Resuming: {len(journal.completed_apps())} application(s) already completed")
+
+def save_results_fingerprints(data_dir: Path, results: List[Dict]) -> None:
+    """
+    Save the fingerprint index for a run's results.
+    
+    Failed and incomplete bundles are left out so they are retried next run;
+    bundles that disappeared from the system drop out of the index.
+    """
+    save_fingerprint_index(data_dir, {
+        str(result['path']): result['fingerprint']
+        for result in results if result['status'] not in (STATUS_FAILED, STATUS_INCOMPLETE)
+    })
+
+def remove_stale_application_directories(data_dir: Path, results: List[Dict]) -> List[str]:
+    """
+    Remove the data directories of applications that are no longer installed.
+    
+    Only call this after a complete discovery pass (every search root read
+    without errors, at least at the default depth). A directory is removed,
+    together with its SDEF references, only if no result maps to its name
+    (whatever its status) and the bundle path recorded in its manifest.json
+    no longer exists. Directories without a readable manifest are kept.
+    
+    Args:
+        data_dir: Base data directory
+        results: Result dicts of the run
+        
+    Returns:
+        Sorted names of the removed directories
+    """
+    current_names = {get_application_name(result['path']) for result in results}
+    removed = []
+    for app_dir in sorted(data_dir.iterdir()):
+        if not is_app_directory(app_dir) or app_dir.name in current_names:
+            continue
+        try:
+            with open(app_dir / "manifest.json") as f:
+                bundle_path = Path(json.load(f)['path'])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Keeping {app_dir.name}: it was not found, but its manifest cannot be read ({e})")
+            continue
+        if bundle_path.exists():
+            logger.warning(f"Keeping {app_dir.name}: it was not found, but {bundle_path} still exists")
+            continue
+        logger.warning(f"Removing data of uninstalled application {app_dir.name} ({bundle_path})")
+        shutil.rmtree(app_dir)
+        removed.append(app_dir.name)
+    return removed
+
+def prune_data_directory(data_dir: Path, results: List[Dict], sdef_store: Optional[SdefStore] = None,
+                         remove_apps: bool = False) -> Tuple[List[str], Dict[str, int]]:
+    """
+    Clean up data_dir after a full collection.
+    
+    With remove_apps, removes the directories of uninstalled applications
+    first (see remove_stale_application_directories). Then removes the SDEF
+    blobs no app refers to any more: those of removed apps and SDEFs that
+    updated apps dropped.
+    
+    Args:
+        data_dir: Base data directory
+        results: Result dicts of a run over every discovered bundle
+        sdef_store: Blob store for SDEF files (data_dir/_blobs if not given)
+        remove_apps: Also remove the data of uninstalled applications
+        
+    Returns:
+        Tuple of (removed application names, SdefStore.remove_unreferenced() counts)
+    """
+    removed_names = remove_stale_application_directories(data_dir, results) if remove_apps else []
+    removed_blobs = (sdef_store or SdefStore(data_dir)).remove_unreferenced(data_dir)
+    if removed_blobs['blobs']:
+        logger.info(f"Removed {removed_blobs['blobs']} unreferenced SDEF blobs ({removed_blobs['bytes']:,} bytes)")
+    return removed_names, removed_blobs
+
+def discovery_was_complete(search_depth: int, errors: List[str]) -> bool:
+    """
+    True if a discovery pass saw every installed application, so apps it did
+    not find can be treated as uninstalled: every search root was read
+    without errors, at least as deep as DEFAULT_SEARCH_DEPTH.
+    """
+    if search_depth < DEFAULT_SEARCH_DEPTH:
+        logger.warning(f"Not pruning: --search-depth {search_depth} is below the default "
+                       f"{DEFAULT_SEARCH_DEPTH}, so deeper applications were not looked for")
         return False
+    if errors:
+        logger.warning(f"Not pruning: {len(errors)} directories could not be searched, "
+                       f"e.g. {'; '.join(errors[:3])}")
+        return False
+    return True
+
+# Stages of the streaming collection after discovery, with default worker counts
+PIPELINE_STAGE_WORKERS = {'extract': 4, 'analyze': 1, 'write': 1}
+
+def collect_applications_pipelined(app_source: Iterable[Path], data_dir: Path,
+                                   stage_workers: Optional[Dict[str, int]] = None, queue_size: int = 32,
+                                   incremental: bool = True, force: bool = False,
+                                   verify_signature: bool = True,
+                                   icons: Optional[IconPipeline] = None,
+                                   sdef_store: Optional[SdefStore] = None,
+                                   journal: Optional[ProgressJournal] = None,
+                                   resume: bool = False) -> Tuple[List[Dict], Dict]:
+    """
+    Process bundles while they are still being discovered.
+    
+    Bundles stream from app_source through three stages connected by bounded
+    queues (see pipeline.py): extract (bundle walk, codesign, plists, icon;
+    I/O bound), analyze (sandbox analysis and report formatting) and write
+    (the app's data directory). Processing starts with the first bundle found,
+    and only queue_size bundles per stage are held in memory at a time.
+    
+    A bundle whose name was already seen cannot share the data directory
+    with the one in flight, so each such name is collected again as a whole
+    group, in sorted order, once the pipeline has drained. The data directory
+    then ends up exactly as collect_applications() would leave it.
+    
+    Args:
+        app_source: Application bundle paths, e.g. iter_applications()
+        data_dir: Base data directory
+        stage_workers: Worker threads per stage (defaults: PIPELINE_STAGE_WORKERS)
+        queue_size: Capacity of each stage's input queue
+        incremental: Skip unchanged bundles and maintain the fingerprint index
+        force: Reprocess every bundle (the index is still updated)
+        verify_signature: Run `codesign --verify` for each bundle
+        icons: Icon conversion pipeline shared by all bundles
+        sdef_store: Blob store for SDEF files shared by all bundles (data_dir/_blobs if not given)
+        journal: Opened progress journal recording each application (see progress_journal.py)
+        resume: Skip applications the journal shows as completed by an interrupted run
+        
+    Returns:
+        Tuple of (result dicts sorted like collect_applications(), Pipeline.summary())
+    """
+    workers = dict(PIPELINE_STAGE_WORKERS, **(stage_workers or {}))
+    fingerprint_index = load_fingerprint_index(data_dir) if incremental else None
+    sdef_store = sdef_store or SdefStore(data_dir)
+    log_journal_state(journal, resume)
+    
+    # Only touched by the pipeline's source thread until the pipeline has drained
+    bundles_by_name: Dict[str, List[Path]] = {}
+    early_results: List[Dict] = []
+    results_lock = threading.Lock()
+    
+    def first_of_each_name() -> Iterator[Path]:
+        for app_bundle in app_source:
+            members = bundles_by_name.setdefault(get_application_name(app_bundle), [])
+            members.append(app_bundle)
+            if len(members) == 1:
+                yield app_bundle
+    
+    def finish_early(app_bundle: Path, status: str, fingerprint: Dict) -> None:
+        with results_lock:
+            early_results.append({'path': app_bundle, 'status': status, 'fingerprint': fingerprint})
+    
+    def extract(app_bundle: Path) -> Optional[Dict]:
+        fingerprint = compute_bundle_fingerprint(app_bundle)
+        if can_skip_application_group([app_bundle], [fingerprint], data_dir, fingerprint_index, force,
+                                      journal, resume):
+            finish_early(app_bundle, STATUS_SKIPPED, fingerprint)
+            return None
+        logger.info(f"Processing: {app_bundle.name}")
+        app_name = get_application_name(app_bundle)
+        with RUN_PROFILE.app(app_name):
+            try:
+                data = extract_application_data(app_bundle, verify_signature, icons)
+            except Exception as e:
+                log_application_failure(app_bundle, e)
+                finish_early(app_bundle, STATUS_FAILED, fingerprint)
+                return None
+        return {'name': app_name, 'path': app_bundle, 'fingerprint': fingerprint, 'data': data}
+    
+    def analyze(job: Dict) -> Optional[Dict]:
+        with RUN_PROFILE.app(job['name']):
+            try:
+                job['data'] = analyze_application_data(job['name'], job['data'])
+            except Exception as e:
+                log_application_failure(job['path'], e)
+                finish_early(job['path'], STATUS_FAILED, job['fingerprint'])
+                return None
+        return job
+    
+    def write(job: Dict) -> Dict:
+        app_dir = data_dir / job['name']
+        with RUN_PROFILE.app(job['name']):
+            with recording_application_group([job['path']], [job['fingerprint']], app_dir, sdef_store,
+                                             journal) as results:
+                status = STATUS_FAILED
+                try:
+                    if write_application_data(app_dir, data_dir, job['data'], sdef_store):
+                        status = application_status(job['name'], job['data'])
+                except Exception as e:
+                    log_application_failure(job['path'], e)
+                results.append({'path': job['path'], 'status': status, 'fingerprint': job['fingerprint']})
+        return results[0]
+    
+    pipeline = Pipeline([
+        Stage('extract', extract, workers['extract']),
+        Stage('analyze', analyze, workers['analyze']),
+        Stage('write', write, workers['write']),
+    ], queue_size=queue_size, source_name='discover')
+    results = early_results + pipeline.run(first_of_each_name())
+    
+    # Names shared by several bundles: redo each as a whole group, like collect_applications()
+    for app_name, members in sorted(bundles_by_name.items()):
+        if len(members) < 2:
+            continue
+        streamed = next(result for result in results if result['path'] == members[0])
+        results.remove(streamed)
+        results.extend(process_application_group(
+            sorted(members), data_dir, fingerprint_index, force or streamed['status'] != STATUS_SKIPPED,
+            verify_signature, icons, sdef_store, journal, resume,
+        ))
+    
+    results.sort(key=lambda result: (get_application_name(result['path']), result['path']))
+    if incremental:
+        save_results_fingerprints(data_dir, results)
+    return results, pipeline.summary()
+
+def parse_arguments(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Collect macOS application data into data/")
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help="Number of applications to process in parallel (default: 1)")
+    parser.add_argument('--force', action='store_true',
+                        help="Reprocess every application even if its bundle fingerprint is unchanged")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continue an interrupted run, skipping applications its journal shows as completed")
+    parser.add_argument('--journal', type=Path, default=Path(__file__).parent / ".cache" / JOURNAL_NAME,
+                        help=f"Progress journal used by --resume (default: .cache/{JOURNAL_NAME})")
+    parser.add_argument('--no-verify', dest='verify_signature', action='store_false',
+                        help="Skip `codesign --verify` (one fewer process per app)")
+    parser.add_argument('--search-depth', type=int, default=DEFAULT_SEARCH_DEPTH,
+                        help=f"How deep below each search root to look for .app bundles "
+                             f"(default: {DEFAULT_SEARCH_DEPTH})")
+    parser.add_argument('--prune', action='store_true',
+                        help="Remove the data of applications that are no longer installed (only after a "
+                             "search that read every directory, at least at the default depth)")
+    parser.add_argument('--tool-limit', action='append', default=[], metavar='TOOL=N',
+                        help="Maximum concurrent processes for a tool, e.g. codesign=8 (repeatable)")
+    parser.add_argument('--stage-workers', action='append', default=[], metavar='STAGE=N',
+                        help="Worker threads for a pipeline stage (extract, analyze, write), e.g. write=2 "
+                             "(repeatable; extract defaults to --jobs)")
+    parser.add_argument('--queue-size', type=int, default=32, metavar='N',
+                        help="Bundles each pipeline stage can queue before the stage feeding it waits (default: 32)")
+    parser.add_argument('--icon-cache', type=Path, default=Path(__file__).parent / ".cache" / "icons",
+                        help="Directory for converted icons keyed by source hash (default: .cache/icons)")
+    parser.add_argument('--catalog', type=Path, metavar='DB',
+                        help="Also update this SQLite catalog (see catalog.py) with the reprocessed apps")
+    parser.add_argument('--icon-size', type=int, metavar='PX',
+                        help="Extract the icon closest to this width instead of the largest "
+                             "(use with --force to redo existing apps)")
+    parser.add_argument('--app', dest='apps', type=Path, action='append', metavar='PATH',
+                        help="Only collect this .app bundle instead of searching the system (repeatable)")
+    parser.add_argument('--profile', type=Path, default=Path(__file__).parent / "run_profile.json",
+                        help="Where to write per-stage and per-app timings (default: ./run_profile.json)")
+    parser.add_argument('--top', type=int, default=10, metavar='N',
+                        help="Number of slowest applications to list after the run (default: 10)")
+    parser.add_argument('--cprofile', type=Path, metavar='FILE',
+                        help="Run a single --app under cProfile and save the stats to FILE")
+    args = parser.parse_args(argv)
+    if args.cprofile and len(args.apps or []) != 1:
+        parser.error("--cprofile profiles a single application; pass exactly one --app")
+    return args
 
 def main():
     """Main function to orchestrate the application data collection."""
+    args = parse_arguments()
+    
+    for tool_limit in args.tool_limit:
+        tool, _, limit = tool_limit.partition('=')
+        if not limit.isdigit() or int(limit) < 1:
+            logger.error(f"Invalid --tool-limit {tool_limit!r}, expected TOOL=N")
+            sys.exit(2)
+        TOOL_RUNNER.limits[tool] = int(limit)
+    
+    stage_workers = {'extract': args.jobs}
+    for stage_worker in args.stage_workers:
+        stage, _, count = stage_worker.partition('=')
+        if stage not in PIPELINE_STAGE_WORKERS or not count.isdigit() or int(count) < 1:
+            logger.error(f"Invalid --stage-workers {stage_worker!r}, expected STAGE=N with STAGE one of "
+                         f"{', '.join(PIPELINE_STAGE_WORKERS)}")
+            sys.exit(2)
+        stage_workers[stage] = int(count)
+    
     # Check if running with sudo privileges
     if os.geteuid() != 0:
         logger.error("This script requires sudo privileges to access system applications and signing data.")
-        logger.error("Please run with: sudo python3 collect_sdef_files.py")
+        logger.error("Please run with: sudo python3 collect_macos_app_data.py")
         sys.exit(1)
     
     script_dir = Path(__file__).parent
@@ -883,47 +2170,154 @@ def main():
     # Create data directory
     data_dir.mkdir(exist_ok=True)
     
-    # Find all applications
-    app_bundles = find_all_applications()
-    
-    if not app_bundles:
-        logger.warning("No application bundles found!")
-        return
+    # Find all applications: bundles stream from discovery straight into processing
+    discovery_errors: List[str] = []
+    if args.apps:
+        app_bundles = []
+        for app_path in args.apps:
+            if app_path.is_dir():
+                app_bundles.append(app_path.resolve())
+            else:
+                logger.warning(f"Not an application bundle: {app_path}")
+    else:
+        logger.info("Searching for application bundles...")
+        app_bundles = RUN_PROFILE.iterate('discovery', iter_applications(max_depth=args.search_depth,
+                                                                         errors=discovery_errors))
     
     # Process each application
     success_count = 0
+    skipped_count = 0
+    incomplete_count = 0
     sdef_total = 0
+    counted_names = set()
+    reprocessed_names = set()
     
-    for app_bundle in app_bundles:
-        logger.info(f"Processing: {app_bundle.name}")
-        if process_application(app_bundle, data_dir):
-            success_count += 1
-            
-            # Count SDEF files in this app
-            app_name = get_application_name(app_bundle)
-            sdef_dir = data_dir / app_name / "sdef"
-            if sdef_dir.exists():
-                sdef_count = len(list(sdef_dir.glob("*.sdef")))
-                sdef_total += sdef_count
-    
-    logger.info(f"Successfully processed {success_count} out of {len(app_bundles)} applications")
+    icons = IconPipeline(cache_dir=args.icon_cache, size=args.icon_size)
+    sdef_store = SdefStore(data_dir)
+    
+    profiler = None
+    if args.cprofile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    journal = ProgressJournal(args.journal)
+    journal.open(resume=args.resume)
+    try:
+        if profiler is not None:
+            # In this thread, so the profiler sees all the work
+            results = collect_applications(app_bundles, data_dir, jobs=1, force=args.force,
+                                           verify_signature=args.verify_signature, icons=icons,
+                                           sdef_store=sdef_store, journal=journal, resume=args.resume)
+        else:
+            results, RUN_PROFILE.pipeline = collect_applications_pipelined(
+                app_bundles, data_dir, stage_workers=stage_workers, queue_size=args.queue_size,
+                force=args.force, verify_signature=args.verify_signature, icons=icons,
+                sdef_store=sdef_store, journal=journal, resume=args.resume,
+            )
+    finally:
+        journal.close()
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(args.cprofile)
+        logger.info(f"cProfile stats written to {args.cprofile} (view with: python3 -m pstats {args.cprofile})")
+    
+    if not results:
+        logger.warning("No application bundles found!")
+        return
+    
+    removed_names, removed_blobs = [], {'blobs': 0, 'bytes': 0}
+    if not args.apps:
+        removed_names, removed_blobs = prune_data_directory(
+            data_dir, results, sdef_store,
+            remove_apps=args.prune and discovery_was_complete(args.search_depth, discovery_errors))
+    
+    for result in results:
+        if result['status'] == STATUS_FAILED:
+            continue
+        success_count += 1
+        if result['status'] == STATUS_SKIPPED:
+            skipped_count += 1
+        else:
+            reprocessed_names.add(get_application_name(result['path']))
+        if result['status'] == STATUS_INCOMPLETE:
+            incomplete_count += 1
+        
+        # Count SDEF files in this app (once per data directory)
+        app_name = get_application_name(result['path'])
+        if app_name in counted_names:
+            continue
+        counted_names.add(app_name)
+        sdef_total += len(list_app_sdefs(data_dir / app_name))
+    
+    logger.info(f"Successfully processed {success_count} out of {len(results)} applications")
+    logger.info(f"Reprocessed {success_count - skipped_count}, skipped {skipped_count} unchanged")
+    if removed_names:
+        logger.info(f"Removed {len(removed_names)} uninstalled applications: {', '.join(removed_names)}")
+    if incomplete_count:
+        logger.warning(f"{incomplete_count} applications are incomplete because an external tool failed; "
+                       f"they will be collected again next run")
+    converted_by = ", ".join(f"{name}={count}" for name, count in sorted(icons.converter_stats.items()))
+    logger.info(f"Icons: {icons.stats['converted']} converted ({converted_by or 'none'}), "
+                f"{icons.stats['cache_hits']} from cache, "
+                f"{icons.stats['copied']} copied, {icons.stats['failed']} failed")
+    logger.info("External tool processes: " + (", ".join(
+        f"{tool}={count}" for tool, count in sorted(TOOL_SPAWN_COUNTS.items())) or "none"))
+    tool_failures = TOOL_POLICY.format_summary()
+    logger.info("Tool failures: " + ("; ".join(tool_failures) or "none"))
     logger.info(f"Total SDEF files collected: {sdef_total}")
+    logger.info(f"SDEF store: {sdef_store.stats['stored']} new blobs ({sdef_store.stats['bytes_stored']:,} bytes), "
+                f"{sdef_store.stats['deduplicated']} already stored ({sdef_store.stats['bytes_deduplicated']:,} bytes not copied), "
+                f"{removed_blobs['blobs']} unreferenced removed ({removed_blobs['bytes']:,} bytes)")
+    logger.info(f"Output: {OUTPUT_WRITER.summary()}")
     logger.info(f"Data organized in: {data_dir}")
     
+    profile = RUN_PROFILE.write(args.profile, top=args.top)
+    logger.info(f"Run profile written to {args.profile}: {profile['wall_time']:.1f}s wall, "
+                f"{profile['bytes_written']:,} bytes written, stages " + ", ".join(
+                    f"{stage}={seconds:.1f}s" for stage, seconds in profile['stages'].items()))
+    
+    if args.catalog:
+        # Imported here: catalog.py builds on this module
+        from catalog import update_catalog
+        catalogued = update_catalog(data_dir, args.catalog, reprocessed_names)
+        logger.info(f"Catalog {args.catalog}: {catalogued} applications updated")
+    
     # Print summary
     if success_count > 0:
         print(f"\n✅ Collection complete!")
         print(f"� Processed {success_count} applications")
+        print(f"♻️  Reprocessed {success_count - skipped_count}, skipped {skipped_count} unchanged")
+        if removed_names:
+            print(f"🗑️  Removed {len(removed_names)} uninstalled applications")
         print(f"📄 Collected {sdef_total} SDEF files")
+        print(f"💾 {OUTPUT_WRITER.summary()}")
         print(f"📂 Output directory: {data_dir}")
+        
+        if tool_failures:
+            print(f"\n⚠️  External tool failures:")
+            for line in tool_failures:
+                print(f"   {line}")
+            if incomplete_count:
+                print(f"   {incomplete_count} applications incomplete, they will be collected again next run")
+        
+        if RUN_PROFILE.pipeline:
+            print(f"\n🚰 Pipeline ({RUN_PROFILE.pipeline['wall_time']:.1f}s, first app done after "
+                  f"{RUN_PROFILE.pipeline['first_output'] or 0:.1f}s; queue mean/max):")
+            for line in format_pipeline_summary(RUN_PROFILE.pipeline):
+                print(f"  {line}")
+        
+        slowest = RUN_PROFILE.format_slowest(args.top)
+        if slowest:
+            print(f"\n🐢 Slowest applications (seconds):")
+            for line in slowest:
+                print(f"  {line}")
         print(f"\nDirectory structure created:")
         
         # Show the directory structure
         for app_dir in sorted(data_dir.iterdir()):
-            if app_dir.is_dir():
+            if is_app_directory(app_dir):
                 app_name = app_dir.name
-                sdef_dir = app_dir / "sdef"
-                sdef_count = len(list(sdef_dir.glob("*.sdef"))) if sdef_dir.exists() else 0
+                sdef_count = len(list_app_sdefs(app_dir))
                 
                 # Check what files were created
                 files_created = []
@@ -937,7 +2331,7 @@ def main():
         
         print(f"\n📊 Summary:")
         print(f"  • Each app directory contains:")
-        print(f"    - sdef/ (SDEF files)")
+        print(f"    - sdef_refs.json (SDEF files, stored once in {data_dir.name}/_blobs/)")
         print(f"    - codesign.txt (code signing info)")
         print(f"    - entitlements.plist (app entitlements)")
         print(f"    - info.plist (app metadata)")
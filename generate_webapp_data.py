@@ -1,69 +1,470 @@
 #!/usr/bin/env python3
 """
 Generate index.json for the webapp from the collected data.
+
+Application directories are synced incrementally into webapp/public/data:
+only files whose size/mtime (or, with --hash, content) differ are copied,
+apps that no longer exist in data/ are removed, and with --hardlink files
+are linked instead of copied when both trees are on the same filesystem.
+
+SDEF files are served from the content-addressed _blobs/ store (see
+sdef_store.py); apps still in the legacy layout keep their sdef/ folder.
+Each app's sdef_index.json lists its SDEF names and, for stored SDEFs, the
+blob each one lives in.
+
+Each app also gets a detail.json holding its entitlements, Info.plist,
+sandbox report and SDEFs (large SDEFs by URL only), so the webapp opens an
+app with one request.
+
+Every app's manifest is also consolidated into one pre-sorted apps bundle
+(apps.json plus a content-hashed copy referenced from index.json) so the
+webapp can render the grid after a single fetch, and a content-hashed
+search index (see search_index.py) is written next to it.
 """
 
+import argparse
+import gzip
+import hashlib
 import json
 import os
+import shutil
+import sys
+import time
 from pathlib import Path
 from datetime import datetime
+from typing import Dict, List, Optional
+
+from output_writer import OUTPUT_WRITER
+from search_index import build_search_index, index_stats
+from sdef_store import BLOB_DIR_NAME, is_app_directory, list_app_sdefs, load_sdef_refs
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Files generated into each webapp app directory (not present in data/)
+GENERATED_APP_FILES = {"sdef_index.json", "detail.json", "detail.json.gz", "detail.json.br"}
+
+# Files bundled into each app's detail.json, keyed by their name there
+DETAIL_TEXT_FILES = {
+    "entitlements": "entitlements.plist",
+    "info_plist": "info.plist",
+    "sandbox": "sandbox.txt",
+}
+
+# SDEFs up to this size are inlined into detail.json; larger ones are
+# referenced by URL and fetched only when the SDEF tab is opened
+SDEF_INLINE_LIMIT = 16 * 1024
+
+def file_digest(path: Path) -> str:
+    """Return the SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def files_match(src: Path, dest: Path, src_stat: os.stat_result, use_hash: bool) -> bool:
+    """
+    Decide whether dest is already an up-to-date copy of src.
+
+    Args:
+        src: Source file
+        dest: Destination file
+        src_stat: stat() result for src
+        use_hash: Compare contents instead of trusting matching mtimes
+
+    Returns:
+        True if dest does not need to be rewritten
+    """
+    try:
+        dest_stat = dest.stat()
+    except FileNotFoundError:
+        return False
+
+    if (dest_stat.st_dev, dest_stat.st_ino) == (src_stat.st_dev, src_stat.st_ino):
+        return True
+    if dest_stat.st_size != src_stat.st_size:
+        return False
+    if use_hash:
+        return file_digest(src) == file_digest(dest)
+    return dest_stat.st_mtime_ns == src_stat.st_mtime_ns
+
+def sync_app_directory(src_dir: Path, dest_dir: Path, stats: Dict[str, int],
+                       use_hash: bool = False, hardlink: bool = False) -> None:
+    """
+    Make dest_dir mirror src_dir, touching only files that changed.
+
+    Args:
+        src_dir: Application directory in data/
+        dest_dir: Application directory in webapp/public/data/
+        stats: Counters updated in place
+        use_hash: Compare file contents instead of trusting matching mtimes
+        hardlink: Hard-link files instead of copying them
+    """
+    dest_dir.mkdir(parents=True, exist_ok=True)
+
+    expected = set()
+    for src in sorted(src_dir.rglob("*")):
+        relative = src.relative_to(src_dir)
+        dest = dest_dir / relative
+        if src.is_dir():
+            if dest.is_symlink() or (dest.exists() and not dest.is_dir()):
+                # A file became a directory
+                dest.unlink()
+            dest.mkdir(parents=True, exist_ok=True)
+            continue
+        expected.add(relative)
+
+        src_stat = src.stat()
+        if files_match(src, dest, src_stat, use_hash):
+            stats['files_skipped'] += 1
+            stats['bytes_skipped'] += src_stat.st_size
+            continue
+
+        if dest.is_dir() and not dest.is_symlink():
+            # A directory became a file
+            shutil.rmtree(dest)
+        elif dest.exists() or dest.is_symlink():
+            dest.unlink()
+        linked = False
+        if hardlink:
+            try:
+                os.link(src, dest)
+                linked = True
+            except OSError:
+                # Different filesystem or links not supported: fall back to copying
+                pass
+        if linked:
+            stats['files_linked'] += 1
+        else:
+            shutil.copy2(src, dest)
+            stats['files_copied'] += 1
+            stats['bytes_copied'] += src_stat.st_size
+
+    # Remove files that disappeared from the source (keeping generated ones)
+    for dest in sorted(dest_dir.rglob("*"), reverse=True):
+        relative = dest.relative_to(dest_dir)
+        if dest.is_dir() and not dest.is_symlink():
+            if not any(dest.iterdir()):
+                dest.rmdir()
+        elif relative not in expected and str(relative) not in GENERATED_APP_FILES:
+            dest.unlink()
+            stats['files_deleted'] += 1
+
+def build_app_detail(app_dir: Path, sdef_urls: Dict[str, str]) -> Dict:
+    """
+    Collect everything the webapp shows when an app is opened.
+
+    Args:
+        app_dir: Application directory in data/
+        sdef_urls: SDEF file name -> URL of its contents, relative to the data directory
+
+    Returns:
+        Dictionary with the text of each DETAIL_TEXT_FILES entry (None if
+        missing) and an "sdef_files" list of {"name", "size"} entries with
+        either the "content" or, above SDEF_INLINE_LIMIT, the "url"
+    """
+    detail = {}
+    for key, file_name in DETAIL_TEXT_FILES.items():
+        try:
+            detail[key] = (app_dir / file_name).read_text(encoding='utf-8', errors='replace')
+        except FileNotFoundError:
+            detail[key] = None
+
+    sdef_files = []
+    for name, path in list_app_sdefs(app_dir).items():
+        size = path.stat().st_size
+        entry = {"name": name, "size": size}
+        if size <= SDEF_INLINE_LIMIT:
+            entry["content"] = path.read_text(encoding='utf-8', errors='replace')
+        else:
+            entry["url"] = sdef_urls[name]
+        sdef_files.append(entry)
+    detail["sdef_files"] = sdef_files
+    return detail
+
+def write_app_detail(detail: Dict, dest_dir: Path, compress: bool = False) -> int:
+    """
+    Write detail.json for one app.
+
+    Args:
+        detail: Result of build_app_detail()
+        dest_dir: Application directory in webapp/public/data/
+        compress: Also write pre-compressed .gz (and .br if brotli is installed) variants
+
+    Returns:
+        Size of detail.json in bytes
+    """
+    content = json.dumps(detail, separators=(',', ':'), ensure_ascii=False)
+    OUTPUT_WRITER.write(dest_dir / "detail.json", content)
+
+    variants = {}
+    if compress:
+        variants["detail.json.gz"] = gzip.compress(content.encode('utf-8'), compresslevel=9, mtime=0)
+        if brotli is not None:
+            variants["detail.json.br"] = brotli.compress(content.encode('utf-8'))
+    for name in ("detail.json.gz", "detail.json.br"):
+        if name in variants:
+            OUTPUT_WRITER.write(dest_dir / name, variants[name])
+        else:
+            OUTPUT_WRITER.remove(dest_dir / name)
+    return len(content.encode('utf-8'))
+
+def build_apps_bundle(app_dirs: List[Path]) -> List[Dict]:
+    """
+    Collect every app's manifest into one list, sorted like index.json.
+
+    Args:
+        app_dirs: Application directories in data/
+
+    Returns:
+        List of manifests, each with an "id" (the directory name) added
+    """
+    apps = []
+    for app_dir in sorted(app_dirs, key=lambda d: d.name):
+        try:
+            with open(app_dir / "manifest.json") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Skipping {app_dir.name} in apps bundle: {e}")
+            continue
+        manifest["id"] = app_dir.name
+        apps.append(manifest)
+    return apps
+
+def verify_apps_bundle(bundle_file: Path, app_dirs: List[Path]) -> List[str]:
+    """
+    Check that a written apps bundle exactly matches the individual manifests.
+
+    Args:
+        bundle_file: The apps bundle JSON
+        app_dirs: Application directories whose manifests it should contain
+
+    Returns:
+        List of problems (empty if the bundle matches)
+    """
+    with open(bundle_file) as f:
+        bundled = {app["id"]: app for app in json.load(f)["apps"]}
+
+    problems = []
+    for app_dir in app_dirs:
+        manifest_file = app_dir / "manifest.json"
+        if not manifest_file.exists():
+            continue
+        with open(manifest_file) as f:
+            expected = dict(json.load(f), id=app_dir.name)
+        if app_dir.name not in bundled:
+            problems.append(f"{app_dir.name}: missing from bundle")
+        elif bundled.pop(app_dir.name) != expected:
+            problems.append(f"{app_dir.name}: differs from manifest.json")
+    problems.extend(f"{name}: not in data/" for name in sorted(bundled))
+    return problems
+
+def write_hashed_json(stem: str, payload: Dict, webapp_data_dir: Path, compress: bool = False) -> Dict:
+    """
+    Write compact JSON under a content-hashed name for long-lived caching.
+
+    Args:
+        stem: File name prefix ("apps" writes apps.<hash>.json)
+        payload: JSON-serializable data
+        webapp_data_dir: Webapp data directory
+        compress: Also write pre-compressed .gz (and .br if brotli is installed) variants
+
+    Returns:
+        Dictionary with the hashed file name, the size of each variant and
+        the uncompressed content
+    """
+    content = json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    hashed_name = f"{stem}.{hashlib.sha256(content).hexdigest()[:12]}.json"
 
-def generate_data_index():
-    """Generate an index.json file for the webapp."""
+    variants = {hashed_name: content}
+    if compress:
+        variants[hashed_name + ".gz"] = gzip.compress(content, compresslevel=9, mtime=0)
+        if brotli is not None:
+            variants[hashed_name + ".br"] = brotli.compress(content)
+
+    for name, data in variants.items():
+        OUTPUT_WRITER.write(webapp_data_dir / name, data)
+
+    # Drop copies from previous runs
+    for old_file in webapp_data_dir.glob(f"{stem}.*.json*"):
+        if old_file.name not in variants:
+            OUTPUT_WRITER.remove(old_file)
+
+    return {
+        "file": hashed_name,
+        "sizes": {name: len(data) for name, data in variants.items()},
+        "content": content,
+    }
+
+def write_apps_bundle(apps: List[Dict], webapp_data_dir: Path, compress: bool = False) -> Dict:
+    """
+    Write apps.json and a content-hashed copy for long-lived caching.
+
+    Args:
+        apps: Manifests from build_apps_bundle()
+        webapp_data_dir: Webapp data directory
+        compress: Also write pre-compressed .gz (and .br if brotli is installed) variants
+
+    Returns:
+        Dictionary with the hashed file name and the size of each variant
+    """
+    bundle = write_hashed_json("apps", {"apps": apps}, webapp_data_dir, compress=compress)
+    OUTPUT_WRITER.write(webapp_data_dir / "apps.json", bundle.pop("content"))
+    return bundle
+
+def generate_data_index(data_dir: Optional[Path] = None, webapp_data_dir: Optional[Path] = None,
+                        use_hash: bool = False, hardlink: bool = False, compress: bool = False):
+    """
+    Generate an index.json file for the webapp.
+
+    Args:
+        data_dir: Collected data directory (defaults to ./data)
+        webapp_data_dir: Webapp data directory (defaults to ./webapp/public/data)
+        use_hash: Compare file contents instead of trusting matching mtimes
+        hardlink: Hard-link files instead of copying them where possible
+        compress: Also write pre-compressed variants of the apps bundle, search index and detail files
+
+    Returns:
+        Sync statistics, or False if the data directory does not exist
+    """
     script_dir = Path(__file__).parent
-    data_dir = script_dir / "data"
-    webapp_data_dir = script_dir / "webapp" / "public" / "data"
-    
+    data_dir = data_dir or script_dir / "data"
+    webapp_data_dir = webapp_data_dir or script_dir / "webapp" / "public" / "data"
+
     if not data_dir.exists():
         print("❌ Data directory not found. Run collect_macos_app_data.py first.")
         return False
-    
+
     # Create webapp data directory
     webapp_data_dir.mkdir(parents=True, exist_ok=True)
-    
+    writes_before = OUTPUT_WRITER.stats.copy()
+
     # Get list of all app directories
-    app_dirs = [d for d in data_dir.iterdir() if d.is_dir()]
+    app_dirs = sorted(d for d in data_dir.iterdir() if is_app_directory(d))
     app_names = [d.name for d in app_dirs]
-    
-    # Copy all data to webapp public directory
-    import shutil
-    print(f"📁 Copying data for {len(app_dirs)} applications...")
-    
+
+    stats = dict.fromkeys([
+        'files_copied', 'files_linked', 'files_skipped', 'files_deleted',
+        'bytes_copied', 'bytes_skipped', 'apps_removed',
+        'detail_bytes', 'sdefs_inlined', 'sdefs_deferred',
+    ], 0)
+
+    if hardlink and data_dir.stat().st_dev != webapp_data_dir.stat().st_dev:
+        print("⚠️ data/ and the webapp data directory are on different filesystems, copying instead of linking")
+        hardlink = False
+
+    # Sync all data to webapp public directory
+    print(f"📁 Syncing data for {len(app_dirs)} applications...")
+
     for app_dir in app_dirs:
         dest_dir = webapp_data_dir / app_dir.name
-        if dest_dir.exists():
-            shutil.rmtree(dest_dir)
-        shutil.copytree(app_dir, dest_dir)
-        
+        sync_app_directory(app_dir, dest_dir, stats, use_hash=use_hash, hardlink=hardlink)
+
         # Generate SDEF file listing for each app
-        sdef_dir = dest_dir / "sdef"
-        if sdef_dir.exists():
-            sdef_files = [f.name for f in sdef_dir.iterdir() if f.is_file() and f.suffix == '.sdef']
+        sdef_index_file = dest_dir / "sdef_index.json"
+        sdef_files = list(list_app_sdefs(app_dir))
+        refs = load_sdef_refs(app_dir)
+        if sdef_files:
             sdef_index = {
                 "files": sdef_files,
                 "count": len(sdef_files)
             }
+            if refs is not None:
+                sdef_index["blobs"] = {name: refs[name] for name in sdef_files}
             
             # Write SDEF index
-            with open(dest_dir / "sdef_index.json", 'w') as f:
-                json.dump(sdef_index, f, indent=2)
+            OUTPUT_WRITER.write(sdef_index_file, json.dumps(sdef_index, indent=2))
+        else:
+            OUTPUT_WRITER.remove(sdef_index_file)
+
+        # Bundle the detail view into one file so opening an app is a single request
+        sdef_urls = {
+            name: f"{BLOB_DIR_NAME}/{refs[name]}" if refs is not None else f"{app_dir.name}/sdef/{name}"
+            for name in sdef_files
+        }
+        detail = build_app_detail(app_dir, sdef_urls)
+        stats['detail_bytes'] += write_app_detail(detail, dest_dir, compress=compress)
+        for sdef_file in detail["sdef_files"]:
+            stats['sdefs_inlined' if "content" in sdef_file else 'sdefs_deferred'] += 1
     
+    # Sync the shared SDEF blobs
+    blob_dir = data_dir / BLOB_DIR_NAME
+    if blob_dir.is_dir():
+        sync_app_directory(blob_dir, webapp_data_dir / BLOB_DIR_NAME, stats, use_hash=use_hash, hardlink=hardlink)
+    elif (webapp_data_dir / BLOB_DIR_NAME).exists():
+        shutil.rmtree(webapp_data_dir / BLOB_DIR_NAME)
+    
+    # Remove apps that are no longer in data/
+    current_apps = set(app_names)
+    for dest_dir in sorted(webapp_data_dir.iterdir()):
+        if is_app_directory(dest_dir) and dest_dir.name not in current_apps:
+            shutil.rmtree(dest_dir)
+            stats['apps_removed'] += 1
+
+    # Consolidate all manifests into a single bundle
+    apps = build_apps_bundle(app_dirs)
+    bundle = write_apps_bundle(apps, webapp_data_dir, compress=compress)
+    problems = verify_apps_bundle(webapp_data_dir / bundle["file"], app_dirs)
+    if problems:
+        print(f"❌ apps bundle does not match the manifests: {'; '.join(problems[:5])}")
+        return False
+
+    manifest_bytes = sum((d / "manifest.json").stat().st_size for d in app_dirs if (d / "manifest.json").exists())
+    print(f"📦 Bundled {len(apps)} manifests into {bundle['file']} "
+          f"(individual manifests: {manifest_bytes:,} bytes)")
+    for name, size in bundle["sizes"].items():
+        print(f"   {name}: {size:,} bytes")
+
+    # Prebuild the search index so the browser does not have to
+    start = time.perf_counter()
+    search_index = build_search_index(apps, data_dir)
+    search = write_hashed_json("search", search_index, webapp_data_dir, compress=compress)
+    search.pop("content")
+    counts = index_stats(search_index)
+    print(f"🔎 Indexed {counts['terms']:,} search terms ({counts['postings']:,} postings) "
+          f"into {search['file']} in {time.perf_counter() - start:.2f}s")
+    for name, size in search["sizes"].items():
+        print(f"   {name}: {size:,} bytes")
+
     # Generate index
     index_data = {
         "generated": datetime.now().isoformat(),
         "total_apps": len(app_names),
-        "apps": sorted(app_names)
+        "apps": sorted(app_names),
+        "apps_bundle": bundle["file"],
+        "search_index": search["file"]
     }
-    
+
     # Write index to webapp public directory
-    index_file = webapp_data_dir / "index.json"
-    with open(index_file, 'w') as f:
-        json.dump(index_data, f, indent=2)
-    
+    OUTPUT_WRITER.write(webapp_data_dir / "index.json", json.dumps(index_data, indent=2))
+
     print(f"✅ Generated index.json with {len(app_names)} applications")
-    print(f"📁 Data copied to: {webapp_data_dir}")
-    
-    return True
+    print(f"📁 Data synced to: {webapp_data_dir}")
+    print(f"   Copied {stats['files_copied']} files ({stats['bytes_copied']:,} bytes), "
+          f"linked {stats['files_linked']}, "
+          f"skipped {stats['files_skipped']} unchanged ({stats['bytes_skipped']:,} bytes)")
+    print(f"   Deleted {stats['files_deleted']} stale files and {stats['apps_removed']} removed apps")
+    print(f"📄 Wrote detail.json for {len(app_dirs)} apps ({stats['detail_bytes']:,} bytes), "
+          f"{stats['sdefs_inlined']} SDEFs inlined, {stats['sdefs_deferred']} fetched on demand")
+    print(f"💾 Generated files: {OUTPUT_WRITER.summary(since=writes_before)}")
+
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync collected data into the webapp and generate its index")
+    parser.add_argument('--hash', dest='use_hash', action='store_true',
+                        help="Compare file contents instead of mtimes (use after a fresh checkout)")
+    parser.add_argument('--hardlink', action='store_true',
+                        help="Hard-link files instead of copying them (same filesystem only)")
+    parser.add_argument('--compress', action='store_true',
+                        help="Write pre-compressed .gz/.br variants of the apps bundle, search index and detail files")
+    args = parser.parse_args()
+
+    if generate_data_index(use_hash=args.use_hash, hardlink=args.hardlink, compress=args.compress) is False:
+        sys.exit(1)
 
 if __name__ == "__main__":
-    generate_data_index()
+    main()
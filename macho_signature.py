@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+Read embedded code signatures directly from Mach-O executables.
+
+This is a native replacement for `codesign -dv --entitlements :-`: the main
+executable is memory-mapped, the slice for the current architecture is
+selected from fat binaries, and the LC_CODE_SIGNATURE SuperBlob is decoded
+into the CodeDirectory (identifier, team ID, CDHash, flags), the embedded
+entitlements plist and the CMS signer certificate chain.
+
+Only the display information is decoded; signatures are not verified.
+Use `codesign --verify` for that.
+"""
+
+import hashlib
+import mmap
+import platform
+import struct
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+class MachOError(ValueError):
+    """Raised when a file is not a Mach-O binary or its signature is malformed."""
+
+FAT_MAGIC = 0xCAFEBABE
+FAT_MAGIC_64 = 0xCAFEBABF
+MH_MAGIC = 0xFEEDFACE
+MH_MAGIC_64 = 0xFEEDFACF
+LC_CODE_SIGNATURE = 0x1D
+
+CPU_TYPE_X86_64 = 0x01000007
+CPU_TYPE_ARM64 = 0x0100000C
+CPU_TYPE_NAMES = {
+    7: 'i386',
+    12: 'arm',
+    18: 'ppc',
+    CPU_TYPE_X86_64: 'x86_64',
+    CPU_TYPE_ARM64: 'arm64',
+    0x01000012: 'ppc64',
+}
+
+CSMAGIC_EMBEDDED_SIGNATURE = 0xFADE0CC0
+CSMAGIC_CODEDIRECTORY = 0xFADE0C02
+CSMAGIC_EMBEDDED_ENTITLEMENTS = 0xFADE7171
+CSMAGIC_BLOBWRAPPER = 0xFADE0B01
+
+CSSLOT_CODEDIRECTORY = 0
+CSSLOT_ENTITLEMENTS = 5
+CSSLOT_DER_ENTITLEMENTS = 7
+CSSLOT_ALTERNATE_CODEDIRECTORIES = range(0x1000, 0x1005)
+CSSLOT_SIGNATURESLOT = 0x10000
+
+# Special slot holding the hash of _CodeSignature/CodeResources
+RESOURCE_DIR_SPECIAL_SLOT = 3
+
+CS_ADHOC = 0x2
+CS_RUNTIME = 0x10000
+
+# hashType -> (hashlib name, digest size)
+HASH_TYPES = {
+    1: ('sha1', 20),
+    2: ('sha256', 32),
+    3: ('sha256', 20),
+    4: ('sha384', 48),
+}
+# The CodeDirectory codesign reports when there are several, best first
+HASH_TYPE_PRIORITY = (4, 2, 3, 1)
+
+# CDHashes are displayed truncated to 20 bytes
+CDHASH_LENGTH = 20
+
+OID_COMMON_NAME = bytes([0x55, 0x04, 0x03])
+
+def preferred_cpu_type() -> Optional[int]:
+    """CPU type of the slice codesign would display on this machine."""
+    machine = platform.machine().lower()
+    if machine in ('arm64', 'aarch64'):
+        return CPU_TYPE_ARM64
+    if machine in ('x86_64', 'amd64'):
+        return CPU_TYPE_X86_64
+    return None
+
+def select_slice(data, cpu_type: Optional[int] = None) -> Tuple[int, int, int]:
+    """
+    Locate the Mach-O slice to read.
+
+    Args:
+        data: Whole file contents (bytes or mmap)
+        cpu_type: Preferred CPU type for fat binaries (defaults to this machine's)
+
+    Returns:
+        Tuple of (slice offset, slice size, CPU type)
+
+    Raises:
+        MachOError: If the data is not a Mach-O or fat binary
+    """
+    if len(data) < 8:
+        raise MachOError("File too small for a Mach-O header")
+
+    magic = struct.unpack_from('>I', data, 0)[0]
+    if magic in (FAT_MAGIC, FAT_MAGIC_64):
+        nfat_arch = struct.unpack_from('>I', data, 4)[0]
+        # Java class files share FAT_MAGIC; they have a large version number here
+        if not 0 < nfat_arch < 32:
+            raise MachOError("Not a fat Mach-O binary")
+
+        slices = []
+        position = 8
+        for _ in range(nfat_arch):
+            if magic == FAT_MAGIC:
+                arch_type, _, offset, size, _ = struct.unpack_from('>iiIII', data, position)
+                position += 20
+            else:
+                arch_type, _, offset, size, _, _ = struct.unpack_from('>iiQQII', data, position)
+                position += 32
+            if offset + size > len(data):
+                raise MachOError("Fat slice extends past the end of the file")
+            slices.append((offset, size, arch_type))
+
+        wanted = cpu_type if cpu_type is not None else preferred_cpu_type()
+        for slice_info in slices:
+            if slice_info[2] == wanted:
+                return slice_info
+        return slices[0]
+
+    header = mach_header(data, 0)
+    return 0, len(data), header['cpu_type']
+
+def mach_header(data, offset: int) -> Dict:
+    """
+    Parse a thin Mach-O header.
+
+    Returns:
+        Dictionary with byte order, CPU type, number of load commands and
+        the offset of the first load command
+
+    Raises:
+        MachOError: If there is no Mach-O header at offset
+    """
+    if offset + 28 > len(data):
+        raise MachOError("Truncated Mach-O header")
+
+    for byte_order in ('<', '>'):
+        magic = struct.unpack_from(byte_order + 'I', data, offset)[0]
+        if magic in (MH_MAGIC, MH_MAGIC_64):
+            break
+    else:
+        raise MachOError(f"Bad Mach-O magic 0x{magic:08x}")
+
+    cpu_type, _, _, ncmds, sizeofcmds, _ = struct.unpack_from(byte_order + 'iiIIII', data, offset + 4)
+    return {
+        'byte_order': byte_order,
+        'cpu_type': cpu_type,
+        'ncmds': ncmds,
+        'sizeofcmds': sizeofcmds,
+        'commands_offset': offset + (32 if magic == MH_MAGIC_64 else 28),
+    }
+
+def find_code_signature(data, slice_offset: int, slice_size: int) -> Optional[Tuple[int, int]]:
+    """
+    Find the LC_CODE_SIGNATURE load command of a slice.
+
+    Returns:
+        Tuple of (absolute file offset, size) of the signature, or None if unsigned
+    """
+    header = mach_header(data, slice_offset)
+    byte_order = header['byte_order']
+    position = header['commands_offset']
+    commands_end = position + header['sizeofcmds']
+
+    for _ in range(header['ncmds']):
+        if position + 8 > commands_end:
+            raise MachOError("Load commands extend past sizeofcmds")
+        cmd, cmdsize = struct.unpack_from(byte_order + 'II', data, position)
+        if cmdsize < 8:
+            raise MachOError(f"Invalid load command size {cmdsize}")
+        if cmd == LC_CODE_SIGNATURE:
+            dataoff, datasize = struct.unpack_from(byte_order + 'II', data, position + 8)
+            if dataoff + datasize > slice_size:
+                raise MachOError("Code signature extends past the end of the slice")
+            return slice_offset + dataoff, datasize
+        position += cmdsize
+    return None
+
+def parse_superblob(signature: bytes) -> Dict[int, bytes]:
+    """
+    Split an embedded signature SuperBlob into its blobs.
+
+    Returns:
+        Dictionary of slot type -> blob bytes (including the blob header)
+    """
+    if len(signature) < 12:
+        raise MachOError("Truncated code signature")
+    magic, length, count = struct.unpack_from('>III', signature, 0)
+    if magic != CSMAGIC_EMBEDDED_SIGNATURE:
+        raise MachOError(f"Bad SuperBlob magic 0x{magic:08x}")
+
+    blobs = {}
+    for index in range(count):
+        slot_type, offset = struct.unpack_from('>II', signature, 12 + index * 8)
+        if offset + 8 > len(signature):
+            raise MachOError(f"Blob for slot 0x{slot_type:x} is out of bounds")
+        blob_length = struct.unpack_from('>I', signature, offset + 4)[0]
+        blobs[slot_type] = signature[offset:offset + blob_length]
+    return blobs
+
+def _c_string(blob: bytes, offset: int) -> str:
+    end = blob.find(b'\0', offset)
+    if end == -1:
+        end = len(blob)
+    return blob[offset:end].decode('utf-8', errors='replace')
+
+def parse_code_directory(blob: bytes) -> Dict:
+    """
+    Decode a CodeDirectory blob.
+
+    Returns:
+        Dictionary with identifier, team_identifier (None if not set),
+        version, flags, hash_type, cdhash and sealed_resources
+    """
+    if len(blob) < 44:
+        raise MachOError("Truncated CodeDirectory")
+    (magic, length, version, flags, hash_offset, ident_offset, n_special_slots,
+     _, _, hash_size, hash_type) = struct.unpack_from('>IIIIIIIIIBB', blob, 0)
+    if magic != CSMAGIC_CODEDIRECTORY:
+        raise MachOError(f"Bad CodeDirectory magic 0x{magic:08x}")
+    if hash_type not in HASH_TYPES:
+        raise MachOError(f"Unknown CodeDirectory hash type {hash_type}")
+
+    team_identifier = None
+    if version >= 0x20200 and len(blob) >= 52:
+        team_offset = struct.unpack_from('>I', blob, 48)[0]
+        if team_offset:
+            team_identifier = _c_string(blob, team_offset)
+
+    sealed_resources = False
+    if n_special_slots >= RESOURCE_DIR_SPECIAL_SLOT:
+        slot_start = hash_offset - RESOURCE_DIR_SPECIAL_SLOT * hash_size
+        sealed_resources = any(blob[slot_start:slot_start + hash_size])
+
+    algorithm, _ = HASH_TYPES[hash_type]
+    cdhash = hashlib.new(algorithm, blob[:length]).digest()[:CDHASH_LENGTH]
+
+    return {
+        'identifier': _c_string(blob, ident_offset),
+        'team_identifier': team_identifier,
+        'version': version,
+        'flags': flags,
+        'hash_type': hash_type,
+        'cdhash': cdhash.hex(),
+        'sealed_resources': sealed_resources,
+    }
+
+def _der_element(data: bytes, position: int) -> Tuple[int, int, int, int]:
+    """
+    Read one BER/DER element header.
+
+    Indefinite lengths (used by the outer layers of Apple's CMS blobs) are
+    resolved by walking the children up to the end-of-contents marker.
+
+    Returns:
+        Tuple of (tag, content start, content end, offset of the next element)
+    """
+    if position + 2 > len(data):
+        raise MachOError("Truncated DER element")
+    tag = data[position]
+    length = data[position + 1]
+    position += 2
+
+    if length == 0x80:
+        end = position
+        while data[end:end + 2] != b'\0\0':
+            end = _der_element(data, end)[3]
+            if end >= len(data):
+                raise MachOError("Unterminated indefinite-length element")
+        return tag, position, end, end + 2
+
+    if length & 0x80:
+        length_bytes = length & 0x7F
+        length = int.from_bytes(data[position:position + length_bytes], 'big')
+        position += length_bytes
+    if position + length > len(data):
+        raise MachOError("DER element extends past the end of its parent")
+    return tag, position, position + length, position + length
+
+def _der_children(data: bytes, start: int, end: int) -> List[Tuple[int, int, int, int]]:
+    """Return (tag, content start, content end, element start) for each child."""
+    children = []
+    position = start
+    while position < end:
+        if data[position:position + 2] == b'\0\0':
+            break
+        tag, content_start, content_end, next_position = _der_element(data, position)
+        children.append((tag, content_start, content_end, position))
+        position = next_position
+    return children
+
+def _decode_der_string(tag: int, value: bytes) -> str:
+    if tag == 0x1E:  # BMPString
+        return value.decode('utf-16-be', errors='replace')
+    if tag == 0x14:  # T61String
+        return value.decode('latin-1')
+    return value.decode('utf-8', errors='replace')
+
+def _name_common_name(data: bytes, start: int, end: int) -> Optional[str]:
+    """Return the commonName of an X.501 Name, if it has one."""
+    for _, rdn_start, rdn_end, _ in _der_children(data, start, end):
+        for _, attr_start, attr_end, _ in _der_children(data, rdn_start, rdn_end):
+            attribute = _der_children(data, attr_start, attr_end)
+            if len(attribute) == 2 and data[attribute[0][1]:attribute[0][2]] == OID_COMMON_NAME:
+                value_tag, value_start, value_end, _ = attribute[1]
+                return _decode_der_string(value_tag, data[value_start:value_end])
+    return None
+
+def _parse_certificate(data: bytes, start: int, end: int) -> Dict:
+    tbs = _der_children(data, start, end)[0]
+    fields = _der_children(data, tbs[1], tbs[2])
+    if fields and fields[0][0] == 0xA0:  # explicit version
+        fields = fields[1:]
+    serial, _, issuer, _, subject = fields[:5]
+    return {
+        'serial': data[serial[1]:serial[2]],
+        'issuer': data[issuer[1]:issuer[2]],
+        'subject': data[subject[1]:subject[2]],
+        'common_name': _name_common_name(data, subject[1], subject[2]),
+    }
+
+def parse_cms_authorities(der: bytes) -> List[str]:
+    """
+    Return the signer certificate chain of a CMS SignedData blob, leaf first.
+
+    The chain is ordered like codesign's Authority= lines: the certificate
+    that produced the signature, then each issuer up to the root.
+    """
+    if not der:
+        return []
+
+    _, content_start, content_end, _ = _der_element(der, 0)
+    content_info = _der_children(der, content_start, content_end)
+    if len(content_info) < 2:
+        raise MachOError("CMS blob has no SignedData")
+    explicit = content_info[1]
+    signed_data = _der_children(der, explicit[1], explicit[2])[0]
+
+    certificates = []
+    signer_ids = []
+    for tag, start, end, _ in _der_children(der, signed_data[1], signed_data[2]):
+        if tag == 0xA0:
+            certificates = [_parse_certificate(der, cert_start, cert_end)
+                            for _, cert_start, cert_end, _ in _der_children(der, start, end)]
+        elif tag == 0x31:
+            # The last SET in SignedData holds the SignerInfos
+            signer_ids = []
+            for _, signer_start, signer_end, _ in _der_children(der, start, end):
+                signer_fields = _der_children(der, signer_start, signer_end)
+                if len(signer_fields) > 1 and signer_fields[1][0] == 0x30:
+                    issuer, serial = _der_children(der, signer_fields[1][1], signer_fields[1][2])[:2]
+                    signer_ids.append((der[issuer[1]:issuer[2]], der[serial[1]:serial[2]]))
+    if not certificates:
+        return []
+
+    leaf = None
+    for issuer, serial in signer_ids:
+        leaf = next((c for c in certificates if c['issuer'] == issuer and c['serial'] == serial), None)
+        if leaf:
+            break
+    if leaf is None:
+        # No issuer/serial signer id: the leaf is the certificate that issued nothing
+        issuers = {c['issuer'] for c in certificates if c['issuer'] != c['subject']}
+        leaf = next((c for c in certificates if c['subject'] not in issuers), certificates[0])
+
+    chain = [leaf]
+    while chain[-1]['issuer'] != chain[-1]['subject']:
+        issuer = next((c for c in certificates
+                       if c['subject'] == chain[-1]['issuer'] and c not in chain), None)
+        if issuer is None:
+            break
+        chain.append(issuer)
+    return [c['common_name'] or 'Unknown' for c in chain]
+
+def read_code_signature(executable_path: Path, cpu_type: Optional[int] = None) -> Optional[Dict]:
+    """
+    Read the embedded code signature of a Mach-O executable.
+
+    Args:
+        executable_path: Path to the Mach-O (thin or fat) executable
+        cpu_type: Slice to read from fat binaries (defaults to this machine's)
+
+    Returns:
+        Dictionary with architecture, identifier, team_identifier, cdhash,
+        hash_type, flags, code_directory_version, sealed_resources,
+        entitlements (XML text or None), der_entitlements (bool) and
+        authorities (list, empty for ad-hoc signatures); or None if the
+        executable is not signed
+
+    Raises:
+        MachOError: If the file is not a Mach-O binary or the signature is malformed
+        OSError: If the file cannot be read
+    """
+    with open(executable_path, 'rb') as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise MachOError("Empty file")
+
+    with data:
+        try:
+            slice_offset, slice_size, slice_cpu_type = select_slice(data, cpu_type)
+            location = find_code_signature(data, slice_offset, slice_size)
+            if location is None:
+                return None
+            signature = data[location[0]:location[0] + location[1]]
+        except struct.error as e:
+            raise MachOError(f"Truncated Mach-O: {e}") from e
+
+    try:
+        blobs = parse_superblob(signature)
+        directories = [parse_code_directory(blob) for slot, blob in blobs.items()
+                       if slot == CSSLOT_CODEDIRECTORY or slot in CSSLOT_ALTERNATE_CODEDIRECTORIES]
+        if not directories:
+            raise MachOError("Signature has no CodeDirectory")
+        directory = min(directories, key=lambda d: HASH_TYPE_PRIORITY.index(d['hash_type']))
+
+        entitlements = None
+        entitlements_blob = blobs.get(CSSLOT_ENTITLEMENTS)
+        if entitlements_blob and struct.unpack_from('>I', entitlements_blob, 0)[0] == CSMAGIC_EMBEDDED_ENTITLEMENTS:
+            entitlements = entitlements_blob[8:].decode('utf-8', errors='replace')
+
+        authorities = []
+        cms_blob = blobs.get(CSSLOT_SIGNATURESLOT)
+        if cms_blob and struct.unpack_from('>I', cms_blob, 0)[0] == CSMAGIC_BLOBWRAPPER:
+            authorities = parse_cms_authorities(cms_blob[8:])
+    except (struct.error, IndexError, ValueError) as e:
+        if isinstance(e, MachOError):
+            raise
+        raise MachOError(f"Malformed code signature: {e}") from e
+
+    return {
+        'architecture': CPU_TYPE_NAMES.get(slice_cpu_type, hex(slice_cpu_type & 0xFFFFFFFF)),
+        'identifier': directory['identifier'],
+        'team_identifier': directory['team_identifier'],
+        'cdhash': directory['cdhash'],
+        'hash_type': HASH_TYPES[directory['hash_type']][0],
+        'flags': directory['flags'],
+        'code_directory_version': directory['version'],
+        'sealed_resources': directory['sealed_resources'],
+        'entitlements': entitlements,
+        'der_entitlements': CSSLOT_DER_ENTITLEMENTS in blobs,
+        'authorities': authorities,
+    }
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Atomic, write-only-if-changed file output.
+
+The daily workflow commits data/ after every run, so rewriting files whose
+content did not change only produces churn: new mtimes, a slower
+`git add`/`git diff --cached`, and rebuilt webapp copies. OutputWriter
+compares new content with what is already on disk and leaves identical
+files untouched. Files that did change are written to a temporary file in
+the same directory, fsynced and renamed into place, so a crash never leaves
+a truncated artifact behind.
+
+OUTPUT_WRITER is shared by the collector and the SDEF store so a run can
+report one total of bytes written vs. skipped.
+"""
+
+import os
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Optional, Union
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """
+    Replace path with data via a temporary file and a rename.
+
+    Args:
+        path: Destination file (its directory must exist)
+        data: Complete new content
+    """
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            # Otherwise a crash soon after the rename can leave an empty file behind
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+
+def has_content(path: Path, data: bytes) -> bool:
+    """True if path is a regular file holding exactly data (sizes are compared first)."""
+    try:
+        if path.is_symlink() or path.stat().st_size != len(data):
+            return False
+        return path.read_bytes() == data
+    except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+        return False
+
+class OutputWriter:
+    """
+    Writes files atomically and only when their content changed.
+
+    Safe to share between worker threads. stats counts files_written,
+    bytes_written, files_skipped, bytes_skipped and files_removed.
+    """
+
+    def __init__(self):
+        self.stats = Counter()
+        self._lock = threading.Lock()
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self.stats[key] += amount
+
+    def write(self, path: Path, content: Union[str, bytes]) -> bool:
+        """
+        Write content to path unless the file already holds exactly that content.
+
+        Args:
+            path: Destination file
+            content: Text (encoded as UTF-8) or bytes
+
+        Returns:
+            True if the file was written, False if it was already up to date
+        """
+        data = content.encode('utf-8') if isinstance(content, str) else content
+        if has_content(path, data):
+            self._count('files_skipped')
+            self._count('bytes_skipped', len(data))
+            return False
+
+        write_atomic(path, data)
+        self._count('files_written')
+        self._count('bytes_written', len(data))
+        return True
+
+    def copy(self, source: Path, path: Path) -> bool:
+        """Copy source to path unless path already has the same content."""
+        return self.write(path, source.read_bytes())
+
+    def remove(self, path: Path) -> bool:
+        """Delete path if it exists; returns True if a file was removed."""
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            return False
+        self._count('files_removed')
+        return True
+
+    def summary(self, since: Optional[Counter] = None) -> str:
+        """
+        One-line description of the writes so far.
+
+        Args:
+            since: Copy of stats taken earlier, to describe only the writes after it
+        """
+        with self._lock:
+            stats = self.stats - since if since is not None else Counter(self.stats)
+        return (f"{stats['files_written']} files written ({stats['bytes_written']:,} bytes), "
+                f"{stats['files_skipped']} unchanged skipped ({stats['bytes_skipped']:,} bytes)")
+
+OUTPUT_WRITER = OutputWriter()
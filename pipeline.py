@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Threaded producer/consumer pipeline with bounded queues.
+
+Items produced by a source iterable flow through a sequence of stages, each
+with its own worker threads, connected by bounded queues. A full queue blocks
+the stage feeding it (backpressure), so however many items the source yields
+only a bounded number are in flight at once, and the first item reaches the
+last stage as soon as it is produced.
+
+Every stage records how many items it handled, the time its workers spent
+working, starved (waiting for input) and blocked (waiting for room
+downstream), and the depth of its input queue. The stage with the highest
+utilization is the bottleneck to give more workers to.
+"""
+
+import queue
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+# End-of-input marker, one per worker of the receiving stage
+_DONE = object()
+
+class Stage:
+    """
+    One pipeline stage.
+
+    func receives an item and returns the item for the next stage, or None to
+    drop it (e.g. when the item was fully handled early).
+    """
+
+    def __init__(self, name: str, func: Callable, workers: int = 1):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+
+class Pipeline:
+    """Runs items from a source through stages connected by bounded queues."""
+
+    def __init__(self, stages: Sequence[Stage], queue_size: int = 32, source_name: str = "source"):
+        self.stages = list(stages)
+        self.queue_size = queue_size
+        self.source_name = source_name
+        self.metrics: Dict[str, Counter] = {}
+        self.wall_time = 0.0
+        self.first_output: Optional[float] = None
+        self._lock = threading.Lock()
+        self._error: Optional[BaseException] = None
+
+    def _count(self, stage: str, key: str, amount=1) -> None:
+        with self._lock:
+            self.metrics[stage][key] += amount
+
+    def _put(self, sender: str, receiver: str, target: queue.Queue, item) -> None:
+        start = time.perf_counter()
+        target.put(item)
+        depth = target.qsize()
+        with self._lock:
+            self.metrics[sender]['blocked'] += time.perf_counter() - start
+            metrics = self.metrics[receiver]
+            metrics['queue_samples'] += 1
+            metrics['queue_depth_total'] += depth
+            metrics['queue_max'] = max(metrics['queue_max'], depth)
+
+    def _fail(self, error: BaseException) -> None:
+        with self._lock:
+            if self._error is None:
+                self._error = error
+
+    def run(self, source: Iterable) -> List:
+        """
+        Feed every item from source through the stages.
+
+        Returns:
+            The items returned by the last stage, in completion order
+
+        Raises:
+            The first exception raised by the source or a stage, once every
+            thread has stopped
+        """
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        self.metrics = {name: Counter() for name in [self.source_name] + [stage.name for stage in self.stages]}
+        finished = Counter()
+        outputs = []
+        started = time.perf_counter()
+
+        def produce():
+            iterator = iter(source)
+            try:
+                while self._error is None:
+                    start = time.perf_counter()
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        break
+                    self._count(self.source_name, 'busy', time.perf_counter() - start)
+                    self._count(self.source_name, 'items')
+                    self._put(self.source_name, self.stages[0].name, queues[0], item)
+            except BaseException as e:
+                self._fail(e)
+            finally:
+                for _ in range(self.stages[0].workers):
+                    queues[0].put(_DONE)
+
+        def work(index: int):
+            stage = self.stages[index]
+            last = index == len(self.stages) - 1
+            while True:
+                start = time.perf_counter()
+                item = queues[index].get()
+                self._count(stage.name, 'starved', time.perf_counter() - start)
+                if item is _DONE:
+                    break
+                if self._error is not None:
+                    # Keep draining so upstream stages are never blocked
+                    continue
+
+                start = time.perf_counter()
+                try:
+                    result = stage.func(item)
+                except BaseException as e:
+                    self._fail(e)
+                    continue
+                self._count(stage.name, 'busy', time.perf_counter() - start)
+                self._count(stage.name, 'items')
+                if result is None:
+                    continue
+                if last:
+                    with self._lock:
+                        outputs.append(result)
+                        if self.first_output is None:
+                            self.first_output = time.perf_counter() - started
+                else:
+                    self._put(stage.name, self.stages[index + 1].name, queues[index + 1], result)
+
+            with self._lock:
+                finished[index] += 1
+                all_done = finished[index] == stage.workers
+            if all_done and not last:
+                for _ in range(self.stages[index + 1].workers):
+                    queues[index + 1].put(_DONE)
+
+        threads = [threading.Thread(target=produce, name=f"pipeline-{self.source_name}")]
+        for index, stage in enumerate(self.stages):
+            threads.extend(threading.Thread(target=work, args=(index,), name=f"pipeline-{stage.name}-{n}")
+                           for n in range(stage.workers))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.wall_time = time.perf_counter() - started
+
+        if self._error is not None:
+            raise self._error
+        return outputs
+
+    def summary(self) -> Dict:
+        """
+        Per-stage metrics of the last run.
+
+        Returns:
+            JSON-serializable dictionary with the wall time, the time until
+            the first item left the pipeline, and for each stage its workers,
+            items, throughput, busy/starved/blocked seconds, utilization and
+            input queue depth (mean and max)
+        """
+        workers = {self.source_name: 1, **{stage.name: stage.workers for stage in self.stages}}
+        wall = self.wall_time or 1e-9
+        stages = {}
+        for name, metrics in self.metrics.items():
+            samples = metrics['queue_samples']
+            stages[name] = {
+                'workers': workers[name],
+                'items': metrics['items'],
+                'items_per_second': round(metrics['items'] / wall, 3),
+                'busy': round(metrics['busy'], 6),
+                'starved': round(metrics['starved'], 6),
+                'blocked': round(metrics['blocked'], 6),
+                'utilization': round(metrics['busy'] / (wall * workers[name]), 3),
+                'queue_mean': round(metrics['queue_depth_total'] / samples, 2) if samples else 0.0,
+                'queue_max': metrics['queue_max'],
+            }
+        return {
+            'wall_time': round(self.wall_time, 6),
+            'first_output': round(self.first_output, 6) if self.first_output is not None else None,
+            'queue_size': self.queue_size,
+            'stages': stages,
+        }
+
+def format_pipeline_summary(summary: Dict) -> List[str]:
+    """Render Pipeline.summary() as table rows, flagging the busiest stage."""
+    stages = summary['stages']
+    if not stages:
+        return []
+    bottleneck = max(stages, key=lambda name: stages[name]['utilization'])
+    width = max(len('Stage'), *(len(name) for name in stages))
+    lines = [f"{'Stage':<{width}}  {'workers':>7}  {'items':>7}  {'items/s':>9}  {'busy%':>6}  "
+             f"{'starved':>8}  {'blocked':>8}  {'queue':>11}"]
+    for name, stage in stages.items():
+        lines.append(
+            f"{name:<{width}}  {stage['workers']:>7}  {stage['items']:>7}  {stage['items_per_second']:>9.1f}  "
+            f"{stage['utilization'] * 100:>5.0f}%  {stage['starved']:>7.2f}s  {stage['blocked']:>7.2f}s  "
+            f"{stage['queue_mean']:>5.1f}/{stage['queue_max']:<5}" + ("  ← bottleneck" if name == bottleneck else "")
+        )
+    return lines
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Append-only progress journal for collection runs.
+
+The fingerprint index is only saved once a run finishes, so a run killed
+halfway (runner timeout, hung tool) used to leave no record of what it had
+done, and the next run redid everything. Worse, the app being written when
+the process died could be left half-written but still look unchanged to the
+fingerprint check.
+
+The journal (.cache/journal.jsonl, outside the published data/) gets one
+JSON line when an application starts and one when it completes, with the
+bundle fingerprints and a SHA-256 of every file written to its data
+directory. Each line is flushed and
+fsynced before processing continues, so after a crash:
+
+- applications with a "complete" entry whose fingerprints and output hashes
+  still match are skipped by --resume;
+- applications with a "start" entry but no "complete" entry were
+  interrupted: their data directory is removed and they are collected again.
+
+A torn last line (the process died mid-write) is ignored.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List
+
+JOURNAL_NAME = "journal.jsonl"
+
+EVENT_START = "start"
+EVENT_COMPLETE = "complete"
+
+def hash_app_outputs(app_dir: Path) -> Dict[str, str]:
+    """
+    Hash the files directly inside an app's data directory.
+
+    Args:
+        app_dir: Application directory in data/
+
+    Returns:
+        Dictionary of file name -> SHA-256 hex digest
+    """
+    hashes = {}
+    if not app_dir.is_dir():
+        return hashes
+    for path in sorted(app_dir.iterdir()):
+        if path.is_file() and not path.name.startswith('.'):
+            hashes[path.name] = hashlib.sha256(path.read_bytes()).hexdigest()
+    return hashes
+
+class ProgressJournal:
+    """Crash-safe record of which applications a run has started and completed."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        # Last entry per application name from the journal found on disk
+        self.previous: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._file = None
+
+    def open(self, resume: bool = False) -> None:
+        """
+        Read the existing journal and start recording.
+
+        Args:
+            resume: Keep appending to the existing journal; otherwise it is
+                    replaced once it has been read (interrupted applications
+                    are still detected either way)
+        """
+        self.previous = self.read(self.path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'a' if resume else 'w', encoding='utf-8')
+        if resume and self._file.tell() > 0:
+            with open(self.path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    # Terminate a torn last line so the next entry starts on its own line
+                    self._file.write("\n")
+        if not resume:
+            # Carry interrupted applications over until a run redoes them
+            for name in self.interrupted_apps():
+                self._append(self.previous[name])
+
+    def close(self) -> None:
+        """Stop recording."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    @staticmethod
+    def read(path: Path) -> Dict[str, Dict]:
+        """
+        Read a journal, keeping the last entry for each application.
+
+        Args:
+            path: Journal file
+
+        Returns:
+            Dictionary of application name -> last entry (empty if there is no journal)
+        """
+        entries = {}
+        try:
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        entries[entry['app']] = entry
+                    except (ValueError, KeyError, TypeError):
+                        # Torn write from a killed run
+                        continue
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def _append(self, entry: Dict) -> None:
+        line = json.dumps(entry, sort_keys=True) + "\n"
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def record_start(self, app_name: str, app_bundles: List[Path]) -> None:
+        """Record that an application's data directory is about to be written."""
+        self._append({'event': EVENT_START, 'app': app_name, 'bundles': [str(b) for b in app_bundles]})
+
+    def record_complete(self, app_name: str, fingerprints: Dict[str, Dict], app_dir: Path) -> None:
+        """
+        Record that an application finished, with its outputs' hashes.
+
+        Args:
+            app_name: Application (data directory) name
+            fingerprints: Bundle path -> fingerprint for every bundle in the group
+            app_dir: The application's data directory
+        """
+        self._append({'event': EVENT_COMPLETE, 'app': app_name, 'fingerprints': fingerprints,
+                      'outputs': hash_app_outputs(app_dir)})
+
+    def was_interrupted(self, app_name: str) -> bool:
+        """True if the journal on disk shows the application started but never completed."""
+        entry = self.previous.get(app_name)
+        return entry is not None and entry.get('event') == EVENT_START
+
+    def is_complete(self, app_name: str, fingerprints: Dict[str, Dict], app_dir: Path) -> bool:
+        """
+        True if the journal on disk shows the application completed with the
+        same bundle fingerprints and its outputs are unchanged since.
+        """
+        entry = self.previous.get(app_name)
+        if entry is None or entry.get('event') != EVENT_COMPLETE or entry.get('fingerprints') != fingerprints:
+            return False
+        return entry.get('outputs') == hash_app_outputs(app_dir)
+
+    def interrupted_apps(self) -> List[str]:
+        """Names of the applications the journal on disk shows as interrupted."""
+        return sorted(name for name in self.previous if self.was_interrupted(name))
+
+    def completed_apps(self) -> List[str]:
+        """Names of the applications the journal on disk shows as completed."""
+        return sorted(name for name, entry in self.previous.items() if entry.get('event') == EVENT_COMPLETE)
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Rebuild derived files from already-collected data, without touching any bundle.
+
+When the sandbox heuristics in analyze_sandbox_info() or the manifest shape
+change, every app's sandbox.txt, entitlements.json and manifest.json can be
+regenerated from the info.plist, entitlements.plist and codesign.txt stored
+in data/. Nothing here needs macOS, sudo or the original .app bundles, and
+apps are processed in a process pool. Files are only rewritten when their
+content changes, so an unchanged corpus produces no writes (and no diff).
+
+Usage: python3 reanalyze.py [--data-dir data] [--jobs N] [--dry-run]
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from collect_macos_app_data import (analyze_sandbox_info, build_manifest, format_entitlements_json, format_manifest,
+                                    format_sandbox_report, load_plist_string, parse_codesign_report)
+from output_writer import OUTPUT_WRITER, has_content
+from sdef_store import is_app_directory, list_app_sdefs
+
+# Written by process_application() when codesign reports no entitlements
+NO_ENTITLEMENTS_PREFIX = "No entitlements found"
+
+def _read_text(path: Path) -> Optional[str]:
+    try:
+        return path.read_text(encoding='utf-8')
+    except FileNotFoundError:
+        return None
+
+def derive_app_files(app_dir: Path) -> Optional[Dict[str, Optional[str]]]:
+    """
+    Compute an app's derived files from its stored data.
+
+    Args:
+        app_dir: Application directory in data/
+
+    Returns:
+        Dictionary of file name -> expected content (None if the file should
+        not exist), or None if the app has no manifest.json to start from
+    """
+    manifest_text = _read_text(app_dir / "manifest.json")
+    if manifest_text is None:
+        return None
+    manifest = json.loads(manifest_text)
+
+    codesign_info = manifest.get('codesign')
+    app_path = Path(manifest['path'])
+    codesign_text = _read_text(app_dir / "codesign.txt")
+    if codesign_text is not None:
+        stored_path, codesign_info = parse_codesign_report(codesign_text)
+        app_path = Path(stored_path) if stored_path else app_path
+
+    info_plist = None
+    info_plist_text = _read_text(app_dir / "info.plist")
+    if info_plist_text is not None:
+        try:
+            info_plist = load_plist_string(info_plist_text)
+        except ValueError:
+            # The collector writes a JSON error stub when there was no Info.plist
+            pass
+
+    derived = {}
+    entitlements = _read_text(app_dir / "entitlements.plist")
+    if entitlements is None or entitlements.startswith(NO_ENTITLEMENTS_PREFIX):
+        entitlements = None
+        derived["entitlements.json"] = format_entitlements_json({})
+    else:
+        try:
+            entitlements = load_plist_string(entitlements)
+            derived["entitlements.json"] = format_entitlements_json(entitlements)
+        except ValueError:
+            # Keep the text so the analysis records the parsing error; like the
+            # collector, write no entitlements.json for unparseable entitlements
+            derived["entitlements.json"] = None
+
+    sandbox_info = analyze_sandbox_info(app_path, info_plist, entitlements)
+    derived["sandbox.txt"] = format_sandbox_report(app_dir.name, app_path, sandbox_info)
+
+    icon_path = manifest.get('icon_path')
+    if icon_path and not (app_dir / icon_path).exists():
+        icon_path = None
+    derived["manifest.json"] = format_manifest(build_manifest(
+        manifest.get('name', app_dir.name), app_path, len(list_app_sdefs(app_dir)), icon_path,
+        codesign_info, sandbox_info,
+    ))
+    return derived
+
+def reanalyze_app(app_dir: Path, dry_run: bool = False) -> Dict:
+    """
+    Rewrite the derived files of one app whose content changed.
+
+    Args:
+        app_dir: Application directory in data/
+        dry_run: Only report which files would change
+
+    Returns:
+        Dictionary with the app name, the changed and unchanged file names,
+        and an error message if the app could not be reanalyzed
+    """
+    result = {'name': app_dir.name, 'changed': [], 'unchanged': [], 'error': None}
+    try:
+        derived = derive_app_files(app_dir)
+    except (OSError, ValueError, KeyError) as e:
+        result['error'] = str(e)
+        return result
+    if derived is None:
+        result['error'] = "no manifest.json"
+        return result
+
+    for file_name, content in derived.items():
+        path = app_dir / file_name
+        if content is None:
+            changed = path.exists() if dry_run else OUTPUT_WRITER.remove(path)
+        elif dry_run:
+            changed = not has_content(path, content.encode('utf-8'))
+        else:
+            changed = OUTPUT_WRITER.write(path, content)
+        result['changed' if changed else 'unchanged'].append(file_name)
+    return result
+
+def reanalyze_data_directory(data_dir: Path, jobs: Optional[int] = None, dry_run: bool = False) -> List[Dict]:
+    """
+    Reanalyze every app in the data directory in a process pool.
+
+    Args:
+        data_dir: Collected data directory
+        jobs: Worker processes (default: one per CPU); 1 runs in-process
+        dry_run: Only report which files would change
+
+    Returns:
+        One reanalyze_app() result per app, sorted by name
+    """
+    app_dirs = sorted(d for d in data_dir.iterdir() if is_app_directory(d))
+    if jobs == 1:
+        return [reanalyze_app(app_dir, dry_run) for app_dir in app_dirs]
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(reanalyze_app, app_dirs, [dry_run] * len(app_dirs),
+                                 chunksize=max(1, len(app_dirs) // (4 * (jobs or os.cpu_count() or 1)))))
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild sandbox.txt, entitlements.json and manifest.json "
+                                                 "from already-collected data")
+    parser.add_argument('--data-dir', type=Path, default=Path(__file__).parent / "data",
+                        help="Collected data directory (default: ./data)")
+    parser.add_argument('--jobs', type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument('--dry-run', action='store_true', help="Report what would change without writing")
+    args = parser.parse_args()
+
+    if not args.data_dir.is_dir():
+        print(f"❌ Data directory not found: {args.data_dir}")
+        return
+
+    start = time.perf_counter()
+    results = reanalyze_data_directory(args.data_dir, jobs=args.jobs, dry_run=args.dry_run)
+    elapsed = time.perf_counter() - start
+
+    changed_files = Counter(name for result in results for name in result['changed'])
+    changed_apps = [result['name'] for result in results if result['changed']]
+    failed = [result for result in results if result['error']]
+
+    print(f"{'🔍 Would update' if args.dry_run else '♻️ Updated'} {len(changed_apps)} of {len(results)} apps "
+          f"in {elapsed:.2f}s ({sum(len(result['unchanged']) for result in results)} files unchanged)")
+    for file_name, count in sorted(changed_files.items()):
+        print(f"   {file_name}: {count}")
+    for result in failed:
+        print(f"⚠️ {result['name']}: {result['error']}")
+
+if __name__ == "__main__":
+    main()
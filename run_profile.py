@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Timing instrumentation for collection runs.
+
+A RunProfile records wall time per stage (discovery, sdef, codesign,
+entitlements, info_plist, sandbox, icon, write), per application, together
+with external tool spawns and bytes written. Worker threads attribute their
+measurements to the application they are processing through a thread-local
+"current app", so one profile can be shared by the whole thread pool.
+
+At the end of a run the profile is written as run_profile.json and the
+slowest applications are printed as a table.
+"""
+
+import json
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# Stages in the order they run for each application
+STAGES = ("discovery", "sdef", "codesign", "entitlements", "info_plist", "sandbox", "icon", "write")
+
+class RunProfile:
+    """Per-app and per-stage wall times, tool spawns and bytes written for one run."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.started_at = datetime.now()
+        self.run_stages: Counter = Counter()
+        self.apps: Dict[str, Dict] = defaultdict(lambda: {
+            'total': 0.0, 'stages': Counter(), 'tool_spawns': Counter(), 'bytes_written': 0,
+        })
+        self.run_tool_spawns: Counter = Counter()
+        self.run_bytes_written = 0
+        # Pipeline.summary() of a streaming run, if any
+        self.pipeline: Optional[Dict] = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def current_app(self) -> Optional[str]:
+        """Application the calling thread is processing, or None outside process_application."""
+        return getattr(self._local, 'app', None)
+
+    @contextmanager
+    def app(self, name: str) -> Iterator[None]:
+        """Attribute everything measured in this block (on this thread) to an application."""
+        previous = self.current_app
+        self._local.app = name
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._local.app = previous
+            with self._lock:
+                self.apps[name]['total'] += elapsed
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time a stage for the current application (or the run as a whole)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            app = self.current_app
+            with self._lock:
+                if app is None:
+                    self.run_stages[name] += elapsed
+                else:
+                    self.apps[app]['stages'][name] += elapsed
+
+    def iterate(self, stage: str, iterable: Iterable) -> Iterator:
+        """Yield from iterable, timing each step as a stage (e.g. lazy discovery)."""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(stage):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def count_spawn(self, tool: str) -> None:
+        """Record one external tool process."""
+        app = self.current_app
+        with self._lock:
+            if app is None:
+                self.run_tool_spawns[tool] += 1
+            else:
+                self.apps[app]['tool_spawns'][tool] += 1
+
+    def count_bytes(self, size: int) -> None:
+        """Record bytes written to the data directory."""
+        app = self.current_app
+        with self._lock:
+            if app is None:
+                self.run_bytes_written += size
+            else:
+                self.apps[app]['bytes_written'] += size
+
+    def slowest_apps(self, count: int = 10) -> List[Dict]:
+        """The applications with the highest total time, slowest first."""
+        with self._lock:
+            ranked = sorted(self.apps.items(), key=lambda item: (-item[1]['total'], item[0]))[:count]
+            return [{'name': name, 'total': app['total'], 'stages': dict(app['stages'])} for name, app in ranked]
+
+    def to_dict(self, top: int = 10) -> Dict:
+        """
+        Summarize the run.
+
+        Args:
+            top: Number of applications to list under "slowest"
+
+        Returns:
+            JSON-serializable dictionary with run totals, per-stage totals,
+            the slowest applications and every application's measurements
+        """
+        with self._lock:
+            stage_totals = Counter(self.run_stages)
+            tool_spawns = Counter(self.run_tool_spawns)
+            bytes_written = self.run_bytes_written
+            apps = {}
+            for name, app in sorted(self.apps.items()):
+                stage_totals.update(app['stages'])
+                tool_spawns.update(app['tool_spawns'])
+                bytes_written += app['bytes_written']
+                apps[name] = {
+                    'total': round(app['total'], 6),
+                    'stages': {stage: round(seconds, 6) for stage, seconds in sorted(
+                        app['stages'].items(), key=lambda item: _stage_order(item[0]))},
+                    'tool_spawns': dict(sorted(app['tool_spawns'].items())),
+                    'bytes_written': app['bytes_written'],
+                }
+
+        return {
+            'generated': self.started_at.isoformat(),
+            'wall_time': round(time.perf_counter() - self.started, 6),
+            'stages': {stage: round(seconds, 6) for stage, seconds in sorted(
+                stage_totals.items(), key=lambda item: _stage_order(item[0]))},
+            'tool_spawns': dict(sorted(tool_spawns.items())),
+            'bytes_written': bytes_written,
+            'app_count': len(apps),
+            'slowest': [{'name': app['name'], 'total': round(app['total'], 6)} for app in self.slowest_apps(top)],
+            'pipeline': self.pipeline,
+            'apps': apps,
+        }
+
+    def write(self, path: Path, top: int = 10) -> Dict:
+        """Write the summary as JSON and return it."""
+        summary = self.to_dict(top)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(summary, f, indent=2)
+            f.write("\n")
+        return summary
+
+    def format_slowest(self, count: int = 10) -> List[str]:
+        """Render the slowest applications as table rows, one column per stage."""
+        slowest = self.slowest_apps(count)
+        if not slowest:
+            return []
+        stages = [stage for stage in STAGES[1:] if any(stage in app['stages'] for app in slowest)]
+        width = max([len('Application')] + [len(app['name']) for app in slowest])
+        lines = [f"{'Application':<{width}}  {'total':>8}" + "".join(f"  {stage:>12}" for stage in stages)]
+        for app in slowest:
+            lines.append(f"{app['name']:<{width}}  {app['total']:8.3f}" + "".join(
+                f"  {app['stages'].get(stage, 0.0):12.3f}" for stage in stages))
+        return lines
+
+def _stage_order(stage: str):
+    return (STAGES.index(stage) if stage in STAGES else len(STAGES), stage)
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Content-addressed storage for collected SDEF files.
+
+Many apps ship byte-identical scripting definitions (shared system suites,
+several installed versions of the same app), so each SDEF is stored once as
+data/_blobs/<sha256> and every app directory lists the SDEFs it contains in
+sdef_refs.json ({"files": {"<name>.sdef": "<sha256>"}}).
+
+Older data directories keep their SDEFs in <app>/sdef/; list_app_sdefs()
+reads both layouts. Run `python3 sdef_store.py migrate` to convert such a
+tree and `python3 sdef_store.py gc` to drop blobs no app refers to.
+"""
+
+import argparse
+import hashlib
+import json
+import shutil
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Optional
+
+from output_writer import OUTPUT_WRITER
+
+BLOB_DIR_NAME = "_blobs"
+SDEF_REFS_NAME = "sdef_refs.json"
+LEGACY_SDEF_DIR_NAME = "sdef"
+
+def is_app_directory(path: Path) -> bool:
+    """True for per-app data directories (not _blobs, hidden or other bookkeeping entries)."""
+    return path.is_dir() and not path.name.startswith(('.', '_'))
+
+def load_sdef_refs(app_dir: Path) -> Optional[Dict[str, str]]:
+    """
+    Read an app's SDEF references.
+
+    Returns:
+        Dictionary of SDEF file name -> blob digest, or None if the app has
+        no sdef_refs.json (legacy layout or no SDEFs)
+    """
+    try:
+        with open(app_dir / SDEF_REFS_NAME) as f:
+            return json.load(f)["files"]
+    except FileNotFoundError:
+        return None
+
+def write_sdef_refs(app_dir: Path, refs: Dict[str, str]) -> None:
+    """Write an app's SDEF references (if changed), removing the file if there are none."""
+    refs_file = app_dir / SDEF_REFS_NAME
+    if not refs:
+        OUTPUT_WRITER.remove(refs_file)
+        return
+    OUTPUT_WRITER.write(refs_file, json.dumps({"files": dict(sorted(refs.items()))}, indent=2) + "\n")
+
+def list_app_sdefs(app_dir: Path) -> Dict[str, Path]:
+    """
+    List an app's SDEF files in either layout.
+
+    Args:
+        app_dir: Application directory inside the data directory
+
+    Returns:
+        Dictionary of SDEF file name -> path of its contents, sorted by name
+    """
+    refs = load_sdef_refs(app_dir)
+    if refs is not None:
+        blob_dir = app_dir.parent / BLOB_DIR_NAME
+        return {name: blob_dir / digest for name, digest in sorted(refs.items())}
+
+    legacy_dir = app_dir / LEGACY_SDEF_DIR_NAME
+    if not legacy_dir.is_dir():
+        return {}
+    return {path.name: path for path in sorted(legacy_dir.glob("*.sdef")) if path.is_file()}
+
+class SdefStore:
+    """
+    Hash-keyed blob store for SDEF files under <data_dir>/_blobs.
+
+    Safe to share between worker threads: blobs are written under a unique
+    temporary name and renamed into place, and identical content always maps
+    to the same name.
+    """
+
+    def __init__(self, data_dir: Path):
+        self.blob_dir = data_dir / BLOB_DIR_NAME
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        # References of apps being re-collected, written once by finish_app()
+        self._pending: Dict[Path, Dict[str, str]] = {}
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self.stats[key] += amount
+
+    def blob_path(self, digest: str) -> Path:
+        return self.blob_dir / digest
+
+    def add(self, source_path: Path) -> str:
+        """
+        Store a file's contents, skipping the write if the blob already exists.
+
+        Args:
+            source_path: File to store
+
+        Returns:
+            SHA-256 hex digest identifying the blob
+
+        Raises:
+            OSError: If the file cannot be read or the blob cannot be written
+        """
+        content = source_path.read_bytes()
+        digest = hashlib.sha256(content).hexdigest()
+        blob_path = self.blob_path(digest)
+
+        if blob_path.exists():
+            self._count('deduplicated')
+            self._count('bytes_deduplicated', len(content))
+            return digest
+
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        OUTPUT_WRITER.write(blob_path, content)
+        self._count('stored')
+        self._count('bytes_stored', len(content))
+        return digest
+
+    def add_to_app(self, app_dir: Path, source_path: Path) -> str:
+        """
+        Store an SDEF and reference it from an app directory.
+
+        An existing reference with the same name and content is reused; a
+        different SDEF with a clashing name gets a _1, _2, ... suffix.
+
+        Returns:
+            The name the SDEF is referenced under
+        """
+        digest = self.add(source_path)
+        with self._lock:
+            pending = self._pending.get(app_dir)
+        refs = pending if pending is not None else load_sdef_refs(app_dir) or {}
+
+        name = source_path.name
+        counter = 1
+        while name in refs and refs[name] != digest:
+            name = f"{source_path.stem}_{counter}{source_path.suffix}"
+            counter += 1
+
+        refs[name] = digest
+        if pending is None:
+            write_sdef_refs(app_dir, refs)
+        return name
+
+    def reset_app(self, app_dir: Path) -> None:
+        """
+        Start an app's SDEF references afresh (and drop any legacy sdef/
+        folder) before re-collecting it. References added until finish_app()
+        are kept in memory, so an unchanged sdef_refs.json is not rewritten.
+        """
+        with self._lock:
+            self._pending[app_dir] = {}
+        legacy_dir = app_dir / LEGACY_SDEF_DIR_NAME
+        if legacy_dir.is_dir():
+            shutil.rmtree(legacy_dir)
+
+    def finish_app(self, app_dir: Path) -> None:
+        """Write the references collected since reset_app()."""
+        with self._lock:
+            refs = self._pending.pop(app_dir, None)
+        if refs is not None:
+            write_sdef_refs(app_dir, refs)
+
+    def remove_unreferenced(self, data_dir: Path) -> Dict[str, int]:
+        """
+        Delete blobs that no app directory refers to.
+
+        Returns:
+            Dictionary with the number of blobs and bytes removed
+        """
+        referenced = set()
+        for app_dir in data_dir.iterdir():
+            if is_app_directory(app_dir):
+                referenced.update((load_sdef_refs(app_dir) or {}).values())
+
+        removed = {'blobs': 0, 'bytes': 0}
+        if not self.blob_dir.is_dir():
+            return removed
+        for blob_path in self.blob_dir.iterdir():
+            if blob_path.name not in referenced:
+                removed['blobs'] += 1
+                removed['bytes'] += blob_path.stat().st_size
+                blob_path.unlink()
+        return removed
+
+def migrate_data_directory(data_dir: Path, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Move every legacy <app>/sdef/ folder into the blob store.
+
+    Args:
+        data_dir: Collected data directory
+        dry_run: Only compute the report
+
+    Returns:
+        Dictionary with apps and files migrated, unique blobs, and bytes
+        before and after
+    """
+    store = SdefStore(data_dir)
+    report = Counter()
+    seen_digests = set()
+
+    for app_dir in sorted(data_dir.iterdir()):
+        legacy_dir = app_dir / LEGACY_SDEF_DIR_NAME
+        if not is_app_directory(app_dir) or not legacy_dir.is_dir():
+            continue
+
+        sdef_files = sorted(path for path in legacy_dir.iterdir() if path.is_file())
+        report['apps'] += 1
+        for sdef_file in sdef_files:
+            size = sdef_file.stat().st_size
+            digest = hashlib.sha256(sdef_file.read_bytes()).hexdigest()
+            report['files'] += 1
+            report['bytes_before'] += size
+            if digest not in seen_digests and not store.blob_path(digest).exists():
+                report['bytes_after'] += size
+            seen_digests.add(digest)
+
+        if dry_run:
+            continue
+
+        refs = {sdef_file.name: store.add(sdef_file) for sdef_file in sdef_files}
+        write_sdef_refs(app_dir, {**(load_sdef_refs(app_dir) or {}), **refs})
+        shutil.rmtree(legacy_dir)
+
+    report['blobs'] = len(seen_digests)
+    return dict(report)
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the content-addressed SDEF store")
+    parser.add_argument('command', choices=['migrate', 'gc'],
+                        help="migrate: move legacy sdef/ folders into _blobs; gc: remove unreferenced blobs")
+    parser.add_argument('--data-dir', type=Path, default=Path(__file__).parent / "data",
+                        help="Collected data directory (default: ./data)")
+    parser.add_argument('--dry-run', action='store_true', help="Report what migrate would do without changing anything")
+    args = parser.parse_args()
+
+    if not args.data_dir.is_dir():
+        print(f"❌ Data directory not found: {args.data_dir}")
+        return
+
+    if args.command == 'gc':
+        removed = SdefStore(args.data_dir).remove_unreferenced(args.data_dir)
+        print(f"🧹 Removed {removed['blobs']} unreferenced blobs ({removed['bytes']:,} bytes)")
+        return
+
+    report = migrate_data_directory(args.data_dir, dry_run=args.dry_run)
+    if not report.get('files'):
+        print("✅ Nothing to migrate")
+        return
+    saved = report['bytes_before'] - report['bytes_after']
+    print(f"{'🔍 Would migrate' if args.dry_run else '✅ Migrated'} {report['files']} SDEF files "
+          f"from {report['apps']} apps into {report['blobs']} blobs")
+    print(f"💾 {report['bytes_before']:,} bytes -> {report['bytes_after']:,} bytes "
+          f"({saved:,} bytes saved, {saved / report['bytes_before']:.0%})")
+
+if __name__ == "__main__":
+    main()
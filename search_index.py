@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Prebuilt search index for the webapp.
+
+generate_webapp_data.py serializes a compact prefix index over every app's
+name, code signing identifier, path, team ID, entitlement keys and SDEF
+command names, so the browser only has to parse one JSON file instead of
+building a Fuse index (over just three of those fields) on every load.
+
+Index format (search.<hash>.json):
+
+    {
+      "version": 1,
+      "fields": ["name", "identifier", "team", "path", "command", "entitlement"],
+      "apps": ["<app id>", ...],
+      "terms": ["<sorted lowercase term>", ...],
+      "postings": [[<app index> * 8 + <field index>, ...], ...]
+    }
+
+search_apps() is the reference implementation of the lookup that
+webapp/src/searchIndex.js performs: every query word must prefix-match a
+term, and apps are ranked by the weight of the fields that matched.
+"""
+
+import bisect
+import re
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Set
+
+from catalog import parse_sdef_suites
+from collect_macos_app_data import load_plist_string
+from sdef_store import list_app_sdefs
+
+SEARCH_INDEX_VERSION = 1
+
+# Indexed fields, most relevant first; a field's weight is its distance from the end
+SEARCH_FIELDS = ["name", "identifier", "team", "path", "command", "entitlement"]
+FIELD_BITS = 3
+
+# Placeholder team values written for unsigned or ad-hoc signed apps
+UNSET_TEAM_VALUES = {"", "not set", "Unknown"}
+
+WORD_PATTERN = re.compile(r'[A-Za-z0-9]+')
+CAMEL_CASE_PATTERN = re.compile(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+')
+
+def tokenize(text: str) -> Set[str]:
+    """
+    Split a value into lowercase search terms.
+
+    Words are split on punctuation, and camel-case words additionally
+    contribute their parts ("VisualStudioCode" -> visualstudiocode, visual,
+    studio, code).
+    """
+    terms = set()
+    for word in WORD_PATTERN.findall(text):
+        terms.add(word.lower())
+        parts = CAMEL_CASE_PATTERN.findall(word)
+        if len(parts) > 1:
+            terms.update(part.lower() for part in parts)
+    return terms
+
+def query_words(query: str) -> List[str]:
+    """Split a search query into lowercase words (no camel-case splitting)."""
+    return [word.lower() for word in WORD_PATTERN.findall(query)]
+
+def app_search_fields(app: Dict, app_dir: Path) -> Dict[str, List[str]]:
+    """
+    Gather the searchable values of one app.
+
+    Args:
+        app: The app's manifest (as bundled into apps.json)
+        app_dir: Application directory in data/
+
+    Returns:
+        Dictionary of field name -> values
+    """
+    codesign = app.get("codesign") or {}
+    team = codesign.get("team_identifier") or ""
+
+    entitlements = {}
+    try:
+        entitlements = load_plist_string((app_dir / "entitlements.plist").read_text(encoding='utf-8')) or {}
+    except (OSError, ValueError):
+        pass
+
+    commands = []
+    for sdef_path in list_app_sdefs(app_dir).values():
+        for suite in parse_sdef_suites(sdef_path):
+            commands.extend(command['name'] for command in suite['commands'] if command['name'])
+
+    return {
+        "name": [app.get("name") or app["id"]],
+        "identifier": [codesign.get("identifier") or ""],
+        "team": [] if team in UNSET_TEAM_VALUES else [team],
+        "path": [app.get("path") or ""],
+        "command": commands,
+        "entitlement": list(entitlements) if isinstance(entitlements, dict) else [],
+    }
+
+def build_search_index(apps: List[Dict], data_dir: Path) -> Dict:
+    """
+    Build the search index for the apps bundle.
+
+    Args:
+        apps: Manifests from build_apps_bundle(), each with an "id"
+        data_dir: Collected data directory holding each app's entitlements and SDEFs
+
+    Returns:
+        The index as a JSON-serializable dictionary
+    """
+    postings = defaultdict(set)
+    for app_index, app in enumerate(apps):
+        for field_index, values in enumerate(app_search_fields(app, data_dir / app["id"]).values()):
+            posting = (app_index << FIELD_BITS) | field_index
+            for value in values:
+                for term in tokenize(value):
+                    postings[term].add(posting)
+
+    terms = sorted(postings)
+    return {
+        "version": SEARCH_INDEX_VERSION,
+        "fields": SEARCH_FIELDS,
+        "apps": [app["id"] for app in apps],
+        "terms": terms,
+        "postings": [sorted(postings[term]) for term in terms],
+    }
+
+def search_apps(index: Dict, query: str) -> List[str]:
+    """
+    Look up a query in a search index.
+
+    Args:
+        index: Result of build_search_index() (or its parsed JSON)
+        query: Free-text query; every word must prefix-match a term
+
+    Returns:
+        Matching app ids, best match first
+    """
+    words = query_words(query)
+    if not words:
+        return []
+
+    terms = index["terms"]
+    field_count = len(index["fields"])
+    field_mask = (1 << FIELD_BITS) - 1
+    scores = None
+    for word in words:
+        word_scores = {}
+        position = bisect.bisect_left(terms, word)
+        while position < len(terms) and terms[position].startswith(word):
+            exact = 2 if terms[position] == word else 1
+            for posting in index["postings"][position]:
+                app_index = posting >> FIELD_BITS
+                score = (field_count - (posting & field_mask)) * exact
+                if score > word_scores.get(app_index, 0):
+                    word_scores[app_index] = score
+            position += 1
+
+        if scores is None:
+            scores = word_scores
+        else:
+            scores = {app_index: scores[app_index] + score
+                      for app_index, score in word_scores.items() if app_index in scores}
+        if not scores:
+            return []
+
+    ranked = sorted(scores, key=lambda app_index: (-scores[app_index], app_index))
+    return [index["apps"][app_index] for app_index in ranked]
+
+def index_stats(index: Dict) -> Dict[str, int]:
+    """Count apps, terms and postings in an index."""
+    return {
+        "apps": len(index["apps"]),
+        "terms": len(index["terms"]),
+        "postings": sum(len(postings) for postings in index["postings"]),
+    }
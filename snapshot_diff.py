@@ -0,0 +1,595 @@
+#!/usr/bin/env python3
+"""
+Compare two snapshots of the collected data and write a changelog.
+
+A snapshot is a data directory on disk or a git revision (tag, branch or
+commit) whose data/ tree is read straight from the object store, so
+`python3 snapshot_diff.py macos-14.5 data` compares a tag with the working
+copy without checking anything out.
+
+Applications are matched by CFBundleIdentifier (falling back to the
+directory name), so an app whose directory was renamed is reported as
+changed, not as removed and added. Every file is identified by its git blob
+hash: git snapshots get them from `git ls-tree` without reading any content,
+directory snapshots hash their files. Only the files whose hash differs are
+read and parsed for the semantic diff:
+
+- entitlements.plist: entitlements added, removed or changed;
+- info.plist: keys added, removed or changed (including the version);
+- manifest.json: code signing fields (team ID, authority, status) and the
+  sandbox analysis;
+- SDEFs: suites added or removed, and commands, classes and enumerations
+  added or removed within each suite.
+
+The result is a JSON document and/or a Markdown changelog.
+
+Usage: python3 snapshot_diff.py OLD NEW [--json changes.json] [--markdown changes.md]
+       python3 snapshot_diff.py macos-14.5 macos-15.0
+       python3 snapshot_diff.py HEAD data --markdown changes.md
+"""
+
+import argparse
+import hashlib
+import json
+import subprocess
+import sys
+import time
+import xml.etree.ElementTree as ET
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from collect_macos_app_data import load_plist_string, plist_json_default
+from sdef_store import BLOB_DIR_NAME, LEGACY_SDEF_DIR_NAME, SDEF_REFS_NAME
+
+MANIFEST_NAME = "manifest.json"
+INFO_PLIST_NAME = "info.plist"
+ENTITLEMENTS_NAME = "entitlements.plist"
+
+CODESIGN_FIELDS = ('team_identifier', 'authority', 'identifier', 'signature_status')
+SANDBOX_FIELDS = ('sandboxed', 'sandbox_type', 'hardened_runtime', 'library_validation')
+VERSION_KEYS = ('CFBundleShortVersionString', 'CFBundleVersion')
+SANDBOX_ENTITLEMENT = 'com.apple.security.app-sandbox'
+
+def git_blob_hash(data: bytes) -> str:
+    """The object ID git gives a file with this content."""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+class Snapshot(ABC):
+    """
+    One side of a comparison: the files of every app directory and a way to
+    read them. Paths are relative to the data directory ("Safari/info.plist").
+    """
+
+    label = ""
+
+    @abstractmethod
+    def apps(self) -> Dict[str, Dict[str, str]]:
+        """App directory name -> {path inside the app directory: git blob hash}."""
+
+    @abstractmethod
+    def read_many(self, paths: Iterable[str]) -> Dict[str, Optional[bytes]]:
+        """Contents of several files (None for missing files)."""
+
+class DirectorySnapshot(Snapshot):
+    """A data directory on disk."""
+
+    def __init__(self, data_dir: Path):
+        self.data_dir = data_dir
+        self.label = str(data_dir)
+
+    def apps(self) -> Dict[str, Dict[str, str]]:
+        apps = {}
+        for app_dir in sorted(self.data_dir.iterdir()):
+            if not app_dir.is_dir() or app_dir.name.startswith(('.', '_')):
+                continue
+            apps[app_dir.name] = {
+                path.relative_to(app_dir).as_posix(): git_blob_hash(path.read_bytes())
+                for path in sorted(app_dir.rglob("*")) if path.is_file() and not path.name.startswith('.')
+            }
+        return apps
+
+    def read_many(self, paths: Iterable[str]) -> Dict[str, Optional[bytes]]:
+        contents = {}
+        for path in paths:
+            try:
+                contents[path] = (self.data_dir / path).read_bytes()
+            except (FileNotFoundError, NotADirectoryError):
+                contents[path] = None
+        return contents
+
+class GitSnapshot(Snapshot):
+    """The data directory as committed at a git revision."""
+
+    def __init__(self, revision: str, repo: Path = Path("."), data_path: str = "data"):
+        self.revision = revision
+        self.repo = repo
+        self.data_path = data_path.strip("/")
+        self.label = revision
+        self._hashes: Dict[str, str] = {}
+
+    def _git(self, *args: str, stdin: Optional[bytes] = None) -> bytes:
+        return subprocess.run(['git', '-C', str(self.repo), *args], input=stdin, stdout=subprocess.PIPE,
+                              stderr=subprocess.PIPE, check=True).stdout
+
+    def apps(self) -> Dict[str, Dict[str, str]]:
+        listing = self._git('ls-tree', '-r', '-z', self.revision, '--', self.data_path + "/")
+        apps: Dict[str, Dict[str, str]] = {}
+        prefix = self.data_path + "/"
+        for entry in listing.split(b"\0"):
+            if not entry:
+                continue
+            info, path = entry.decode('utf-8').split("\t", 1)
+            _, object_type, object_id = info.split()
+            relative = path[len(prefix):]
+            self._hashes[relative] = object_id
+            app_name, _, inner = relative.partition("/")
+            if object_type != 'blob' or not inner or app_name.startswith(('.', '_')):
+                continue
+            if inner.rsplit("/", 1)[-1].startswith('.'):
+                continue
+            apps.setdefault(app_name, {})[inner] = object_id
+        return apps
+
+    def read_many(self, paths: Iterable[str]) -> Dict[str, Optional[bytes]]:
+        paths = list(paths)
+        if not self._hashes:
+            self.apps()
+        wanted = [path for path in paths if path in self._hashes]
+        contents: Dict[str, Optional[bytes]] = {path: None for path in paths}
+        if not wanted:
+            return contents
+
+        # One `git cat-file --batch` process for all files
+        output = self._git('cat-file', '--batch',
+                           stdin="".join(self._hashes[path] + "\n" for path in wanted).encode())
+        offset = 0
+        for path in wanted:
+            header_end = output.index(b"\n", offset)
+            size = int(output[offset:header_end].split()[2])
+            contents[path] = output[header_end + 1:header_end + 1 + size]
+            offset = header_end + 1 + size + 1
+        return contents
+
+def open_snapshot(spec: str, repo: Path = Path("."), data_path: str = "data") -> Snapshot:
+    """
+    A directory snapshot if spec is an existing directory, otherwise the data
+    directory at git revision spec.
+
+    Raises:
+        ValueError: If spec is neither a directory nor a revision of repo
+    """
+    if Path(spec).is_dir():
+        return DirectorySnapshot(Path(spec))
+    try:
+        subprocess.run(['git', '-C', str(repo), 'rev-parse', '--verify', '--quiet', spec + "^{commit}"],
+                       stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+    except (subprocess.CalledProcessError, OSError):
+        raise ValueError(f"{spec} is neither a data directory nor a git revision")
+    return GitSnapshot(spec, repo, data_path)
+
+def _parse_plist(data: Optional[bytes]) -> Optional[Dict]:
+    if data is None:
+        return None
+    try:
+        return load_plist_string(data.decode('utf-8', errors='replace'))
+    except ValueError:
+        # e.g. "No entitlements found" or a plist that could not be collected
+        return {}
+
+def _parse_json(data: Optional[bytes]) -> Optional[Dict]:
+    if data is None:
+        return None
+    try:
+        return json.loads(data)
+    except ValueError:
+        return {}
+
+def _encode(value):
+    """Plist values as JSON-compatible values (dates as ISO 8601, data as base64)."""
+    return json.loads(json.dumps(value, default=plist_json_default, sort_keys=True))
+
+def diff_keys(old: Dict, new: Dict) -> Dict:
+    """
+    Compare two dictionaries key by key.
+
+    Returns:
+        {"added": {key: value}, "removed": {key: value}, "changed": {key: [old, new]}},
+        with empty sections left out
+    """
+    diff = {
+        'added': {key: _encode(new[key]) for key in sorted(new.keys() - old.keys())},
+        'removed': {key: _encode(old[key]) for key in sorted(old.keys() - new.keys())},
+        'changed': {key: [_encode(old[key]), _encode(new[key])]
+                    for key in sorted(old.keys() & new.keys()) if _encode(old[key]) != _encode(new[key])},
+    }
+    return {section: values for section, values in diff.items() if values}
+
+def sdef_suites(data: Optional[bytes]) -> Dict[str, Dict[str, List[str]]]:
+    """
+    Suites of an SDEF with the names of their commands, classes and enumerations.
+
+    Returns:
+        Suite name -> {"commands": [...], "classes": [...], "enumerations": [...]},
+        empty if the SDEF cannot be parsed
+    """
+    if not data:
+        return {}
+    try:
+        root = ET.fromstring(data)
+    except ET.ParseError:
+        return {}
+    suites = {}
+    for suite in root.iter('suite'):
+        suites[suite.get('name') or suite.get('code') or ""] = {
+            'commands': sorted({element.get('name') or "" for element in suite.findall('command')}),
+            'classes': sorted({element.get('name') or element.get('extends') or ""
+                               for element in suite.findall('class') + suite.findall('class-extension')}),
+            'enumerations': sorted({element.get('name') or "" for element in suite.findall('enumeration')}),
+        }
+    return suites
+
+def diff_sdef(old: Optional[bytes], new: Optional[bytes]) -> Dict:
+    """
+    Compare two versions of an SDEF suite by suite.
+
+    Returns:
+        {"suites_added": [...], "suites_removed": [...], "suites": {suite: {"commands_added": [...], ...}}}
+        with empty sections left out
+    """
+    old_suites, new_suites = sdef_suites(old), sdef_suites(new)
+    suites = {}
+    for name in sorted(old_suites.keys() & new_suites.keys()):
+        changes = {}
+        for kind in ('commands', 'classes', 'enumerations'):
+            before, after = set(old_suites[name][kind]), set(new_suites[name][kind])
+            if after - before:
+                changes[f'{kind}_added'] = sorted(after - before)
+            if before - after:
+                changes[f'{kind}_removed'] = sorted(before - after)
+        if changes:
+            suites[name] = changes
+    diff = {
+        'suites_added': sorted(new_suites.keys() - old_suites.keys()),
+        'suites_removed': sorted(old_suites.keys() - new_suites.keys()),
+        'suites': suites,
+    }
+    return {section: values for section, values in diff.items() if values}
+
+def _sdef_sources(app_name: str, files: Dict[str, str], refs: Optional[Dict]) -> Dict[str, Tuple[str, str]]:
+    """SDEF name -> (content ID, path of its content) in either storage layout."""
+    if refs is not None:
+        return {name: ("sha256:" + digest, f"{BLOB_DIR_NAME}/{digest}")
+                for name, digest in refs.get('files', {}).items()}
+    prefix = LEGACY_SDEF_DIR_NAME + "/"
+    return {path[len(prefix):]: (files[path], f"{app_name}/{path}")
+            for path in files if path.startswith(prefix) and path.endswith(".sdef")}
+
+def _bundle_id(info_plist: Optional[bytes]) -> Optional[str]:
+    plist = _parse_plist(info_plist)
+    return plist.get('CFBundleIdentifier') if plist else None
+
+def match_apps(old_ids: Dict[str, Optional[str]], new_ids: Dict[str, Optional[str]]) -> List[Tuple[Optional[str], Optional[str]]]:
+    """
+    Pair app directories of two snapshots by bundle ID.
+
+    Apps without a bundle ID are matched by directory name. When several
+    directories share a bundle ID, equal names are paired first and the rest
+    in name order.
+
+    Args:
+        old_ids: Old directory name -> bundle ID (or None)
+        new_ids: New directory name -> bundle ID (or None)
+
+    Returns:
+        (old name, new name) pairs; None on one side for added or removed apps
+    """
+    def groups(ids):
+        grouped: Dict[str, List[str]] = {}
+        for name, bundle_id in sorted(ids.items()):
+            grouped.setdefault(bundle_id or f"name:{name}", []).append(name)
+        return grouped
+
+    old_groups, new_groups = groups(old_ids), groups(new_ids)
+    pairs = []
+    for key in sorted(old_groups.keys() | new_groups.keys()):
+        old_names, new_names = old_groups.get(key, []), new_groups.get(key, [])
+        for name in [name for name in old_names if name in new_names]:
+            pairs.append((name, name))
+        old_rest = [name for name in old_names if name not in new_names]
+        new_rest = [name for name in new_names if name not in old_names]
+        pairs.extend(zip(old_rest, new_rest))
+        pairs.extend((name, None) for name in old_rest[len(new_rest):])
+        pairs.extend((None, name) for name in new_rest[len(old_rest):])
+    return pairs
+
+def _highlights(change: Dict) -> List[str]:
+    """Short labels for the changes release notes care most about."""
+    highlights = []
+    entitlements = change.get('entitlements', {})
+    if entitlements.get('added'):
+        highlights.append("gained entitlements")
+    if entitlements.get('removed'):
+        highlights.append("lost entitlements")
+    if 'team_identifier' in change.get('codesign', {}):
+        highlights.append("team ID changed")
+    before, after = change.get('sandbox', {}).get('sandboxed', [None, None])
+    if SANDBOX_ENTITLEMENT in entitlements.get('removed', {}) or (before == 'Yes' and after != 'Yes'):
+        highlights.append("lost sandboxing")
+    elif SANDBOX_ENTITLEMENT in entitlements.get('added', {}) or (after == 'Yes' and before != 'Yes'):
+        highlights.append("gained sandboxing")
+    if change.get('sdef'):
+        highlights.append("SDEF changed")
+    if change.get('version'):
+        highlights.append("version changed")
+    return highlights
+
+def diff_snapshots(old: Snapshot, new: Snapshot) -> Dict:
+    """
+    Compare two snapshots.
+
+    Returns:
+        JSON-serializable changelog: a summary, the added and removed apps,
+        and for every changed app its changed files and semantic diffs
+    """
+    old_apps, new_apps = old.apps(), new.apps()
+
+    # An app that kept its directory name and info.plist kept its bundle ID, so
+    # only the other apps' info.plists are read (in one batch per snapshot) to match them
+    kept = {name for name in old_apps.keys() & new_apps.keys()
+            if old_apps[name].get(INFO_PLIST_NAME) == new_apps[name].get(INFO_PLIST_NAME)}
+    kept_changed = [name for name in kept if old_apps[name] != new_apps[name]]
+    old_rest = [name for name in old_apps if name not in kept]
+    new_rest = [name for name in new_apps if name not in kept] + kept_changed
+    old_plists = old.read_many(f"{name}/{INFO_PLIST_NAME}" for name in old_rest
+                               if INFO_PLIST_NAME in old_apps[name])
+    new_plists = new.read_many(f"{name}/{INFO_PLIST_NAME}" for name in new_rest
+                               if INFO_PLIST_NAME in new_apps[name])
+    old_ids = {name: _bundle_id(old_plists.get(f"{name}/{INFO_PLIST_NAME}")) for name in old_rest}
+    new_ids = {name: _bundle_id(new_plists.get(f"{name}/{INFO_PLIST_NAME}")) for name in new_rest}
+
+    added, removed = [], []
+    unchanged = len(kept) - len(kept_changed)
+    changed_pairs = [(name, name) for name in sorted(kept_changed)]
+    for old_name, new_name in match_apps(old_ids, {name: new_ids[name] for name in new_rest if name not in kept}):
+        if old_name is None:
+            added.append({'name': new_name, 'bundle_id': new_ids[new_name]})
+        elif new_name is None:
+            removed.append({'name': old_name, 'bundle_id': old_ids[old_name]})
+        else:
+            changed_pairs.append((old_name, new_name))
+    changed_pairs.sort(key=lambda pair: (pair[1].lower(), pair[1]))
+
+    # Read only what changed: the manifests, plists and SDEF refs whose hashes differ
+    semantic = (MANIFEST_NAME, INFO_PLIST_NAME, ENTITLEMENTS_NAME, SDEF_REFS_NAME)
+    old_wanted, new_wanted = [], []
+    for old_name, new_name in changed_pairs:
+        old_files, new_files = old_apps[old_name], new_apps[new_name]
+        for file_name in semantic:
+            if old_files.get(file_name) != new_files.get(file_name):
+                old_wanted.append(f"{old_name}/{file_name}")
+                new_wanted.append(f"{new_name}/{file_name}")
+    old_contents = {**old_plists, **old.read_many(path for path in old_wanted if path not in old_plists)}
+    new_contents = {**new_plists, **new.read_many(path for path in new_wanted if path not in new_plists)}
+
+    # Then the SDEFs whose content IDs differ
+    sdef_pairs = {}
+    old_sdef_paths, new_sdef_paths = [], []
+    for old_name, new_name in changed_pairs:
+        old_files, new_files = old_apps[old_name], new_apps[new_name]
+        if SDEF_REFS_NAME in old_files and old_files[SDEF_REFS_NAME] == new_files.get(SDEF_REFS_NAME):
+            continue
+        old_refs = _parse_json(old_contents.get(f"{old_name}/{SDEF_REFS_NAME}")) if SDEF_REFS_NAME in old_files else None
+        new_refs = _parse_json(new_contents.get(f"{new_name}/{SDEF_REFS_NAME}")) if SDEF_REFS_NAME in new_files else None
+        old_sdefs = _sdef_sources(old_name, old_files, old_refs)
+        new_sdefs = _sdef_sources(new_name, new_files, new_refs)
+        for sdef_name in sorted(old_sdefs.keys() | new_sdefs.keys()):
+            old_source, new_source = old_sdefs.get(sdef_name), new_sdefs.get(sdef_name)
+            if old_source and new_source and old_source[0] == new_source[0]:
+                continue
+            sdef_pairs[(new_name, sdef_name)] = (old_source and old_source[1], new_source and new_source[1])
+            if old_source:
+                old_sdef_paths.append(old_source[1])
+            if new_source:
+                new_sdef_paths.append(new_source[1])
+    old_sdef_contents = old.read_many(old_sdef_paths)
+    new_sdef_contents = new.read_many(new_sdef_paths)
+
+    changed = []
+    for old_name, new_name in changed_pairs:
+        old_files, new_files = old_apps[old_name], new_apps[new_name]
+        change = {'name': new_name, 'bundle_id': new_ids[new_name]}
+        if old_name != new_name:
+            change['old_name'] = old_name
+        change['files'] = {
+            path: ('added' if path not in old_files else 'removed' if path not in new_files else 'modified')
+            for path in sorted(old_files.keys() | new_files.keys()) if old_files.get(path) != new_files.get(path)
+        }
+
+        def contents(file_name):
+            return (old_contents.get(f"{old_name}/{file_name}") if file_name in old_files else None,
+                    new_contents.get(f"{new_name}/{file_name}") if file_name in new_files else None)
+
+        if old_files.get(ENTITLEMENTS_NAME) != new_files.get(ENTITLEMENTS_NAME):
+            before, after = contents(ENTITLEMENTS_NAME)
+            entitlements = diff_keys(_parse_plist(before) or {}, _parse_plist(after) or {})
+            if entitlements:
+                change['entitlements'] = entitlements
+
+        if old_files.get(INFO_PLIST_NAME) != new_files.get(INFO_PLIST_NAME):
+            before, after = contents(INFO_PLIST_NAME)
+            info = diff_keys(_parse_plist(before) or {}, _parse_plist(after) or {})
+            if info:
+                change['info_plist'] = info
+                version = {key: values for key, values in info.get('changed', {}).items() if key in VERSION_KEYS}
+                if version:
+                    change['version'] = version
+
+        if old_files.get(MANIFEST_NAME) != new_files.get(MANIFEST_NAME):
+            before, after = (_parse_json(data) or {} for data in contents(MANIFEST_NAME))
+            for section, fields in (('codesign', CODESIGN_FIELDS), ('sandbox', SANDBOX_FIELDS)):
+                old_section, new_section = before.get(section) or {}, after.get(section) or {}
+                section_diff = {field: [old_section.get(field), new_section.get(field)] for field in fields
+                                if old_section.get(field) != new_section.get(field)}
+                if section_diff:
+                    change[section] = section_diff
+            if before.get('path') != after.get('path'):
+                change['path'] = [before.get('path'), after.get('path')]
+
+        sdef = {}
+        for (app_name, sdef_name), (old_path, new_path) in sdef_pairs.items():
+            if app_name != new_name:
+                continue
+            before = old_sdef_contents.get(old_path) if old_path else None
+            after = new_sdef_contents.get(new_path) if new_path else None
+            if before == after:
+                # Only the storage layout differs
+                continue
+            if before is None:
+                sdef[sdef_name] = {'status': 'added', 'suites': sorted(sdef_suites(after))}
+            elif after is None:
+                sdef[sdef_name] = {'status': 'removed', 'suites': sorted(sdef_suites(before))}
+            else:
+                sdef[sdef_name] = {'status': 'modified', **diff_sdef(before, after)}
+        if sdef:
+            change['sdef'] = sdef
+
+        change['highlights'] = _highlights(change)
+        changed.append(change)
+
+    added.sort(key=lambda app: app['name'].lower())
+    removed.sort(key=lambda app: app['name'].lower())
+    return {
+        'old': old.label,
+        'new': new.label,
+        'generated': datetime.now().isoformat(),
+        'summary': {
+            'old_apps': len(old_apps),
+            'new_apps': len(new_apps),
+            'added': len(added),
+            'removed': len(removed),
+            'changed': len(changed),
+            'unchanged': unchanged,
+        },
+        'added': added,
+        'removed': removed,
+        'changed': changed,
+    }
+
+def _app_title(app: Dict) -> str:
+    return f"{app['name']} (`{app['bundle_id']}`)" if app.get('bundle_id') else app['name']
+
+def _code_list(values: Iterable[str]) -> str:
+    return ", ".join(f"`{value}`" for value in values)
+
+def format_markdown(diff: Dict) -> str:
+    """Render diff_snapshots() output as a Markdown changelog."""
+    summary = diff['summary']
+    lines = [
+        f"# Changes from {diff['old']} to {diff['new']}",
+        "",
+        f"{summary['new_apps']} apps ({summary['old_apps']} before): {summary['added']} added, "
+        f"{summary['removed']} removed, {summary['changed']} changed, {summary['unchanged']} unchanged.",
+    ]
+
+    highlighted = [change for change in diff['changed'] if change['highlights']]
+    if highlighted:
+        lines += ["", "## Highlights", ""]
+        lines += [f"- **{change['name']}**: {', '.join(change['highlights'])}" for change in highlighted]
+
+    for title, apps in (("Added apps", diff['added']), ("Removed apps", diff['removed'])):
+        if apps:
+            lines += ["", f"## {title}", ""]
+            lines += [f"- {_app_title(app)}" for app in apps]
+
+    if diff['changed']:
+        lines += ["", "## Changed apps"]
+    for change in diff['changed']:
+        lines += ["", f"### {_app_title(change)}", ""]
+        heading_end = len(lines)
+        if 'old_name' in change:
+            lines.append(f"- Renamed from {change['old_name']}")
+        if 'path' in change:
+            lines.append(f"- Path: `{change['path'][0]}` → `{change['path'][1]}`")
+        for key, (before, after) in change.get('version', {}).items():
+            lines.append(f"- {key}: {before} → {after}")
+        for section, label in (('codesign', "Code signing"), ('sandbox', "Sandbox")):
+            for field, (before, after) in change.get(section, {}).items():
+                lines.append(f"- {label} {field.replace('_', ' ')}: {before} → {after}")
+        entitlements = change.get('entitlements', {})
+        if entitlements.get('added'):
+            lines.append(f"- Entitlements added: {_code_list(entitlements['added'])}")
+        if entitlements.get('removed'):
+            lines.append(f"- Entitlements removed: {_code_list(entitlements['removed'])}")
+        if entitlements.get('changed'):
+            lines.append(f"- Entitlements changed: {_code_list(entitlements['changed'])}")
+        info = change.get('info_plist', {})
+        for section in ('added', 'removed', 'changed'):
+            keys = [key for key in info.get(section, {}) if section != 'changed' or key not in VERSION_KEYS]
+            if keys:
+                lines.append(f"- Info.plist keys {section}: {_code_list(keys)}")
+        for sdef_name, sdef in change.get('sdef', {}).items():
+            if sdef['status'] != 'modified':
+                lines.append(f"- SDEF `{sdef_name}` {sdef['status']}" +
+                             (f" (suites: {', '.join(sdef['suites'])})" if sdef['suites'] else ""))
+                continue
+            details = []
+            if sdef.get('suites_added'):
+                details.append(f"suites added: {', '.join(sdef['suites_added'])}")
+            if sdef.get('suites_removed'):
+                details.append(f"suites removed: {', '.join(sdef['suites_removed'])}")
+            for suite, changes in sdef.get('suites', {}).items():
+                details.append(f"{suite}: " + "; ".join(
+                    f"{kind.replace('_', ' ')} {_code_list(names)}" for kind, names in changes.items()))
+            lines.append(f"- SDEF `{sdef_name}` modified" + (": " + " / ".join(details) if details else ""))
+        other = [path for path in change['files'] if path not in (MANIFEST_NAME, INFO_PLIST_NAME, ENTITLEMENTS_NAME,
+                                                                  SDEF_REFS_NAME)
+                 and not path.startswith(LEGACY_SDEF_DIR_NAME + "/")]
+        if len(lines) == heading_end:
+            # Nothing semantic (e.g. SDEFs moved into the blob store): list every file
+            other = list(change['files'])
+        if other:
+            lines.append("- Files changed: " + ", ".join(f"{path} ({change['files'][path]})" for path in other))
+    return "\n".join(lines) + "\n"
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two snapshots of the collected data "
+                                                 "(data directories or git revisions)")
+    parser.add_argument('old', help="Old snapshot: a data directory or a git tag/branch/commit")
+    parser.add_argument('new', help="New snapshot: a data directory or a git tag/branch/commit")
+    parser.add_argument('--json', type=Path, metavar='FILE', help="Write the changelog as JSON")
+    parser.add_argument('--markdown', type=Path, metavar='FILE',
+                        help="Write the changelog as Markdown (printed when neither --json nor --markdown is given)")
+    parser.add_argument('--repo', type=Path, default=Path(__file__).parent,
+                        help="Git repository for revisions (default: this repository)")
+    parser.add_argument('--data-path', default="data", help="Data directory inside the repository (default: data)")
+    args = parser.parse_args()
+
+    try:
+        old = open_snapshot(args.old, args.repo, args.data_path)
+        new = open_snapshot(args.new, args.repo, args.data_path)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+    start = time.perf_counter()
+    diff = diff_snapshots(old, new)
+    elapsed = time.perf_counter() - start
+    markdown = format_markdown(diff)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(diff, f, indent=2)
+            f.write("\n")
+    if args.markdown:
+        args.markdown.write_text(markdown)
+    if not args.json and not args.markdown:
+        print(markdown, end="")
+
+    summary = diff['summary']
+    print(f"🔍 {diff['old']} → {diff['new']}: {summary['added']} added, {summary['removed']} removed, "
+          f"{summary['changed']} changed, {summary['unchanged']} unchanged ({elapsed:.2f}s)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Tests for the benchmark suite
+"""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from benchmark_collection import compare_results, run_suite
+
+def test_suite_results(monkeypatch):
+    """The suite finds nested apps, times each stage and flags regressions"""
+    # install_stub_tools() prepends to PATH; restore it afterwards
+    monkeypatch.setenv("PATH", os.environ.get("PATH", ""))
+    monkeypatch.setenv("STUB_TOOL_DELAY", "0")
+    results = run_suite(app_count=10, frameworks=2, delay=0, repeat=1)
+
+    stages = results['results']
+    assert stages['find_all_applications']['apps_found'] == 10
+    assert stages['process_application']['tool_spawns'] == {'codesign': 10}
+    assert set(stages['process_application']['stages']) >= {'sdef', 'codesign', 'icon', 'write'}
+    assert stages['generate_data_index']['files_copied'] > 0
+    assert stages['total_seconds'] >= stages['process_application']['seconds']
+
+    slower = {**results, 'results': {**stages, 'generate_data_index': {
+        'seconds': stages['generate_data_index']['seconds'] * 2 + 1}}}
+    assert compare_results(results, results, threshold=0.1) == []
+    assert compare_results(results, slower, threshold=0.1) == ['generate_data_index']
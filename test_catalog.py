@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQLite catalog
+"""
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from catalog import (apps_by_team, apps_with_command, apps_with_entitlement, apps_with_plist_key,
+                     build_catalog, connect, update_catalog)
+from collect_macos_app_data import format_plist_xml
+from sdef_store import SdefStore
+
+SDEF = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE dictionary SYSTEM "file://localhost/System/Library/DTDs/sdef.dtd">
+<dictionary>
+  <suite name="Internet suite" code="GURL">
+    <command name="open location" code="GURLGURL" description="Open a URL"/>
+  </suite>
+</dictionary>
+"""
+
+def make_app(data_dir: Path, name: str, team: str, entitlements: dict, info: dict) -> Path:
+    """Create an app directory like the collector writes (plists with comment headers)"""
+    app_dir = data_dir / name
+    app_dir.mkdir(parents=True)
+    manifest = {
+        "name": name, "path": f"/Applications/{name}.app", "sdef_count": 0, "has_icon": False,
+        "codesign": {"signature_status": "Valid", "team_identifier": team, "authority": "Unknown"},
+        "sandbox": {"sandboxed": "Yes" if entitlements.get("com.apple.security.app-sandbox") else "No"},
+    }
+    (app_dir / "manifest.json").write_text(json.dumps(manifest))
+    (app_dir / "entitlements.plist").write_text(f"<!-- Entitlements for {name}.app -->\n\n" + format_plist_xml(entitlements))
+    (app_dir / "info.plist").write_text(f"<!-- Info.plist for {name}.app -->\n\n" + format_plist_xml(info))
+    return app_dir
+
+def test_build_and_query(tmp_path):
+    """Entitlements, teams, Info.plist keys and SDEF commands are queryable"""
+    data_dir = tmp_path / "data"
+    make_app(data_dir, "Browser", "ABCDE12345",
+             {"com.apple.security.cs.disable-library-validation": True}, {"CFBundleIdentifier": "com.example.browser"})
+    music = make_app(data_dir, "Music", "not set", {"com.apple.security.app-sandbox": True},
+                     {"CFBundleIdentifier": "com.apple.Music", "LSUIElement": False})
+    (music / "sdef").mkdir()
+    (music / "sdef" / "Music.sdef").write_text(SDEF)
+    (data_dir / "liquiddetectiond").mkdir()
+    (data_dir / "liquiddetectiond" / "manifest.json").write_text('{"name": "liquiddetectiond"}')
+    (data_dir / "liquiddetectiond" / "info.plist").write_text('{"error": "not a plist"}')
+
+    db_path = tmp_path / "catalog.sqlite"
+    assert build_catalog(data_dir, db_path) == 3
+    connection = connect(db_path)
+    assert [row['name'] for row in apps_with_entitlement(connection, "com.apple.security.cs.disable-library-validation")] == ["Browser"]
+    assert apps_with_entitlement(connection, "com.apple.security.app-sandbox", "false") == []
+    assert [row['bundle_id'] for row in apps_by_team(connection, "ABCDE12345")] == ["com.example.browser"]
+    assert [row['name'] for row in apps_with_plist_key(connection, "LSUIElement", "false")] == ["Music"]
+    assert [(row['name'], row['suite']) for row in apps_with_command(connection, "Open Location")] == [("Music", "Internet suite")]
+    connection.close()
+
+def test_update_catalog(tmp_path):
+    """Only the named apps are re-ingested and removed apps are dropped"""
+    data_dir = tmp_path / "data"
+    make_app(data_dir, "Alpha", "AAAAA11111", {}, {})
+    beta = make_app(data_dir, "Beta", "BBBBB22222", {}, {})
+    db_path = tmp_path / "catalog.sqlite"
+    build_catalog(data_dir, db_path)
+
+    # Beta now ships a stored SDEF and a new team; Alpha is removed
+    (beta / "manifest.json").write_text(json.dumps({"name": "Beta", "codesign": {"team_identifier": "CCCCC33333"}}))
+    sdef_path = tmp_path / "Beta.sdef"
+    sdef_path.write_text(SDEF)
+    SdefStore(data_dir).add_to_app(beta, sdef_path)
+    for path in (data_dir / "Alpha").iterdir():
+        path.unlink()
+    (data_dir / "Alpha").rmdir()
+
+    assert update_catalog(data_dir, db_path, ["Beta"]) == 1
+    connection = connect(db_path)
+    assert [row['name'] for row in connection.execute("SELECT name FROM apps")] == ["Beta"]
+    assert [row['name'] for row in apps_by_team(connection, "CCCCC33333")] == ["Beta"]
+    assert [row['name'] for row in apps_with_command(connection, "open location")] == ["Beta"]
+    assert connection.execute("SELECT COUNT(*) FROM entitlements").fetchone()[0] == 0
+    connection.close()
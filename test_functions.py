@@ -3,20 +3,56 @@
 Quick test script to verify the new functionality works
 """
 
+import json
+import os
+import plistlib
+import shutil
 import sys
+import xml.etree.ElementTree as ET
+from datetime import datetime
 from pathlib import Path
 
+import pytest
+
 # Add the current directory to Python path to import our functions
 sys.path.insert(0, str(Path(__file__).parent))
 
-from collect_sdef_files import (
+from collect_macos_app_data import (
+    BundleContext,
+    IconPipeline,
+    TOOL_SPAWN_COUNTS,
+    extract_app_icon,
+    find_all_applications,
+    parse_codesign_display,
+    process_application,
+    scan_bundle,
     get_application_name, 
     extract_code_signing_info, 
     extract_entitlements,
     extract_info_plist,
-    analyze_sandbox_info
+    analyze_sandbox_info,
+    format_entitlements_xml,
+    load_plist_string,
 )
 
+SAMPLE_INFO_PLIST = {
+    'CFBundleIdentifier': 'com.example.Sample',
+    'CFBundleName': 'Sample',
+    'CFBundleVersion': '42',
+    'CFBundleIconFile': 'SampleIcon',
+    'LSUIElement': True,
+    'NSAppTransportSecurity': {'NSAllowsArbitraryLoads': False},
+    'CFBundleDocumentTypes': [{'CFBundleTypeName': 'Sample Document', 'LSItemContentTypes': ['public.data']}],
+}
+
+def make_bundle(root: Path, plist_format=plistlib.FMT_XML) -> Path:
+    """Create a synthetic .app bundle with an Info.plist in the given format"""
+    app_path = root / "Sample.app"
+    (app_path / "Contents").mkdir(parents=True)
+    with open(app_path / "Contents" / "Info.plist", 'wb') as f:
+        plistlib.dump(SAMPLE_INFO_PLIST, f, fmt=plist_format)
+    return app_path
+
 def test_single_app():
     """Test the functions on a single application"""
     # Test with a common system app
@@ -61,5 +97,349 @@ def test_single_app():
     for key, value in sandbox_info.items():
         print(f"{key}: {value}")
 
+def test_bundle_context_loads_xml_and_binary_plists(tmp_path):
+    """Both plist encodings parse to the same dictionary and render identically"""
+    xml_app = make_bundle(tmp_path / "xml", plistlib.FMT_XML)
+    binary_app = make_bundle(tmp_path / "binary", plistlib.FMT_BINARY)
+    
+    xml_bundle = BundleContext(xml_app)
+    binary_bundle = BundleContext(binary_app)
+    assert xml_bundle.info_plist == SAMPLE_INFO_PLIST
+    assert binary_bundle.info_plist == SAMPLE_INFO_PLIST
+    assert binary_bundle.icon_filename == 'SampleIcon'
+    
+    xml_text = extract_info_plist(xml_app, xml_bundle)
+    binary_text = extract_info_plist(binary_app, binary_bundle)
+    assert xml_text.split('-->\n\n', 2)[-1] == binary_text.split('-->\n\n', 2)[-1]
+    assert '<key>CFBundleIdentifier</key>' in xml_text
+    assert '    <string>com.example.Sample</string>' in xml_text
+
+def test_bundle_context_loads_plist_once(tmp_path, monkeypatch):
+    """Info.plist is read from disk only once per bundle"""
+    app_path = make_bundle(tmp_path)
+    bundle = BundleContext(app_path)
+    
+    loads = []
+    original_load = plistlib.load
+    monkeypatch.setattr(plistlib, 'load', lambda f: loads.append(f) or original_load(f))
+    
+    extract_info_plist(app_path, bundle)
+    analyze_sandbox_info(app_path, bundle.info_plist, None)
+    bundle.icon_filename
+    assert len(loads) == 1
+
+def test_bundle_context_missing_or_invalid_plist(tmp_path):
+    """Missing and corrupt plists yield None instead of raising"""
+    app_path = tmp_path / "Broken.app"
+    (app_path / "Contents").mkdir(parents=True)
+    assert BundleContext(app_path).info_plist is None
+    assert extract_info_plist(app_path) is None
+    
+    (app_path / "Contents" / "Info.plist").write_bytes(b"<plist><dict><key>oops")
+    assert BundleContext(app_path).info_plist is None
+
+def test_analyze_sandbox_info_uses_parsed_plist(tmp_path):
+    """Sandbox notes come from the parsed dict and from stored XML text alike"""
+    app_path = make_bundle(tmp_path)
+    bundle = BundleContext(app_path)
+    
+    from_dict = analyze_sandbox_info(app_path, bundle.info_plist, None)
+    from_text = analyze_sandbox_info(app_path, extract_info_plist(app_path, bundle), None)
+    assert from_dict == from_text
+    assert 'Background app (LSUIElement)' in from_dict['analysis_notes']
+    assert 'Uses App Transport Security' in from_dict['analysis_notes']
+
+def test_analyze_sandbox_info_entitlement_lookups(tmp_path):
+    """Sandbox, hardened runtime and library validation come from the parsed entitlements"""
+    app_path = make_bundle(tmp_path)
+    entitlements = {
+        'com.apple.security.app-sandbox': True,
+        'com.apple.security.cs.allow-jit': True,
+        'com.apple.security.cs.disable-library-validation': False,
+        'com.apple.security.application-groups': ['group.com.example'],
+        'com.apple.developer.icloud-services': {'CloudKit': {'container': 'iCloud.com.example'}},
+    }
+    raw_xml = plistlib.dumps(entitlements).decode()
+    
+    sandbox_info = analyze_sandbox_info(app_path, None, entitlements)
+    assert sandbox_info['sandboxed'] == 'Yes'
+    assert sandbox_info['sandbox_type'] == 'App Sandbox'
+    assert sandbox_info['entitlements_count'] == '5'  # nested keys are not entitlements
+    assert sandbox_info['hardened_runtime'] == 'Yes (with exceptions)'
+    assert sandbox_info['library_validation'] == 'Enabled'
+    
+    # The pretty-printed XML written to entitlements.plist renders <true />
+    assert analyze_sandbox_info(app_path, None, format_entitlements_xml(raw_xml, app_path)) == sandbox_info
+    
+    assert analyze_sandbox_info(app_path, None, {'com.apple.security.app-sandbox': False})['sandboxed'] == 'No'
+    assert analyze_sandbox_info(app_path, None, {})['library_validation'] == 'Enabled'
+    assert analyze_sandbox_info(app_path, None, None)['library_validation'] == 'Unknown'
+    assert analyze_sandbox_info(app_path, None, "<plist><dict><key>oops")['analysis_notes'][0].startswith(
+        "Entitlements parsing error")
+
+def test_entitlements_json_written(tmp_path, monkeypatch):
+    """process_application writes the parsed entitlements as JSON next to the XML"""
+    from benchmark_collection import build_signed_macho
+    
+    app_path = tmp_path / "Signed.app"
+    (app_path / "Contents" / "MacOS").mkdir(parents=True)
+    with open(app_path / "Contents" / "Info.plist", 'wb') as f:
+        plistlib.dump({'CFBundleExecutable': 'Signed'}, f)
+    (app_path / "Contents" / "MacOS" / "Signed").write_bytes(build_signed_macho("com.example.signed", entitlements=plistlib.dumps({
+        'com.apple.security.app-sandbox': True,
+        'com.example.blob': b'\x00\x01',
+        'com.example.date': datetime(2024, 1, 2, 3, 4, 5),
+    })))
+    
+    monkeypatch.setenv("PATH", str(tmp_path / "no-tools"))
+    assert process_application(app_path, tmp_path / "data", verify_signature=False)
+    app_dir = tmp_path / "data" / "Signed"
+    assert json.loads((app_dir / "entitlements.json").read_text()) == {
+        'com.apple.security.app-sandbox': True, 'com.example.blob': 'AAE=', 'com.example.date': '2024-01-02T03:04:05',
+    }
+    assert "Sandboxed: Yes\n" in (app_dir / "sandbox.txt").read_text()
+    assert "Entitlements Count: 3\n" in (app_dir / "sandbox.txt").read_text()
+
+ENTITLEMENTS_CORPUS = sorted((Path(__file__).parent / "data").glob("*/entitlements.plist"))
+
+@pytest.mark.skipif(not ENTITLEMENTS_CORPUS, reason="no collected data/ corpus")
+def test_analyze_sandbox_info_data_corpus():
+    """Every stored entitlements file parses and the dict lookups match its XML"""
+    for entitlements_file in ENTITLEMENTS_CORPUS:
+        text = entitlements_file.read_text()
+        if text.startswith("No entitlements found"):
+            continue
+        entitlements = load_plist_string(text)
+        app_path = Path("/Applications") / f"{entitlements_file.parent.name}.app"
+        sandbox_info = analyze_sandbox_info(app_path, None, entitlements)
+        assert analyze_sandbox_info(app_path, None, text) == sandbox_info, entitlements_file
+        
+        # Independent reading of the XML: top-level keys and the element that follows each
+        top_level = list(ET.fromstring(text[text.index('<?xml'):].encode()).find('dict'))
+        values = {key.text: value.tag for key, value in zip(top_level[::2], top_level[1::2])}
+        assert sandbox_info['entitlements_count'] == str(len(values)), entitlements_file
+        expected_sandbox = {'true': 'Yes', None: 'Unknown'}.get(values.get('com.apple.security.app-sandbox'), 'No')
+        assert sandbox_info['sandboxed'] == expected_sandbox, entitlements_file
+        expected_validation = 'Disabled' if values.get('com.apple.security.cs.disable-library-validation') == 'true' else 'Enabled'
+        assert sandbox_info['library_validation'] == expected_validation, entitlements_file
+
+CODESIGN_DISPLAY_STDERR = """Executable=/System/Applications/Calculator.app/Contents/MacOS/Calculator
+Identifier=com.apple.calculator
+Format=app bundle with Mach-O universal (x86_64 arm64e)
+CodeDirectory v=20400 size=1234 flags=0x0(none) hashes=27+7 location=embedded
+Signature size=4442
+Authority=Software Signing
+Authority=Apple Code Signing Certification Authority
+Authority=Apple Root CA
+Sealed Resources version=2 rules=2 files=0
+TeamIdentifier=not set
+"""
+
+CODESIGN_DISPLAY_STDOUT = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE plist PUBLIC "-//Apple//DTD PLIST 1.0//EN" "http://www.apple.com/DTDs/PropertyList-1.0.dtd">
+<plist version="1.0"><dict><key>com.apple.security.app-sandbox</key><true/></dict></plist>
+"""
+
+def test_parse_codesign_display():
+    """One display output yields both the signing details and the entitlements"""
+    info, entitlements_xml = parse_codesign_display(0, CODESIGN_DISPLAY_STDERR, CODESIGN_DISPLAY_STDOUT)
+    assert info['signature_status'] == 'Valid'
+    assert info['identifier'] == 'com.apple.calculator'
+    assert info['team_identifier'] == 'not set'
+    assert info['authority'] == 'Software Signing'
+    assert info['sealed_resources'] == 'Yes'
+    assert 'com.apple.security.app-sandbox' in entitlements_xml
+    
+    info, entitlements_xml = parse_codesign_display(1, "code object is not signed at all\n", "")
+    assert info['signature_status'] == 'Invalid or Unsigned'
+    assert info['error'] == 'code object is not signed at all'
+    assert entitlements_xml is None
+
+def install_fake_tool(bin_dir: Path, name: str, body: str) -> None:
+    """Write an executable Python script named `name` into bin_dir"""
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    tool_path = bin_dir / name
+    tool_path.write_text(f"#!{sys.executable}\nimport sys\n{body}")
+    tool_path.chmod(0o755)
+
+def test_process_application_spawns_codesign_once(tmp_path, monkeypatch):
+    """Signing details and entitlements share one codesign process per bundle"""
+    install_fake_tool(tmp_path / "bin", "codesign", f"""
+if '--verify' in sys.argv:
+    sys.exit(0)
+sys.stderr.write({CODESIGN_DISPLAY_STDERR!r})
+sys.stdout.write({CODESIGN_DISPLAY_STDOUT!r})
+""")
+    monkeypatch.setenv("PATH", f"{tmp_path / 'bin'}:{os.environ['PATH']}")
+    
+    app_path = make_bundle(tmp_path / "apps")
+    for verify_signature, expected_spawns in [(False, 1), (True, 2)]:
+        TOOL_SPAWN_COUNTS.clear()
+        data_dir = tmp_path / f"data-{verify_signature}"
+        assert process_application(app_path, data_dir, verify_signature=verify_signature)
+        assert TOOL_SPAWN_COUNTS['codesign'] == expected_spawns
+        assert 'app-sandbox' in (data_dir / "Sample" / "entitlements.plist").read_text()
+        assert 'Identifier: com.apple.calculator' in (data_dir / "Sample" / "codesign.txt").read_text()
+
+def test_scan_bundle_prunes_and_collects(tmp_path):
+    """One walk finds SDEFs and icons while skipping irrelevant subtrees"""
+    app_path = make_bundle(tmp_path)
+    resources = app_path / "Contents" / "Resources"
+    framework = app_path / "Contents" / "Frameworks" / "Kit.framework"
+    for directory in [resources / "en.lproj", framework / "Versions" / "A" / "Headers",
+                      framework / "Versions" / "A" / "Resources", app_path / "Contents" / "_CodeSignature"]:
+        directory.mkdir(parents=True)
+    (resources / "Sample.sdef").write_text("<dictionary/>")
+    (resources / "AppIcon.icns").write_bytes(b"icns")
+    (resources / "en.lproj" / "Hidden.sdef").write_text("<dictionary/>")
+    (framework / "Versions" / "A" / "Headers" / "Kit.h").write_text("")
+    (framework / "Versions" / "A" / "Resources" / "Kit.sdef").write_text("<dictionary/>")
+    (framework / "Versions" / "A" / "Resources" / "Kit.icns").write_bytes(b"icns")
+    (framework / "Versions" / "Current").symlink_to("A")
+    
+    scan = scan_bundle(app_path)
+    assert scan['sdef_files'] == [
+        framework / "Versions" / "A" / "Resources" / "Kit.sdef",
+        resources / "Sample.sdef",
+    ]
+    assert scan['icon_files'] == [resources / "AppIcon.icns"]
+    assert scan['pruned_dirs'] == 3
+    assert scan['file_count'] == 5  # Info.plist, 2 SDEFs, 2 icons
+
+def test_icon_pipeline_converts_each_icon_once(tmp_path):
+    """Icons are converted through the converter chain and cached by content hash"""
+    app_path = make_bundle(tmp_path / "apps")
+    resources = app_path / "Contents" / "Resources"
+    resources.mkdir()
+    (resources / "SampleIcon.icns").write_bytes(b"icns-bytes")
+    
+    conversions = []
+    def stub_converter(icon_path, output_path, size):
+        conversions.append(icon_path)
+        output_path.write_bytes(b"png:" + icon_path.read_bytes())
+        return True
+    
+    cache_dir = tmp_path / "cache"
+    for run in range(2):
+        # A fresh pipeline per run, as in separate collector invocations
+        icons = IconPipeline(cache_dir=cache_dir, converters=[lambda *args: False, stub_converter])
+        app_dir = tmp_path / f"data-{run}" / "Sample"
+        app_dir.mkdir(parents=True)
+        assert extract_app_icon(app_path, app_dir, icons=icons) == "icon.png"
+        assert (app_dir / "icon.png").read_bytes() == b"png:icns-bytes"
+    
+    assert conversions == [resources / "SampleIcon.icns"]
+    assert icons.stats['cache_hits'] == 1
+
+def test_icon_pipeline_reports_converter_failure(tmp_path):
+    """When every converter fails no icon is left behind"""
+    app_path = make_bundle(tmp_path / "apps")
+    resources = app_path / "Contents" / "Resources"
+    resources.mkdir()
+    (resources / "SampleIcon.icns").write_bytes(b"icns-bytes")
+    
+    icons = IconPipeline(cache_dir=tmp_path / "cache", converters=[lambda src, dest, size: False])
+    assert extract_app_icon(app_path, tmp_path, icons=icons) is None
+    assert not (tmp_path / "icon.png").exists()
+    assert not any((tmp_path / "cache").glob("*"))
+
+def test_find_all_applications_native_scan(tmp_path):
+    """Bundles are found up to the depth limit, without descending into them, once each"""
+    system = tmp_path / "System"
+    user = tmp_path / "User"
+    for bundle in ["A.app", "Utilities/B.app", "Vendor/Suite/C.app", "Too/Deep/Nested/D.app",
+                   "A.app/Contents/Helpers/Helper.app"]:
+        (system / bundle / "Contents").mkdir(parents=True, exist_ok=True)
+    user.mkdir()
+    (user / "Linked.app").symlink_to(system / "Utilities" / "B.app")
+    (user / "Own.app").mkdir()
+    (system / "Vendor" / "Loop").symlink_to(system)
+    
+    found = find_all_applications([str(system), str(user), str(tmp_path / "missing")], max_depth=3)
+    assert found == {
+        system / "A.app",
+        system / "Utilities" / "B.app",
+        system / "Vendor" / "Suite" / "C.app",
+        user / "Own.app",
+    }
+    
+    assert system / "Too" / "Deep" / "Nested" / "D.app" in find_all_applications([str(system)], max_depth=4)
+
 if __name__ == "__main__":
     test_single_app()
+
+def test_stale_icon_and_uninstalled_apps_removed(tmp_path, monkeypatch):
+    """A dropped icon is unlinked, and pruning removes the data of apps that are no longer installed"""
+    import collect_macos_app_data as collector
+    from benchmark_collection import create_synthetic_app, install_stub_tools
+    
+    monkeypatch.setenv("PATH", os.environ.get("PATH", ""))
+    monkeypatch.setenv("STUB_TOOL_DELAY", "0")
+    install_stub_tools(tmp_path / "bin")
+    bundles = [create_synthetic_app(tmp_path / "Applications", f"App{i}") for i in range(3)]
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    collector.collect_applications(bundles, data_dir)
+    assert (data_dir / "App0" / "icon.png").exists()
+    
+    (bundles[0] / "Contents" / "Resources" / "App0.icns").unlink()
+    assert process_application(bundles[0], data_dir)
+    assert not (data_dir / "App0" / "icon.png").exists()
+    assert json.loads((data_dir / "App0" / "manifest.json").read_text())['icon_path'] is None
+    
+    # App2 is not found (e.g. deeper than --search-depth) but still installed, so its data is kept
+    shutil.rmtree(bundles[1])
+    results = collector.collect_applications([bundles[0]], data_dir)
+    assert collector.remove_stale_application_directories(data_dir, results) == ["App1"]
+    assert sorted(path.name for path in data_dir.iterdir()) == [
+        "App0", "App2", "_blobs", collector.FINGERPRINT_INDEX_NAME]
+    assert collector.remove_stale_application_directories(data_dir, results) == []
+
+def test_info_plist_with_control_characters(tmp_path, monkeypatch):
+    """A binary Info.plist with control characters is escaped instead of aborting the collection"""
+    import collect_macos_app_data as collector
+    from benchmark_collection import install_stub_tools
+    
+    apps_root = tmp_path / "Applications"
+    for name, bundle_name in [("Bad", "Bad\x01"), ("Good", "Good")]:
+        contents = apps_root / f"{name}.app" / "Contents"
+        contents.mkdir(parents=True)
+        with open(contents / "Info.plist", 'wb') as f:
+            plistlib.dump({'CFBundleName': bundle_name, 'Key\x02': ['\x1f']}, f, fmt=plistlib.FMT_BINARY)
+    
+    info_plist = extract_info_plist(apps_root / "Bad.app")
+    assert "<string>Bad\\u0001</string>" in info_plist and "<key>Key\\u0002</key>" in info_plist
+    assert load_plist_string(info_plist)['CFBundleName'] == "Bad\\u0001"
+    
+    monkeypatch.setenv("PATH", os.environ.get("PATH", ""))
+    monkeypatch.setenv("STUB_TOOL_DELAY", "0")
+    install_stub_tools(tmp_path / "bin")
+    data_dir = tmp_path / "data"
+    results = collector.collect_applications(sorted(apps_root.iterdir()), data_dir)
+    assert [result['status'] for result in results] == [collector.STATUS_PROCESSED] * 2
+    assert "Bad\\u0001" in (data_dir / "Bad" / "info.plist").read_text()
+    assert (data_dir / "Good" / "manifest.json").exists()
+
+def test_discovery_errors_prevent_pruning(tmp_path, monkeypatch):
+    """Unreadable directories are reported by discovery, and pruning is refused after them or a shallow search"""
+    import collect_macos_app_data as collector
+    
+    root = tmp_path / "Applications"
+    (root / "Visible.app").mkdir(parents=True)
+    (root / "Locked" / "Hidden.app").mkdir(parents=True)
+    scandir = os.scandir
+    def denying_scandir(path):
+        if Path(path).name == "Locked":
+            raise PermissionError(1, "Operation not permitted", str(path))
+        return scandir(path)
+    monkeypatch.setattr(os, "scandir", denying_scandir)
+    
+    errors = []
+    found = list(collector.iter_applications([str(root), str(tmp_path / "missing")], errors=errors))
+    assert found == [root / "Visible.app"]
+    assert len(errors) == 1 and errors[0].startswith(f"{root / 'Locked'}: ")
+    
+    assert collector.discovery_was_complete(collector.DEFAULT_SEARCH_DEPTH, [])
+    assert not collector.discovery_was_complete(collector.DEFAULT_SEARCH_DEPTH, errors)
+    assert not collector.discovery_was_complete(1, [])
+    assert not collector.parse_arguments([]).prune
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Tests for the webapp data export
+"""
+
+import gzip
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from generate_webapp_data import SDEF_INLINE_LIMIT, generate_data_index, verify_apps_bundle
+from sdef_store import SdefStore, write_sdef_refs
+
+def make_app(data_dir: Path, name: str, sdefs=()) -> Path:
+    """Create a collected app directory like collect_macos_app_data.py writes"""
+    app_dir = data_dir / name
+    app_dir.mkdir(parents=True)
+    (app_dir / "codesign.txt").write_text(f"Code Signing Information for {name}\n")
+    (app_dir / "manifest.json").write_text(f'{{"name": "{name}"}}')
+    for sdef in sdefs:
+        (app_dir / "sdef").mkdir(exist_ok=True)
+        (app_dir / "sdef" / sdef).write_text("<dictionary/>")
+    return app_dir
+
+def test_incremental_sync(tmp_path):
+    """Only changed files are copied and removed apps are deleted"""
+    data_dir = tmp_path / "data"
+    webapp_dir = tmp_path / "webapp"
+    make_app(data_dir, "Alpha", sdefs=["Alpha.sdef"])
+    beta = make_app(data_dir, "Beta")
+    
+    stats = generate_data_index(data_dir, webapp_dir)
+    assert stats['files_copied'] == 5
+    assert (webapp_dir / "Alpha" / "sdef_index.json").exists()
+    
+    stats = generate_data_index(data_dir, webapp_dir)
+    assert stats['files_copied'] == 0
+    assert stats['files_skipped'] == 5
+    
+    (beta / "codesign.txt").write_text("Code Signing Information for Beta (updated)\n")
+    (data_dir / "Alpha" / "manifest.json").unlink()
+    os.rename(data_dir / "Alpha", data_dir / "Gamma")
+    
+    stats = generate_data_index(data_dir, webapp_dir)
+    assert stats['files_copied'] == 3  # Gamma's two files + Beta's codesign.txt
+    assert stats['apps_removed'] == 1
+    assert not (webapp_dir / "Alpha").exists()
+    assert (webapp_dir / "Beta" / "codesign.txt").read_text().endswith("(updated)\n")
+    assert sorted(p.name for p in (webapp_dir / "Gamma").iterdir()) == ["codesign.txt", "detail.json", "sdef", "sdef_index.json"]
+
+def test_sync_replaces_directory_with_file(tmp_path):
+    """A path that changes between file and directory in data/ is replaced in the webapp"""
+    data_dir = tmp_path / "data"
+    webapp_dir = tmp_path / "webapp"
+    alpha = make_app(data_dir, "Alpha", sdefs=["Alpha.sdef"])
+    generate_data_index(data_dir, webapp_dir)
+    
+    (alpha / "sdef" / "Alpha.sdef").unlink()
+    (alpha / "sdef").rmdir()
+    (alpha / "sdef").write_text("not a directory any more")
+    generate_data_index(data_dir, webapp_dir)
+    assert (webapp_dir / "Alpha" / "sdef").read_text() == "not a directory any more"
+    
+    (alpha / "sdef").unlink()
+    (alpha / "sdef").mkdir()
+    (alpha / "sdef" / "Alpha.sdef").write_text("<dictionary/>")
+    generate_data_index(data_dir, webapp_dir)
+    assert (webapp_dir / "Alpha" / "sdef" / "Alpha.sdef").read_text() == "<dictionary/>"
+
+def test_hardlink_sync(tmp_path):
+    """With hardlinks no bytes are copied and files share inodes"""
+    data_dir = tmp_path / "data"
+    webapp_dir = tmp_path / "webapp"
+    make_app(data_dir, "Alpha")
+    
+    stats = generate_data_index(data_dir, webapp_dir, hardlink=True)
+    assert stats['files_linked'] == 2
+    assert stats['bytes_copied'] == 0
+    assert (webapp_dir / "Alpha" / "codesign.txt").stat().st_ino == (data_dir / "Alpha" / "codesign.txt").stat().st_ino
+
+def test_apps_bundle(tmp_path):
+    """All manifests are bundled into one sorted, content-hashed file"""
+    data_dir = tmp_path / "data"
+    webapp_dir = tmp_path / "webapp"
+    make_app(data_dir, "Beta")
+    make_app(data_dir, "Alpha")
+    
+    generate_data_index(data_dir, webapp_dir, compress=True)
+    index = json.loads((webapp_dir / "index.json").read_text())
+    bundle_file = webapp_dir / index["apps_bundle"]
+    bundle = json.loads(bundle_file.read_text())
+    assert bundle["apps"] == [{"name": "Alpha", "id": "Alpha"}, {"name": "Beta", "id": "Beta"}]
+    assert (webapp_dir / "apps.json").read_bytes() == bundle_file.read_bytes()
+    assert gzip.decompress((webapp_dir / f"{index['apps_bundle']}.gz").read_bytes()) == bundle_file.read_bytes()
+    assert verify_apps_bundle(bundle_file, sorted(data_dir.iterdir())) == []
+    
+    # A changed manifest produces a new bundle name and the old one is removed
+    (data_dir / "Beta" / "manifest.json").write_text('{"name": "Beta", "sdef_count": 1}')
+    assert verify_apps_bundle(bundle_file, sorted(data_dir.iterdir())) == ["Beta: differs from manifest.json"]
+    generate_data_index(data_dir, webapp_dir)
+    new_index = json.loads((webapp_dir / "index.json").read_text())
+    assert new_index["apps_bundle"] != index["apps_bundle"]
+    assert sorted(p.name for p in webapp_dir.glob("apps.*")) == sorted(["apps.json", new_index["apps_bundle"]])
+
+def test_sdef_blobs(tmp_path):
+    """SDEFs in the blob store are exported once and referenced by digest"""
+    data_dir = tmp_path / "data"
+    webapp_dir = tmp_path / "webapp"
+    make_app(data_dir, "Legacy", sdefs=["Legacy.sdef"])
+    stored = make_app(data_dir, "Stored")
+    store = SdefStore(data_dir)
+    digest = store.add(data_dir / "Legacy" / "sdef" / "Legacy.sdef")
+    write_sdef_refs(stored, {"Stored.sdef": digest})
+    
+    generate_data_index(data_dir, webapp_dir)
+    assert json.loads((webapp_dir / "Legacy" / "sdef_index.json").read_text()) == {
+        "files": ["Legacy.sdef"], "count": 1
+    }
+    assert json.loads((webapp_dir / "Stored" / "sdef_index.json").read_text()) == {
+        "files": ["Stored.sdef"], "count": 1, "blobs": {"Stored.sdef": digest}
+    }
+    assert (webapp_dir / "_blobs" / digest).read_text() == "<dictionary/>"
+
+def test_app_detail(tmp_path):
+    """detail.json bundles the detail view; large SDEFs are referenced by URL"""
+    data_dir = tmp_path / "data"
+    webapp_dir = tmp_path / "webapp"
+    app_dir = make_app(data_dir, "Music", sdefs=["Small.sdef"])
+    (app_dir / "entitlements.plist").write_text("<!-- Entitlements for Music.app -->\n")
+    (app_dir / "sandbox.txt").write_text("Sandboxed: Yes\n")
+    large_sdef = "<dictionary>" + " " * SDEF_INLINE_LIMIT + "</dictionary>"
+    (app_dir / "sdef" / "Large.sdef").write_text(large_sdef)
+    stored = make_app(data_dir, "Stored")
+    store = SdefStore(data_dir)
+    write_sdef_refs(stored, {"Stored.sdef": store.add(app_dir / "sdef" / "Large.sdef")})
+
+    stats = generate_data_index(data_dir, webapp_dir, compress=True)
+    detail_file = webapp_dir / "Music" / "detail.json"
+    detail = json.loads(detail_file.read_text())
+    assert detail["entitlements"] == "<!-- Entitlements for Music.app -->\n"
+    assert detail["info_plist"] is None
+    assert detail["sandbox"] == "Sandboxed: Yes\n"
+    assert detail["sdef_files"] == [
+        {"name": "Large.sdef", "size": len(large_sdef), "url": "Music/sdef/Large.sdef"},
+        {"name": "Small.sdef", "size": len("<dictionary/>"), "content": "<dictionary/>"},
+    ]
+    assert gzip.decompress((webapp_dir / "Music" / "detail.json.gz").read_bytes()) == detail_file.read_bytes()
+    assert (webapp_dir / detail["sdef_files"][0]["url"]).read_text() == large_sdef
+
+    stored_detail = json.loads((webapp_dir / "Stored" / "detail.json").read_text())
+    assert (webapp_dir / stored_detail["sdef_files"][0]["url"]).read_text() == large_sdef
+    assert (stats['sdefs_inlined'], stats['sdefs_deferred']) == (1, 2)
+
+    # Generated files survive the next sync; compressed copies go without --compress
+    generate_data_index(data_dir, webapp_dir)
+    assert detail_file.exists()
+    assert not (webapp_dir / "Music" / "detail.json.gz").exists()
+
+def test_main_exits_nonzero_on_failure(monkeypatch):
+    """The CLI reports a failed generation through its exit status"""
+    import generate_webapp_data
+    
+    monkeypatch.setattr(sys, "argv", ["generate_webapp_data.py"])
+    monkeypatch.setattr(generate_webapp_data, "generate_data_index", lambda **kwargs: False)
+    with pytest.raises(SystemExit) as exit_info:
+        generate_webapp_data.main()
+    assert exit_info.value.code == 1
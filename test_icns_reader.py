@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests for native .icns to PNG extraction
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from benchmark_collection import build_icns, build_png
+from collect_macos_app_data import TOOL_SPAWN_COUNTS, IconPipeline
+from icns_reader import IcnsError, extract_png, list_png_images
+
+# Legacy RLE and mask chunks that need sips
+LEGACY_CHUNKS = [(b'is32', b'\x86\x00' * 40), (b's8mk', b'\xff' * 256), (b'it32', b'\x00' * 64)]
+
+def write_icns(tmp_path: Path, chunks) -> Path:
+    icon_path = tmp_path / "AppIcon.icns"
+    icon_path.write_bytes(build_icns(chunks))
+    return icon_path
+
+def test_extracts_largest_or_requested_png(tmp_path):
+    """The largest PNG is extracted by default, the closest larger one for a size"""
+    pngs = {size: build_png(size, size) for size in (16, 32, 128, 256)}
+    icon_path = write_icns(tmp_path, LEGACY_CHUNKS + [
+        (b'icp4', pngs[16]), (b'ic07', pngs[128]), (b'ic11', pngs[32]), (b'ic08', pngs[256]),
+    ])
+
+    assert [image['width'] for image in list_png_images(icon_path.read_bytes())] == [16, 128, 32, 256]
+
+    output_path = tmp_path / "icon.png"
+    assert extract_png(icon_path, output_path)
+    assert output_path.read_bytes() == pngs[256]
+    for size, expected in [(32, 32), (100, 128), (1024, 256)]:
+        assert extract_png(icon_path, output_path, size=size)
+        assert output_path.read_bytes() == pngs[expected]
+
+def test_legacy_and_invalid_icns(tmp_path):
+    """RLE-only icons are left to another converter; corrupt files raise"""
+    output_path = tmp_path / "icon.png"
+    assert not extract_png(write_icns(tmp_path, LEGACY_CHUNKS), output_path)
+    assert not output_path.exists()
+
+    bad_path = tmp_path / "Bad.icns"
+    bad_path.write_bytes(b"icns\x00\x00\x00\x20ic07\x00\x00\xff\xff")
+    with pytest.raises(IcnsError):
+        extract_png(bad_path, output_path)
+    bad_path.write_bytes(b"not an icon")
+    with pytest.raises(IcnsError):
+        extract_png(bad_path, output_path)
+
+def test_pipeline_uses_sips_only_for_legacy_icons(tmp_path, monkeypatch):
+    """Modern icons need no process; legacy ones fall through to sips"""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    sips = bin_dir / "sips"
+    sips.write_text(f"#!{sys.executable}\nimport shutil, sys\nshutil.copyfile(sys.argv[-3], sys.argv[-1])\n")
+    sips.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+    modern = write_icns(tmp_path, [(b'ic07', build_png(128, 128))])
+    legacy = tmp_path / "Legacy.icns"
+    legacy.write_bytes(build_icns(LEGACY_CHUNKS))
+
+    icons = IconPipeline()
+    TOOL_SPAWN_COUNTS.clear()
+    assert icons.convert(modern, tmp_path / "modern.png")
+    assert TOOL_SPAWN_COUNTS['sips'] == 0
+    assert icons.convert(legacy, tmp_path / "legacy.png")
+    assert TOOL_SPAWN_COUNTS['sips'] == 1
+    assert icons.converter_stats == {'convert_icon_with_icns_reader': 1, 'convert_icon_with_sips': 1}
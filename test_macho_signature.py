@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tests for the native Mach-O code signature reader
+"""
+
+import hashlib
+import plistlib
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from benchmark_collection import build_fat_macho, build_signed_macho
+from collect_macos_app_data import BundleContext, TOOL_SPAWN_COUNTS, parse_codesign_display, process_application
+from macho_signature import CPU_TYPE_ARM64, CPU_TYPE_X86_64, MachOError, parse_superblob, read_code_signature
+
+ENTITLEMENTS = plistlib.dumps({
+    "com.apple.security.app-sandbox": True,
+    "com.apple.security.network.client": True,
+})
+AUTHORITIES = ["Developer ID Application: Example Corp (ABCDE12345)",
+               "Developer ID Certification Authority", "Apple Root CA"]
+
+def write_executable(tmp_path: Path, data: bytes) -> Path:
+    executable = tmp_path / "Sample"
+    executable.write_bytes(data)
+    return executable
+
+def test_reads_developer_id_signature(tmp_path):
+    """Identifier, team, entitlements and the signer chain are decoded"""
+    executable = write_executable(tmp_path, build_signed_macho(
+        "com.example.sample", team_identifier="ABCDE12345", entitlements=ENTITLEMENTS, authorities=AUTHORITIES,
+    ))
+
+    signature = read_code_signature(executable)
+    assert signature['architecture'] == 'arm64'
+    assert signature['identifier'] == "com.example.sample"
+    assert signature['team_identifier'] == "ABCDE12345"
+    assert signature['authorities'] == AUTHORITIES
+    assert signature['sealed_resources'] is True
+    assert plistlib.loads(signature['entitlements'].encode()) == plistlib.loads(ENTITLEMENTS)
+
+    # The SHA-256 CodeDirectory is preferred over the SHA-1 one
+    sha256_code_directory = parse_superblob(executable.read_bytes()[8192:])[0x1000]
+    assert signature['hash_type'] == 'sha256'
+    assert signature['cdhash'] == hashlib.sha256(sha256_code_directory).hexdigest()[:40]
+
+def test_adhoc_unsigned_and_invalid(tmp_path):
+    """Ad-hoc signatures have no authorities; unsigned files return None"""
+    signature = read_code_signature(write_executable(tmp_path, build_signed_macho("adhoc", sealed_resources=False)))
+    assert signature['authorities'] == []
+    assert signature['team_identifier'] is None
+    assert signature['sealed_resources'] is False
+    assert signature['entitlements'] is None
+
+    assert read_code_signature(write_executable(tmp_path, build_signed_macho("unsigned", signed=False))) is None
+
+    with pytest.raises(MachOError):
+        read_code_signature(write_executable(tmp_path, b"#!/bin/sh\necho not a Mach-O\n"))
+    with pytest.raises(MachOError):
+        read_code_signature(write_executable(tmp_path, build_signed_macho("truncated")[:8300]))
+    with pytest.raises(MachOError):
+        read_code_signature(write_executable(tmp_path, b""))
+
+def test_fat_binary_slice_selection(tmp_path):
+    """The requested architecture's slice is read from fat binaries"""
+    executable = write_executable(tmp_path, build_fat_macho([
+        build_signed_macho("com.example.intel", cpu_type=CPU_TYPE_X86_64),
+        build_signed_macho("com.example.arm"),
+    ]))
+    assert read_code_signature(executable, CPU_TYPE_X86_64)['identifier'] == "com.example.intel"
+    assert read_code_signature(executable, CPU_TYPE_ARM64)['identifier'] == "com.example.arm"
+
+def test_native_probe_matches_codesign(tmp_path, monkeypatch):
+    """The native reader yields the same codesign_info and entitlements as codesign"""
+    app_path = tmp_path / "Sample.app"
+    (app_path / "Contents" / "MacOS").mkdir(parents=True)
+    with open(app_path / "Contents" / "Info.plist", 'wb') as f:
+        plistlib.dump({"CFBundleExecutable": "Sample", "CFBundleName": "Sample"}, f)
+    (app_path / "Contents" / "MacOS" / "Sample").write_bytes(build_signed_macho(
+        "com.example.sample", team_identifier="ABCDE12345", entitlements=ENTITLEMENTS, authorities=AUTHORITIES,
+    ))
+
+    # What `codesign -dvv --entitlements :-` prints for this executable
+    codesign_stderr = (
+        f"Executable={app_path}/Contents/MacOS/Sample\n"
+        "Identifier=com.example.sample\n"
+        "Format=app bundle with Mach-O thin (arm64)\n"
+        "CodeDirectory v=20400 size=316 flags=0x0(none) hashes=2+5 location=embedded\n"
+        + "".join(f"Authority={authority}\n" for authority in AUTHORITIES)
+        + "Sealed Resources version=2 rules=13 files=3\n"
+        "TeamIdentifier=ABCDE12345\n"
+    )
+    assert BundleContext(app_path).codesign_probe() == parse_codesign_display(
+        0, codesign_stderr, ENTITLEMENTS.decode()
+    )
+
+    # No codesign process is needed unless the signature is verified
+    monkeypatch.setenv("PATH", str(tmp_path / "no-tools"))
+    TOOL_SPAWN_COUNTS.clear()
+    assert process_application(app_path, tmp_path / "data", verify_signature=False)
+    assert sum(TOOL_SPAWN_COUNTS.values()) == 0
+    assert "Identifier: com.example.sample" in (tmp_path / "data" / "Sample" / "codesign.txt").read_text()
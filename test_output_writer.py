@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests for the atomic, write-only-if-changed output writer
+"""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import collect_macos_app_data as collector
+from benchmark_collection import create_synthetic_app, install_stub_tools
+from output_writer import OutputWriter
+
+def test_write_only_if_changed(tmp_path):
+    """Identical content is skipped, changed content replaces the file atomically"""
+    writer = OutputWriter()
+    path = tmp_path / "manifest.json"
+
+    assert writer.write(path, "first")
+    inode = path.stat().st_ino
+    assert not writer.write(path, b"first")
+    assert path.stat().st_ino == inode
+
+    assert writer.write(path, "second")
+    assert path.read_text() == "second"
+    assert path.stat().st_ino != inode
+    assert [p.name for p in tmp_path.iterdir()] == ["manifest.json"]
+
+    assert writer.remove(path) and not writer.remove(path)
+    assert writer.stats == {'files_written': 2, 'bytes_written': 11, 'files_skipped': 1, 'bytes_skipped': 5,
+                            'files_removed': 1}
+    assert writer.summary() == "2 files written (11 bytes), 1 unchanged skipped (5 bytes)"
+
+def test_write_is_fsynced_before_rename(tmp_path, monkeypatch):
+    """The temporary file reaches the disk before it replaces the destination"""
+    calls = []
+    fsync, replace = os.fsync, os.replace
+    monkeypatch.setattr(os, "fsync", lambda fd: calls.append("fsync") or fsync(fd))
+    monkeypatch.setattr(os, "replace", lambda src, dst: calls.append("replace") or replace(src, dst))
+
+    assert OutputWriter().write(tmp_path / "manifest.json", "content")
+    assert calls == ["fsync", "replace"]
+
+def test_forced_rerun_leaves_files_untouched(tmp_path, monkeypatch):
+    """Re-collecting unchanged bundles rewrites nothing in data/"""
+    monkeypatch.setenv("PATH", os.environ.get("PATH", ""))
+    monkeypatch.setenv("STUB_TOOL_DELAY", "0")
+    install_stub_tools(tmp_path / "bin")
+    writer = OutputWriter()
+    monkeypatch.setattr(collector, 'OUTPUT_WRITER', writer)
+    bundles = [create_synthetic_app(tmp_path / "Applications", f"App{i}", frameworks=2) for i in range(3)]
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+
+    collector.collect_applications(bundles, data_dir, icons=collector.IconPipeline())
+    before = {path: (path.stat().st_ino, path.stat().st_mtime_ns) for path in data_dir.rglob("*") if path.is_file()}
+    assert any(path.name == "sdef_refs.json" for path in before)
+    assert any(path.name == "icon.png" for path in before)
+
+    written = writer.stats['files_written']
+    results = collector.collect_applications(bundles, data_dir, force=True, icons=collector.IconPipeline())
+    assert all(result['status'] == collector.STATUS_PROCESSED for result in results)
+    after = {path: (path.stat().st_ino, path.stat().st_mtime_ns) for path in data_dir.rglob("*") if path.is_file()}
+    assert after == before
+    assert writer.stats['files_written'] == written
+    assert writer.stats['files_skipped'] >= 3 * 7
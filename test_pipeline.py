@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Tests for the streaming collection pipeline
+"""
+
+import hashlib
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import collect_macos_app_data as collector
+from benchmark_collection import create_synthetic_app, create_synthetic_tree, install_stub_tools
+from pipeline import Pipeline, Stage, format_pipeline_summary
+
+def test_backpressure_bounds_items_in_flight():
+    """A slow last stage throttles the source instead of letting items pile up"""
+    lock = threading.Lock()
+    state = {'produced': 0, 'written': 0, 'in_flight_max': 0}
+
+    def source():
+        for i in range(200):
+            with lock:
+                state['produced'] += 1
+                state['in_flight_max'] = max(state['in_flight_max'], state['produced'] - state['written'])
+            yield i
+
+    def drop_odd_thirds(item):
+        if item % 3 == 1:
+            with lock:
+                state['written'] += 1
+            return None
+        return item
+
+    def slow_write(item):
+        time.sleep(0.001)
+        with lock:
+            state['written'] += 1
+        return item
+
+    pipeline = Pipeline([
+        Stage('double', lambda item: item * 2, workers=2),
+        Stage('drop_odd_thirds', drop_odd_thirds, workers=1),
+        Stage('write', slow_write, workers=1),
+    ], queue_size=4)
+    outputs = pipeline.run(source())
+
+    assert sorted(outputs) == [i * 2 for i in range(200) if (i * 2) % 3 != 1]
+    summary = pipeline.summary()
+    # Three queues of 4, plus one item held by each of the 4 workers and the source
+    assert state['in_flight_max'] <= 3 * 4 + 4 + 1
+    assert all(stage['queue_max'] <= 4 for stage in summary['stages'].values())
+    assert summary['stages']['source']['items'] == 200
+    assert summary['stages']['write']['items'] == len(outputs)
+    assert summary['first_output'] < summary['wall_time']
+    assert format_pipeline_summary(summary)[-1].endswith("← bottleneck")
+
+def test_stage_error_is_raised():
+    """An exception in a stage stops the pipeline and is re-raised without deadlocking"""
+    def fail(item):
+        if item == 5:
+            raise ValueError("bad item")
+        return item
+
+    with pytest.raises(ValueError, match="bad item"):
+        Pipeline([Stage('fail', fail, workers=2), Stage('pass', lambda item: item)], queue_size=2).run(range(1000))
+
+def tree_hashes(directory: Path):
+    return {str(path.relative_to(directory)): hashlib.sha256(path.read_bytes()).hexdigest()
+            for path in sorted(directory.rglob("*")) if path.is_file()}
+
+def test_pipelined_matches_batch(tmp_path, monkeypatch):
+    """Streaming collection leaves data/ exactly like collect_applications(), including shared names"""
+    monkeypatch.setenv("PATH", os.environ.get("PATH", ""))
+    monkeypatch.setenv("STUB_TOOL_DELAY", "0")
+    install_stub_tools(tmp_path / "bin")
+    create_synthetic_tree(tmp_path / "Applications", 12, frameworks=1)
+    create_synthetic_app(tmp_path / "Other", "App0002")
+    search_paths = [str(tmp_path / "Applications"), str(tmp_path / "Other")]
+
+    batch_dir = tmp_path / "batch"
+    batch_dir.mkdir()
+    batch = collector.collect_applications(collector.find_all_applications(search_paths), batch_dir, jobs=4)
+
+    streamed_dir = tmp_path / "streamed"
+    streamed_dir.mkdir()
+    streamed, summary = collector.collect_applications_pipelined(
+        collector.iter_applications(search_paths), streamed_dir, stage_workers={'extract': 4, 'write': 2},
+        queue_size=2,
+    )
+
+    assert [(r['path'], r['status']) for r in streamed] == [(r['path'], r['status']) for r in batch]
+    assert len(streamed) == 13
+    assert tree_hashes(streamed_dir) == tree_hashes(batch_dir)
+    assert summary['stages']['discover']['items'] == 12
+    assert summary['stages']['write']['items'] == 12
+
+    # Unchanged bundles are skipped in the extract stage and never reach the writer
+    rerun, summary = collector.collect_applications_pipelined(collector.iter_applications(search_paths), streamed_dir)
+    assert all(result['status'] == collector.STATUS_SKIPPED for result in rerun)
+    assert summary['stages']['write']['items'] == 0
+
+def test_pipelined_bundle_errors_fail_only_that_app(tmp_path, monkeypatch):
+    """An unexpected exception in any stage marks its app failed; the other apps are still collected"""
+    monkeypatch.setenv("PATH", os.environ.get("PATH", ""))
+    monkeypatch.setenv("STUB_TOOL_DELAY", "0")
+    install_stub_tools(tmp_path / "bin")
+    bundles = [create_synthetic_app(tmp_path / "Applications", f"App{i}") for i in range(5)]
+
+    def failing(function, app_name, error):
+        def wrapper(*args, **kwargs):
+            if any(app_name in str(arg) for arg in args):
+                raise error
+            return function(*args, **kwargs)
+        return wrapper
+    monkeypatch.setattr(collector, "extract_application_data",
+                        failing(collector.extract_application_data, "App1", ValueError("bad plist")))
+    monkeypatch.setattr(collector, "analyze_application_data",
+                        failing(collector.analyze_application_data, "App2", KeyError("parse")))
+    monkeypatch.setattr(collector, "write_application_data",
+                        failing(collector.write_application_data, "App3", RuntimeError("bug")))
+
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    results, summary = collector.collect_applications_pipelined(iter(bundles), data_dir)
+    assert [result['status'] for result in results] == [
+        collector.STATUS_PROCESSED, collector.STATUS_FAILED, collector.STATUS_FAILED, collector.STATUS_FAILED,
+        collector.STATUS_PROCESSED]
+    assert (data_dir / "App0" / "manifest.json").exists() and (data_dir / "App4" / "manifest.json").exists()
+    assert sorted(collector.load_fingerprint_index(data_dir)) == [str(bundles[0]), str(bundles[4])]
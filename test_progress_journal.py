@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Tests for resuming an interrupted collection from the progress journal
+"""
+
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import collect_macos_app_data as collector
+from benchmark_collection import create_synthetic_app, install_stub_tools
+from progress_journal import EVENT_COMPLETE, EVENT_START, JOURNAL_NAME, ProgressJournal
+
+COLLECT_SCRIPT = """
+import sys
+from pathlib import Path
+sys.path.insert(0, sys.argv[1])
+import collect_macos_app_data as collector
+from progress_journal import ProgressJournal
+apps_root, data_dir, journal_path = Path(sys.argv[2]), Path(sys.argv[3]), Path(sys.argv[4])
+journal = ProgressJournal(journal_path)
+journal.open()
+collector.collect_applications(sorted(apps_root.iterdir()), data_dir, journal=journal,
+                               icons=collector.IconPipeline())
+"""
+
+def test_resume_after_kill(tmp_path, monkeypatch):
+    """A killed run is resumed without redoing completed apps, and the interrupted app is redone"""
+    monkeypatch.setenv("PATH", os.environ.get("PATH", ""))
+    install_stub_tools(tmp_path / "bin")
+    apps_root = tmp_path / "Applications"
+    bundles = [create_synthetic_app(apps_root, f"App{i}") for i in range(8)]
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    journal_path = tmp_path / ".cache" / JOURNAL_NAME
+
+    # Each app waits on the `codesign --verify` stub, so the run can be killed
+    # after three apps completed and while the fourth is being written
+    process = subprocess.Popen(
+        [sys.executable, "-c", COLLECT_SCRIPT, str(Path(__file__).parent), str(apps_root), str(data_dir),
+         str(journal_path)],
+        env={**os.environ, "STUB_TOOL_DELAY": "0.3"}, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        events = journal_path.read_text() if journal_path.exists() else ""
+        if events.count(EVENT_COMPLETE) >= 3 and events.count(EVENT_START) > events.count(EVENT_COMPLETE):
+            break
+        time.sleep(0.02)
+    process.send_signal(signal.SIGKILL)
+    process.wait()
+
+    previous = ProgressJournal.read(journal_path)
+    completed = {name for name, entry in previous.items() if entry['event'] == EVENT_COMPLETE}
+    assert 3 <= len(completed) < len(bundles)
+    assert not (data_dir / collector.FINGERPRINT_INDEX_NAME).exists()
+
+    interrupted = sorted(set(previous) - completed)
+    assert interrupted
+    for name in interrupted:
+        (data_dir / name).mkdir(exist_ok=True)
+        (data_dir / name / "stale.txt").write_text("half-written")
+    with open(journal_path, 'a') as f:
+        f.write('{"event": "comp')
+
+    monkeypatch.setenv("STUB_TOOL_DELAY", "0")
+    journal = ProgressJournal(journal_path)
+    journal.open(resume=True)
+    assert journal.interrupted_apps() == interrupted
+    results = collector.collect_applications(bundles, data_dir, journal=journal, resume=True,
+                                             icons=collector.IconPipeline())
+    journal.close()
+
+    skipped = {result['path'].stem for result in results if result['status'] == collector.STATUS_SKIPPED}
+    processed = {result['path'].stem for result in results if result['status'] == collector.STATUS_PROCESSED}
+    assert skipped == completed
+    assert processed == {bundle.stem for bundle in bundles} - completed
+    for name in interrupted:
+        assert not (data_dir / name / "stale.txt").exists()
+    for bundle in bundles:
+        assert (data_dir / bundle.stem / "manifest.json").exists()
+
+    final = ProgressJournal.read(journal_path)
+    assert all(final[bundle.stem]['event'] == EVENT_COMPLETE for bundle in bundles)
+
+    # Changed outputs are not trusted: a completed app whose files were modified is redone
+    tampered = sorted(completed)[0]
+    (data_dir / tampered / "sandbox.txt").write_text("edited")
+    journal = ProgressJournal(journal_path)
+    journal.open(resume=True)
+    results = collector.collect_applications(bundles, data_dir, incremental=False, journal=journal, resume=True,
+                                             icons=collector.IconPipeline())
+    journal.close()
+    assert [result['path'].stem for result in results if result['status'] == collector.STATUS_PROCESSED] == [tampered]
+
+def test_failed_app_is_retried_on_resume(tmp_path, monkeypatch):
+    """An application whose data could not be written is not journalled as complete and is redone by --resume"""
+    monkeypatch.setenv("PATH", os.environ.get("PATH", ""))
+    monkeypatch.setenv("STUB_TOOL_DELAY", "0")
+    install_stub_tools(tmp_path / "bin")
+    apps_root = tmp_path / "Applications"
+    bundles = [create_synthetic_app(apps_root, f"App{i}") for i in range(3)]
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    journal_path = tmp_path / JOURNAL_NAME
+
+    write_application_data = collector.write_application_data
+    def failing_write(app_dir, *args, **kwargs):
+        if app_dir.name == "App1":
+            raise OSError("disk full")
+        return write_application_data(app_dir, *args, **kwargs)
+    monkeypatch.setattr(collector, "write_application_data", failing_write)
+
+    journal = ProgressJournal(journal_path)
+    journal.open()
+    results = collector.collect_applications(bundles, data_dir, journal=journal, icons=collector.IconPipeline())
+    journal.close()
+    assert [result['status'] for result in results] == [
+        collector.STATUS_PROCESSED, collector.STATUS_FAILED, collector.STATUS_PROCESSED]
+    entries = ProgressJournal.read(journal_path)
+    assert entries["App1"]['event'] == EVENT_START
+    assert entries["App0"]['event'] == entries["App2"]['event'] == EVENT_COMPLETE
+
+    monkeypatch.setattr(collector, "write_application_data", write_application_data)
+    journal = ProgressJournal(journal_path)
+    journal.open(resume=True)
+    assert journal.interrupted_apps() == ["App1"]
+    results = collector.collect_applications(bundles, data_dir, incremental=False, journal=journal, resume=True,
+                                             icons=collector.IconPipeline())
+    journal.close()
+    assert [result['status'] for result in results] == [
+        collector.STATUS_SKIPPED, collector.STATUS_PROCESSED, collector.STATUS_SKIPPED]
+    assert (data_dir / "App1" / "manifest.json").exists()
+    assert ProgressJournal.read(journal_path)["App1"]['event'] == EVENT_COMPLETE
+
+def test_journal_is_kept_out_of_data():
+    """The journal changes every run, so it lives in the gitignored .cache/ rather than the published data/"""
+    journal_path = collector.parse_arguments([]).journal
+    assert journal_path == Path(collector.__file__).parent / ".cache" / JOURNAL_NAME
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tests for rebuilding derived files from stored data
+"""
+
+import json
+import plistlib
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from benchmark_collection import build_signed_macho
+from collect_macos_app_data import process_application
+from reanalyze import reanalyze_app, reanalyze_data_directory
+
+ENTITLEMENTS = {
+    "com.apple.security.app-sandbox": True,
+    "com.apple.security.cs.disable-library-validation": True,
+    "com.apple.developer.icloud-services": {"CloudKit": {"container": "iCloud.com.example"}},
+}
+
+def collect_sample_app(tmp_path: Path, monkeypatch) -> Path:
+    """Run the collector on a synthetic signed bundle and return its data directory"""
+    app_path = tmp_path / "Applications" / "Sample.app"
+    (app_path / "Contents" / "MacOS").mkdir(parents=True)
+    with open(app_path / "Contents" / "Info.plist", 'wb') as f:
+        plistlib.dump({"CFBundleExecutable": "Sample", "LSUIElement": True}, f)
+    (app_path / "Contents" / "MacOS" / "Sample").write_bytes(build_signed_macho(
+        "com.example.sample", team_identifier="ABCDE12345", entitlements=plistlib.dumps(ENTITLEMENTS),
+    ))
+    monkeypatch.setenv("PATH", str(tmp_path / "no-tools"))
+    data_dir = tmp_path / "data"
+    assert process_application(app_path, data_dir, verify_signature=False)
+    return data_dir
+
+def test_reanalyze_matches_collector(tmp_path, monkeypatch):
+    """Freshly collected data is already up to date, so nothing is rewritten"""
+    data_dir = collect_sample_app(tmp_path, monkeypatch)
+    mtimes = {path.name: path.stat().st_mtime_ns for path in (data_dir / "Sample").iterdir()}
+
+    results = reanalyze_data_directory(data_dir, jobs=2)
+    assert results == [{'name': "Sample", 'changed': [], 'error': None,
+                        'unchanged': ["entitlements.json", "sandbox.txt", "manifest.json"]}]
+    assert {path.name: path.stat().st_mtime_ns for path in (data_dir / "Sample").iterdir()} == mtimes
+
+def test_reanalyze_rewrites_stale_outputs(tmp_path, monkeypatch):
+    """Outdated analyses are rebuilt from the stored plists and codesign.txt"""
+    data_dir = collect_sample_app(tmp_path, monkeypatch)
+    app_dir = data_dir / "Sample"
+    expected = {name: (app_dir / name).read_text() for name in ("sandbox.txt", "manifest.json", "entitlements.json")}
+
+    # What an older collector wrote: a wrong verdict and no entitlements.json
+    manifest = json.loads(expected["manifest.json"])
+    manifest["sandbox"]["sandboxed"] = "No"
+    manifest["sandbox"]["entitlements_count"] = "4"
+    (app_dir / "manifest.json").write_text(json.dumps(manifest, indent=2))
+    (app_dir / "sandbox.txt").write_text("Sandboxed: No\n")
+    (app_dir / "entitlements.json").unlink()
+
+    assert reanalyze_app(app_dir, dry_run=True)['changed'] == ["entitlements.json", "sandbox.txt", "manifest.json"]
+    assert not (app_dir / "entitlements.json").exists()
+
+    result = reanalyze_app(app_dir)
+    assert result['changed'] == ["entitlements.json", "sandbox.txt", "manifest.json"]
+    assert {name: (app_dir / name).read_text() for name in expected} == expected
+    assert json.loads(expected["manifest.json"])["codesign"]["team_identifier"] == "ABCDE12345"
+    assert "- Background app (LSUIElement)\n" in expected["sandbox.txt"]
+
+    (app_dir / "manifest.json").unlink()
+    assert reanalyze_app(app_dir)['error'] == "no manifest.json"
+
+def test_reanalyze_removes_json_of_unparseable_entitlements(tmp_path, monkeypatch):
+    """Like the collector, no entitlements.json is kept for entitlements that cannot be parsed"""
+    data_dir = collect_sample_app(tmp_path, monkeypatch)
+    app_dir = data_dir / "Sample"
+    (app_dir / "entitlements.plist").write_text("<plist><dict><key>oops")
+
+    assert reanalyze_app(app_dir, dry_run=True)['changed'] == ["entitlements.json", "sandbox.txt", "manifest.json"]
+    assert (app_dir / "entitlements.json").exists()
+
+    assert reanalyze_app(app_dir)['changed'] == ["entitlements.json", "sandbox.txt", "manifest.json"]
+    assert not (app_dir / "entitlements.json").exists()
+    assert "Entitlements parsing error" in (app_dir / "sandbox.txt").read_text()
+    assert reanalyze_app(app_dir)['changed'] == []
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Tests for the run profile instrumentation
+"""
+
+import json
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import collect_macos_app_data as collector
+from benchmark_collection import create_synthetic_app
+from run_profile import RunProfile
+
+def test_attribution_across_threads(tmp_path):
+    """Each worker thread's measurements land on the app it is processing"""
+    profile = RunProfile()
+    with profile.stage('discovery'):
+        pass
+
+    def work(name: str, spawns: int):
+        with profile.app(name):
+            with profile.stage('codesign'):
+                for _ in range(spawns):
+                    profile.count_spawn('codesign')
+            profile.count_bytes(100 * spawns)
+
+    threads = [threading.Thread(target=work, args=(f"App{i}", i)) for i in range(1, 5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    summary = profile.write(tmp_path / "run_profile.json", top=2)
+    assert json.loads((tmp_path / "run_profile.json").read_text()) == summary
+    assert list(summary['stages']) == ['discovery', 'codesign']
+    assert summary['tool_spawns'] == {'codesign': 10}
+    assert summary['bytes_written'] == 1000
+    assert summary['apps']['App3']['tool_spawns'] == {'codesign': 3}
+    assert summary['apps']['App3']['bytes_written'] == 300
+    assert len(summary['slowest']) == 2
+    assert profile.current_app is None
+
+    table = profile.format_slowest(4)
+    assert table[0].split() == ['Application', 'total', 'codesign']
+    assert len(table) == 5
+
+def test_process_application_stages(tmp_path, monkeypatch):
+    """Every collection stage is timed and all written bytes are counted"""
+    profile = RunProfile()
+    monkeypatch.setattr(collector, 'RUN_PROFILE', profile)
+    monkeypatch.setenv("PATH", str(tmp_path / "no-tools"))
+    app_path = create_synthetic_app(tmp_path / "Applications", "Sample")
+
+    assert collector.process_application(app_path, tmp_path / "data", verify_signature=False,
+                                         icons=collector.IconPipeline())
+    app = profile.to_dict()['apps']['Sample']
+    assert list(app['stages']) == ['sdef', 'codesign', 'entitlements', 'info_plist', 'sandbox', 'icon', 'write']
+    assert app['tool_spawns'] == {}
+    app_dir = tmp_path / "data" / "Sample"
+    assert app['bytes_written'] == sum(path.stat().st_size for path in app_dir.iterdir()
+                                       if path.name != "sdef_refs.json")
+    assert app['total'] >= sum(app['stages'].values())
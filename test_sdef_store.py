@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Tests for the content-addressed SDEF store
+"""
+
+import shutil
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from collect_macos_app_data import collect_applications, process_application_group, prune_data_directory
+from sdef_store import SdefStore, list_app_sdefs, load_sdef_refs, migrate_data_directory
+
+SHARED_SDEF = "<dictionary><suite name='Standard Suite'/></dictionary>"
+
+def make_legacy_app(data_dir: Path, name: str, sdefs: dict) -> Path:
+    app_dir = data_dir / name
+    (app_dir / "sdef").mkdir(parents=True)
+    for file_name, content in sdefs.items():
+        (app_dir / "sdef" / file_name).write_text(content)
+    return app_dir
+
+def test_migration_deduplicates_and_keeps_contents(tmp_path):
+    """Identical SDEFs across apps end up in one blob and read back unchanged"""
+    data_dir = tmp_path / "data"
+    make_legacy_app(data_dir, "Xcode_26.0.1", {"Xcode.sdef": SHARED_SDEF, "Extra.sdef": "<dictionary/>"})
+    make_legacy_app(data_dir, "Xcode_26.5", {"Xcode.sdef": SHARED_SDEF})
+    before = {app_dir.name: {name: path.read_text() for name, path in list_app_sdefs(app_dir).items()}
+              for app_dir in data_dir.iterdir()}
+
+    assert migrate_data_directory(data_dir, dry_run=True)['bytes_after'] == len(SHARED_SDEF) + len("<dictionary/>")
+    assert (data_dir / "Xcode_26.5" / "sdef").exists()
+
+    report = migrate_data_directory(data_dir)
+    assert report['files'] == 3
+    assert report['blobs'] == 2
+    assert report['bytes_before'] - report['bytes_after'] == len(SHARED_SDEF)
+    assert len(list((data_dir / "_blobs").iterdir())) == 2
+    assert not (data_dir / "Xcode_26.5" / "sdef").exists()
+
+    after = {app_dir.name: {name: path.read_text() for name, path in list_app_sdefs(app_dir).items()}
+             for app_dir in data_dir.iterdir() if app_dir.name != "_blobs"}
+    assert after == before
+    assert migrate_data_directory(data_dir) == {'blobs': 0}
+
+def test_collector_reuses_blobs_and_reprocesses_cleanly(tmp_path):
+    """Reprocessing does not duplicate SDEFs; clashing names get a suffix"""
+    data_dir = tmp_path / "data"
+    bundles = []
+    for version, content in [("1", SHARED_SDEF), ("2", "<dictionary><suite name='New'/></dictionary>")]:
+        resources = tmp_path / version / "Sample.app" / "Contents" / "Resources"
+        resources.mkdir(parents=True)
+        (resources / "Sample.sdef").write_text(content)
+        bundles.append(resources.parent.parent)
+
+    store = SdefStore(data_dir)
+    for _ in range(2):
+        process_application_group(bundles, data_dir, verify_signature=False, sdef_store=store)
+        refs = load_sdef_refs(data_dir / "Sample")
+        assert sorted(refs) == ["Sample.sdef", "Sample_1.sdef"]
+    assert store.stats['stored'] == 2
+    assert store.stats['deduplicated'] == 2
+
+    # A bundle that drops its SDEF loses the reference; gc removes the orphaned blob
+    (bundles[1] / "Contents" / "Resources" / "Sample.sdef").unlink()
+    process_application_group(bundles, data_dir, verify_signature=False, sdef_store=store)
+    assert list(load_sdef_refs(data_dir / "Sample")) == ["Sample.sdef"]
+    assert store.remove_unreferenced(data_dir)['blobs'] == 1
+    assert list_app_sdefs(data_dir / "Sample")["Sample.sdef"].read_text() == SHARED_SDEF
+
+def test_full_collection_prunes_uninstalled_apps_and_blobs(tmp_path):
+    """After a full run, data and blobs of apps that are gone are removed; shared blobs stay"""
+    data_dir = tmp_path / "data"
+    bundles = []
+    for name, content in [("Kept", SHARED_SDEF), ("Copy", SHARED_SDEF), ("Gone", "<dictionary title='Gone'/>")]:
+        resources = tmp_path / "Applications" / f"{name}.app" / "Contents" / "Resources"
+        resources.mkdir(parents=True)
+        (resources / f"{name}.sdef").write_text(content)
+        bundles.append(resources.parent.parent)
+    collect_applications(bundles, data_dir, verify_signature=False)
+    assert len(list((data_dir / "_blobs").iterdir())) == 2
+
+    for bundle in bundles[1:]:
+        shutil.rmtree(bundle)
+    results = collect_applications(bundles[:1], data_dir, verify_signature=False)
+    # Without remove_apps only unreferenced blobs go (none yet)
+    assert prune_data_directory(data_dir, results) == ([], {'blobs': 0, 'bytes': 0})
+    removed_names, removed_blobs = prune_data_directory(data_dir, results, remove_apps=True)
+    assert removed_names == ["Copy", "Gone"]
+    assert removed_blobs['blobs'] == 1
+    assert list_app_sdefs(data_dir / "Kept")["Kept.sdef"].read_text() == SHARED_SDEF
+    assert prune_data_directory(data_dir, results, remove_apps=True) == ([], {'blobs': 0, 'bytes': 0})
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests for the prebuilt webapp search index
+"""
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from collect_macos_app_data import format_plist_xml
+from generate_webapp_data import generate_data_index
+from search_index import search_apps, tokenize
+
+SDEF = """<?xml version="1.0" encoding="UTF-8"?>
+<dictionary>
+  <suite name="Standard Suite" code="core">
+    <command name="open location" code="GURLGURL"/>
+  </suite>
+</dictionary>
+"""
+
+def make_app(data_dir: Path, name: str, identifier: str, team: str, entitlements: dict) -> Path:
+    app_dir = data_dir / name
+    app_dir.mkdir(parents=True)
+    (app_dir / "manifest.json").write_text(json.dumps({
+        "name": name, "path": f"/Applications/{name}.app",
+        "codesign": {"identifier": identifier, "team_identifier": team},
+    }))
+    (app_dir / "entitlements.plist").write_text(f"<!-- Entitlements for {name}.app -->\n\n" + format_plist_xml(entitlements))
+    return app_dir
+
+def test_tokenize():
+    """Values split on punctuation and camel case"""
+    assert tokenize("com.apple.security.cs.disable-library-validation") == {
+        "com", "apple", "security", "cs", "disable", "library", "validation"}
+    assert tokenize("VisualStudioCode") == {"visualstudiocode", "visual", "studio", "code"}
+    assert tokenize("HTTPServer2") == {"httpserver2", "http", "server", "2"}
+
+def test_search_index_fields_and_ranking(tmp_path):
+    """Entitlements, teams and SDEF commands are searchable; name matches rank first"""
+    data_dir = tmp_path / "data"
+    webapp_dir = tmp_path / "webapp"
+    make_app(data_dir, "Library Manager", "com.example.library", "not set", {})
+    make_app(data_dir, "Terminal", "com.apple.Terminal", "not set",
+             {"com.apple.security.cs.disable-library-validation": True})
+    music = make_app(data_dir, "Music", "com.apple.Music", "ABCDE12345", {"com.apple.security.app-sandbox": True})
+    (music / "sdef").mkdir()
+    (music / "sdef" / "Music.sdef").write_text(SDEF)
+
+    generate_data_index(data_dir, webapp_dir)
+    index_name = json.loads((webapp_dir / "index.json").read_text())["search_index"]
+    index = json.loads((webapp_dir / index_name).read_text())
+
+    assert search_apps(index, "disable-library-validation") == ["Terminal"]
+    assert search_apps(index, "libr") == ["Library Manager", "Terminal"]
+    assert search_apps(index, "abcde") == ["Music"]
+    assert search_apps(index, "open loc") == ["Music"]
+    assert search_apps(index, "app sandbox music") == ["Music"]
+    assert search_apps(index, "not set") == []
+    assert search_apps(index, "  ") == []
+
+    # A data change yields a new content-hashed index and drops the old one
+    make_app(data_dir, "Notes", "com.apple.Notes", "not set", {})
+    generate_data_index(data_dir, webapp_dir)
+    new_index_name = json.loads((webapp_dir / "index.json").read_text())["search_index"]
+    assert [p.name for p in webapp_dir.glob("search.*")] == [new_index_name]
+    assert search_apps(json.loads((webapp_dir / new_index_name).read_text()), "notes") == ["Notes"]
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Tests for the snapshot diff, on hand-built data directories and a git tag
+"""
+
+import hashlib
+import json
+import plistlib
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from snapshot_diff import DirectorySnapshot, GitSnapshot, diff_snapshots, format_markdown, open_snapshot
+
+def sdef_xml(suites):
+    """An SDEF with {suite name: [command names]}"""
+    body = "".join(f'<suite name="{name}" code="{name[:4]:<4}">' +
+                   "".join(f'<command name="{command}" code="core{command[:4]:<4}"/>' for command in commands) +
+                   "</suite>" for name, commands in suites.items())
+    return f'<?xml version="1.0" encoding="UTF-8"?>\n<dictionary>{body}</dictionary>\n'
+
+def write_app(data_dir: Path, name: str, bundle_id: str, version: str = "1.0", team: str = "TEAM111111",
+              entitlements=None, sandboxed: str = "Yes", sdefs=None, legacy_sdefs: bool = False):
+    """Write one app directory in the collector's format"""
+    app_dir = data_dir / name
+    app_dir.mkdir(parents=True)
+    info = plistlib.dumps({'CFBundleIdentifier': bundle_id, 'CFBundleShortVersionString': version}).decode()
+    (app_dir / "info.plist").write_text(f"<!-- Info.plist for {name}.app -->\n{info}")
+    (app_dir / "entitlements.plist").write_text(plistlib.dumps(entitlements).decode() if entitlements
+                                                else "No entitlements found\n")
+    (app_dir / "manifest.json").write_text(json.dumps({
+        'name': name, 'path': f"/Applications/{name}.app",
+        'codesign': {'signature_status': 'Valid', 'team_identifier': team},
+        'sandbox': {'sandboxed': sandboxed},
+    }, indent=2))
+    (app_dir / "icon.png").write_bytes(name.encode())
+    for sdef_name, suites in (sdefs or {}).items():
+        content = sdef_xml(suites).encode()
+        if legacy_sdefs:
+            (app_dir / "sdef").mkdir(exist_ok=True)
+            (app_dir / "sdef" / sdef_name).write_bytes(content)
+        else:
+            digest = hashlib.sha256(content).hexdigest()
+            (data_dir / "_blobs").mkdir(exist_ok=True)
+            (data_dir / "_blobs" / digest).write_bytes(content)
+            refs_file = app_dir / "sdef_refs.json"
+            refs = json.loads(refs_file.read_text())["files"] if refs_file.exists() else {}
+            refs[sdef_name] = digest
+            refs_file.write_text(json.dumps({"files": refs}))
+
+SANDBOX = {'com.apple.security.app-sandbox': True}
+STANDARD = {'Standard Suite': ['open', 'quit']}
+
+def build_snapshots(root: Path):
+    old, new = root / "old", root / "new"
+    write_app(old, "Alpha", "com.example.alpha", entitlements=SANDBOX)
+    write_app(new, "Alpha", "com.example.alpha", entitlements={'com.apple.security.network.client': True},
+              sandboxed="No")
+    write_app(old, "Beta", "com.example.beta")
+    write_app(new, "Beta", "com.example.beta", version="2.0", team="TEAM222222")
+    write_app(old, "Gamma", "com.example.gamma", sdefs={"Gamma.sdef": STANDARD})
+    write_app(new, "Gamma", "com.example.gamma",
+              sdefs={"Gamma.sdef": {'Standard Suite': ['open', 'quit', 'print'], 'Gamma Suite': ['play']}})
+    write_app(old, "Delta", "com.example.delta")
+    write_app(new, "Delta Pro", "com.example.delta")
+    write_app(old, "Epsilon", "com.example.epsilon")
+    write_app(new, "Zeta", "com.example.zeta")
+    # Same SDEF content, moved from the legacy sdef/ directory into the blob store
+    write_app(old, "Legacy", "com.example.legacy", sdefs={"Legacy.sdef": STANDARD}, legacy_sdefs=True)
+    write_app(new, "Legacy", "com.example.legacy", sdefs={"Legacy.sdef": STANDARD})
+    for data_dir in (old, new):
+        write_app(data_dir, "Omega", "com.example.omega", entitlements=SANDBOX, sdefs={"Omega.sdef": STANDARD})
+    return old, new
+
+def test_diff_directories(tmp_path):
+    """Apps are matched by bundle ID and only semantic changes are reported"""
+    old, new = build_snapshots(tmp_path)
+    diff = diff_snapshots(DirectorySnapshot(old), DirectorySnapshot(new))
+
+    assert diff['summary'] == {'old_apps': 7, 'new_apps': 7, 'added': 1, 'removed': 1, 'changed': 5, 'unchanged': 1}
+    assert diff['added'] == [{'name': 'Zeta', 'bundle_id': 'com.example.zeta'}]
+    assert diff['removed'] == [{'name': 'Epsilon', 'bundle_id': 'com.example.epsilon'}]
+    changes = {change['name']: change for change in diff['changed']}
+    assert list(changes) == ["Alpha", "Beta", "Delta Pro", "Gamma", "Legacy"]
+
+    alpha = changes["Alpha"]
+    assert alpha['entitlements'] == {'added': {'com.apple.security.network.client': True},
+                                     'removed': {'com.apple.security.app-sandbox': True}}
+    assert alpha['sandbox'] == {'sandboxed': ['Yes', 'No']}
+    assert alpha['highlights'] == ["gained entitlements", "lost entitlements", "lost sandboxing"]
+
+    beta = changes["Beta"]
+    assert beta['codesign'] == {'team_identifier': ['TEAM111111', 'TEAM222222']}
+    assert beta['version'] == {'CFBundleShortVersionString': ['1.0', '2.0']}
+    assert beta['highlights'] == ["team ID changed", "version changed"]
+
+    assert changes["Delta Pro"]['old_name'] == "Delta"
+    assert changes["Gamma"]['sdef'] == {"Gamma.sdef": {
+        'status': 'modified', 'suites_added': ['Gamma Suite'],
+        'suites': {'Standard Suite': {'commands_added': ['print']}},
+    }}
+    assert changes["Gamma"]['highlights'] == ["SDEF changed"]
+    assert 'sdef' not in changes["Legacy"] and changes["Legacy"]['highlights'] == []
+
+    markdown = format_markdown(diff)
+    assert "7 apps (7 before): 1 added, 1 removed, 5 changed, 1 unchanged." in markdown
+    assert "- **Alpha**: gained entitlements, lost entitlements, lost sandboxing" in markdown
+    assert "- Code signing team identifier: TEAM111111 → TEAM222222" in markdown
+    assert ("- SDEF `Gamma.sdef` modified: suites added: Gamma Suite / "
+            "Standard Suite: commands added `print`") in markdown
+    assert "- Renamed from Delta" in markdown
+
+def test_diff_git_revision(tmp_path):
+    """A tagged data/ tree is read from git and gives the same result as the directory"""
+    old, new = build_snapshots(tmp_path)
+    repo = tmp_path / "repo"
+    shutil.copytree(old, repo / "data")
+    def git(*args):
+        subprocess.run(['git', '-C', str(repo), '-c', 'user.name=test', '-c', 'user.email=test@example.com', *args],
+                       check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    git('init', '-q')
+    git('add', 'data')
+    git('commit', '-q', '-m', 'Snapshot')
+    git('tag', 'macos-1.0')
+
+    from_git = open_snapshot("macos-1.0", repo)
+    assert isinstance(from_git, GitSnapshot)
+    expected = diff_snapshots(DirectorySnapshot(old), DirectorySnapshot(new))
+    actual = diff_snapshots(from_git, open_snapshot(str(new), repo))
+    for key in ('summary', 'added', 'removed', 'changed'):
+        assert actual[key] == expected[key]
+    assert actual['old'] == "macos-1.0"
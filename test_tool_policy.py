@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Tests for adaptive timeouts, retries and the circuit breaker, using stub
+tools that hang or fail on demand
+"""
+
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import collect_macos_app_data as collector
+from benchmark_collection import create_synthetic_app, install_stub_tools
+from progress_journal import EVENT_START, ProgressJournal
+from tool_policy import ToolPolicy, ToolUnavailableError
+from tool_runner import ToolRunner
+
+@pytest.fixture
+def flaky_tool(tmp_path, monkeypatch):
+    """
+    A fake codesign whose behaviour is read from a mode file on every call:
+    "ok", "exit1", "hang", "crash", or "crash-once" (crash, then switch to "ok").
+    Returns a function that sets the mode and the path of the call log.
+    """
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    mode_file, calls = tmp_path / "mode", tmp_path / "calls.log"
+    tool_path = bin_dir / "codesign"
+    tool_path.write_text(f"""#!{sys.executable}
+import os, sys, time
+mode = open({str(mode_file)!r}).read()
+with open({str(calls)!r}, "a") as f:
+    f.write(mode + "\\n")
+if mode == "hang":
+    time.sleep(60)
+if mode == "crash-once":
+    open({str(mode_file)!r}, "w").write("ok")
+    os.abort()
+if mode == "crash":
+    os.abort()
+sys.exit(1 if mode == "exit1" else 0)
+""")
+    tool_path.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    mode_file.write_text("ok")
+    return mode_file.write_text, calls
+
+@pytest.fixture
+def runner():
+    tool_runner = ToolRunner()
+    yield tool_runner
+    tool_runner.close()
+
+def call_count(calls: Path) -> int:
+    return len(calls.read_text().split()) if calls.exists() else 0
+
+def test_timeout_adapts_to_observed_latency(flaky_tool, runner):
+    """After enough fast calls a hung tool is killed long before the caller's timeout"""
+    set_mode, calls = flaky_tool
+    policy = ToolPolicy(runner, min_samples=5, min_timeout=0.3, backoff=0.01)
+    assert policy.timeout_for("codesign", 30) == 30
+    for _ in range(5):
+        assert policy.run(["codesign"], timeout=30).returncode == 0
+    assert policy.timeout_for("codesign", 30) == 0.3
+
+    set_mode("hang")
+    start = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired):
+        policy.run(["codesign"], timeout=30)
+    # 0.3s, then one retry with twice the timeout
+    assert time.monotonic() - start < 3
+    stats = policy.summary()["codesign"]
+    assert stats["timeouts"] == 2 and stats["retries"] == 1 and stats["calls"] == 6
+
+def test_transient_failures_are_retried(flaky_tool, runner):
+    """A crash is retried, a non-zero exit status is a normal result"""
+    set_mode, calls = flaky_tool
+    policy = ToolPolicy(runner, backoff=0.01)
+
+    set_mode("crash-once")
+    assert policy.run(["codesign"]).returncode == 0
+    set_mode("exit1")
+    assert policy.run(["codesign"]).returncode == 1
+    assert call_count(calls) == 3
+
+    stats = policy.summary()["codesign"]
+    assert (stats["calls"], stats["attempts"], stats["crashes"], stats["retries"]) == (2, 3, 1, 1)
+    assert policy.format_summary() == [
+        "codesign: 2 calls, 0 timed out, 1 crashed, 0 failed to start, 1 retried, 0 skipped (marked unavailable)"
+    ]
+
+def test_circuit_breaker_short_circuits_and_recovers(flaky_tool, runner):
+    """Repeated failures stop further spawns until a trial call succeeds after the cooldown"""
+    set_mode, calls = flaky_tool
+    spawns = []
+    policy = ToolPolicy(runner, on_spawn=spawns.append, retries=0, failure_threshold=3, cooldown=0.5)
+
+    set_mode("crash")
+    for _ in range(3):
+        assert policy.run(["codesign"]).returncode < 0
+    with pytest.raises(ToolUnavailableError, match="codesign unavailable"):
+        policy.run(["codesign"])
+    assert call_count(calls) == len(spawns) == 3
+    assert policy.unavailable_tools() == ["codesign"]
+    assert policy.format_summary()[0].endswith("[circuit open]")
+
+    # A failed trial keeps the breaker open for another cooldown
+    time.sleep(0.6)
+    assert policy.run(["codesign"]).returncode < 0
+    with pytest.raises(ToolUnavailableError):
+        policy.run(["codesign"])
+
+    set_mode("ok")
+    time.sleep(0.6)
+    assert policy.run(["codesign"]).returncode == 0
+    assert policy.unavailable_tools() == []
+    stats = policy.summary()["codesign"]
+    assert (stats["trips"], stats["short_circuited"], stats["state"]) == (1, 2, "closed")
+
+def test_missing_tool_does_not_trip_breaker(tmp_path, monkeypatch, runner):
+    """A tool that is not installed fails instantly: no retries, no breaker"""
+    monkeypatch.setenv("PATH", str(tmp_path / "no-tools"))
+    policy = ToolPolicy(runner, failure_threshold=2)
+    for _ in range(3):
+        with pytest.raises(OSError):
+            policy.run(["codesign"])
+    stats = policy.summary()["codesign"]
+    assert (stats["spawn_errors"], stats["retries"], stats["state"]) == (3, 0, "closed")
+
+def test_collector_marks_fields_unavailable(tmp_path, monkeypatch):
+    """When codesign starts hanging, later apps skip verification instead of waiting"""
+    monkeypatch.setenv("PATH", os.environ.get("PATH", ""))
+    monkeypatch.setenv("STUB_TOOL_DELAY", "0")
+    install_stub_tools(tmp_path / "bin")
+    policy = ToolPolicy(collector.TOOL_RUNNER, on_spawn=collector.count_tool_spawn,
+                        min_samples=3, min_timeout=0.3, retries=0, failure_threshold=2)
+    monkeypatch.setattr(collector, 'TOOL_POLICY', policy)
+    bundles = [create_synthetic_app(tmp_path / "Applications", f"App{i}") for i in range(7)]
+    data_dir = tmp_path / "data"
+
+    for bundle in bundles[:3]:
+        assert collector.process_application(bundle, data_dir)
+
+    monkeypatch.setenv("STUB_TOOL_HANG", "codesign")
+    start = time.monotonic()
+    for bundle in bundles[3:]:
+        assert collector.process_application(bundle, data_dir)
+    assert time.monotonic() - start < 5
+
+    statuses = [(data_dir / bundle.stem / "codesign.txt").read_text() for bundle in bundles]
+    assert all("(Verification" not in text for text in statuses[:3])
+    assert all("timed out" in text for text in statuses[3:5])
+    assert all("(Verification Unavailable)" in text and "codesign --verify unavailable" in text
+               for text in statuses[5:])
+    stats = policy.summary()["codesign --verify"]
+    assert (stats["timeouts"], stats["short_circuited"], stats["trips"]) == (2, 2, 1)
+
+def test_tool_failures_leave_apps_incomplete(tmp_path, monkeypatch):
+    """Apps written while codesign timed out or was skipped are neither fingerprinted nor journalled as complete"""
+    monkeypatch.setenv("PATH", os.environ.get("PATH", ""))
+    monkeypatch.setenv("STUB_TOOL_DELAY", "0")
+    install_stub_tools(tmp_path / "bin")
+    policy = ToolPolicy(collector.TOOL_RUNNER, on_spawn=collector.count_tool_spawn,
+                        min_samples=1, min_timeout=0.3, retries=0, failure_threshold=2)
+    monkeypatch.setattr(collector, 'TOOL_POLICY', policy)
+    assert collector.process_application(create_synthetic_app(tmp_path / "Warmup", "Warmup"), tmp_path / "warmup")
+
+    bundles = [create_synthetic_app(tmp_path / "Applications", f"App{i}") for i in range(3)]
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    journal = ProgressJournal(tmp_path / "journal.jsonl")
+    journal.open()
+    monkeypatch.setenv("STUB_TOOL_HANG", "codesign")
+    results = collector.collect_applications(bundles, data_dir, journal=journal)
+    journal.close()
+
+    assert [result['status'] for result in results] == [collector.STATUS_INCOMPLETE] * 3
+    stats = policy.summary()["codesign --verify"]
+    assert (stats["timeouts"], stats["short_circuited"]) == (2, 1)
+    reports = [(data_dir / bundle.stem / "codesign.txt").read_text() for bundle in bundles]
+    assert "timed out" in reports[0] and "timed out" in reports[1] and "codesign --verify unavailable" in reports[2]
+    assert collector.load_fingerprint_index(data_dir) == {}
+    entries = ProgressJournal.read(tmp_path / "journal.jsonl")
+    assert {name: entry['event'] for name, entry in entries.items()} == dict.fromkeys(
+        ["App0", "App1", "App2"], EVENT_START)
+
+    # Once codesign works again the incomplete apps are collected again rather than skipped
+    monkeypatch.delenv("STUB_TOOL_HANG")
+    monkeypatch.setattr(collector, 'TOOL_POLICY', ToolPolicy(collector.TOOL_RUNNER))
+    journal = ProgressJournal(tmp_path / "journal.jsonl")
+    journal.open()
+    results = collector.collect_applications(bundles, data_dir, journal=journal)
+    journal.close()
+    assert [result['status'] for result in results] == [collector.STATUS_PROCESSED] * 3
+    assert len(collector.load_fingerprint_index(data_dir)) == 3
+    reports = [(data_dir / bundle.stem / "codesign.txt").read_text() for bundle in bundles]
+    assert all("timed out" not in report and "unavailable" not in report for report in reports)
+
+class LatencyRunner:
+    """A ToolRunner stand-in whose calls take a fixed time per subcommand, timing out like a real process"""
+
+    def __init__(self, latencies):
+        self.latencies = latencies
+        self.timeouts = []
+
+    def run(self, args, timeout=30):
+        latency = self.latencies[args[1]]
+        self.timeouts.append((args[1], timeout))
+        if latency > timeout:
+            time.sleep(timeout)
+            raise subprocess.TimeoutExpired(args, timeout)
+        time.sleep(latency)
+        return subprocess.CompletedProcess(args, 0, "", "")
+
+def test_subcommands_have_separate_latency_windows():
+    """Many fast `codesign -dv` calls do not shrink the timeout of the slow `codesign --verify`"""
+    runner = LatencyRunner({"-dv": 0.001, "--verify": 0.15})
+    policy = ToolPolicy(runner, min_samples=5, min_timeout=0.02, retries=0, failure_threshold=2)
+
+    # Like a collection: a fast probe for every app, and a slow verification for a few large ones
+    for app in range(30):
+        assert policy.run(["codesign", "-dv", f"/Apps/App{app}.app"]).returncode == 0
+        if app % 10 == 9:
+            assert policy.run(["codesign", "--verify", f"/Apps/App{app}.app"], timeout=1).returncode == 0
+
+    assert policy.timeout_for("codesign -dv", 30) < 0.1
+    assert [timeout for subcommand, timeout in runner.timeouts if subcommand == "--verify"] == [1, 1, 1]
+    summary = policy.summary()
+    assert sorted(summary) == ["codesign --verify", "codesign -dv"]
+    assert summary["codesign --verify"]["timeouts"] == 0 and summary["codesign --verify"]["state"] == "closed"
+    assert summary["codesign --verify"]["p95"] >= 0.15
+
+    # Once enough verifications were seen, their timeout follows their own (slow) latency
+    for app in range(2):
+        policy.run(["codesign", "--verify", f"/Apps/Big{app}.app"], timeout=1)
+    assert 0.6 <= policy.timeout_for("codesign --verify", 1) <= 1
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests for the asyncio tool runner, using fake tool scripts on PATH
+"""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from tool_runner import ToolRunner
+
+def install_fake_tool(bin_dir: Path, name: str, body: str) -> None:
+    """Write an executable Python script named `name` into bin_dir"""
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    tool_path = bin_dir / name
+    tool_path.write_text(f"#!{sys.executable}\nimport os, sys, time\n{body}")
+    tool_path.chmod(0o755)
+
+@pytest.fixture
+def fake_tools(tmp_path, monkeypatch):
+    """Directory of fake tools placed first on PATH"""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    return bin_dir
+
+@pytest.fixture
+def runner():
+    tool_runner = ToolRunner()
+    yield tool_runner
+    tool_runner.close()
+
+def test_run_captures_output(fake_tools, runner):
+    """stdout, stderr and the exit status come back like subprocess.run"""
+    install_fake_tool(fake_tools, "codesign", """
+sys.stdout.write("out:" + " ".join(sys.argv[1:]))
+sys.stderr.write("Identifier=com.example\\n")
+sys.exit(3)
+""")
+    result = runner.run(["codesign", "-dv", "/Apps/Example.app"])
+    assert result.returncode == 3
+    assert result.stdout == "out:-dv /Apps/Example.app"
+    assert result.stderr == "Identifier=com.example\n"
+
+def test_per_tool_concurrency_limit(fake_tools, runner, tmp_path):
+    """No more than the configured number of processes of one tool run at once"""
+    log = tmp_path / "events.log"
+    install_fake_tool(fake_tools, "sips", f"""
+with open({str(log)!r}, "a") as f:
+    f.write("start\\n")
+time.sleep(0.3)
+with open({str(log)!r}, "a") as f:
+    f.write("end\\n")
+""")
+    runner.limits["sips"] = 2
+    
+    threads = [threading.Thread(target=runner.run, args=(["sips"],)) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    running = max_running = 0
+    for event in log.read_text().split():
+        running += 1 if event == "start" else -1
+        max_running = max(max_running, running)
+    assert max_running == 2
+
+def test_timeout_kills_process(fake_tools, runner, tmp_path):
+    """A hung tool is killed when its timeout expires"""
+    marker = tmp_path / "finished"
+    install_fake_tool(fake_tools, "codesign", f"""
+time.sleep(2)
+open({str(marker)!r}, "w").close()
+""")
+    start = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired):
+        runner.run(["codesign"], timeout=0.3)
+    assert time.monotonic() - start < 1.5
+    time.sleep(2)
+    assert not marker.exists()
+
+def test_cancel_all_kills_in_flight_calls(fake_tools, runner):
+    """Cancelled calls raise in the caller and leave no process behind"""
+    install_fake_tool(fake_tools, "find", "time.sleep(10)\n")
+    errors = []
+    
+    def call():
+        try:
+            runner.run(["find"])
+        except subprocess.SubprocessError as e:
+            errors.append(e)
+    
+    thread = threading.Thread(target=call)
+    thread.start()
+    time.sleep(0.5)
+    start = time.monotonic()
+    runner.cancel_all()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert time.monotonic() - start < 2
+    assert len(errors) == 1
+
+def test_missing_tool_raises_oserror(fake_tools, runner):
+    """Missing tools surface as OSError, like subprocess.run"""
+    with pytest.raises(OSError):
+        runner.run(["definitely-not-a-real-tool-xyz"])
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Timeouts, retries and a circuit breaker for external tool calls.
+
+Every tool call used to get a fixed timeout (30s, 300s for find). A bundle
+that makes codesign hang wasted the full timeout, and when a tool was broken
+system-wide every application paid it again. ToolPolicy wraps a ToolRunner
+and, per operation (the tool and its leading option, see operation_key):
+
+- derives the timeout from observed latency: TIMEOUT_FACTOR x the p95 of the
+  last LATENCY_WINDOW successful calls, never below MIN_TIMEOUT and never
+  above the timeout the caller asked for (which is used as-is until
+  MIN_SAMPLES calls have been seen);
+- retries transient failures (timeouts, processes killed by a signal,
+  EAGAIN-style spawn errors) after a jittered exponential backoff; a retry
+  after a timeout gets twice the timeout;
+- opens a circuit breaker after FAILURE_THRESHOLD failed attempts in a row.
+  While it is open, calls raise ToolUnavailableError without starting a
+  process; after COOLDOWN seconds one trial call is let through, and the
+  breaker closes again if it succeeds.
+
+A non-zero exit status is a normal result (codesign reports unsigned bundles
+that way), not a failure. A tool that is not installed fails instantly, so it
+is reported but neither retried nor counted towards the breaker.
+"""
+
+import errno
+import logging
+import random
+import subprocess
+import threading
+import time
+from collections import Counter, deque
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, Optional
+
+from tool_runner import DEFAULT_TIMEOUT, ToolRunner
+
+logger = logging.getLogger(__name__)
+
+MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+TIMEOUT_FACTOR = 4.0
+MIN_TIMEOUT = 5.0
+RETRIES = 1
+RETRY_BACKOFF = 0.2
+FAILURE_THRESHOLD = 5
+COOLDOWN = 60.0
+
+# Spawn errors worth retrying: the system was momentarily out of processes,
+# file descriptors or memory
+TRANSIENT_ERRNOS = {errno.EAGAIN, errno.EINTR, errno.EMFILE, errno.ENFILE, errno.ENOMEM}
+
+def operation_key(args: List[str]) -> str:
+    """
+    Key that latency samples, failure counts and the circuit breaker are kept under.
+
+    Subcommands of one tool can take very different times (`codesign -dv`
+    reads a signature, `codesign --verify` hashes the whole bundle), so a
+    leading option is part of the key: "codesign -dv", "codesign --verify".
+
+    Args:
+        args: Command line, starting with the tool name
+
+    Returns:
+        Tool name, followed by its first argument if that is an option
+    """
+    tool = Path(args[0]).name
+    if len(args) > 1 and args[1].startswith('-'):
+        return f"{tool} {args[1]}"
+    return tool
+
+class ToolUnavailableError(subprocess.SubprocessError):
+    """Raised instead of running a tool whose circuit breaker is open."""
+
+    def __init__(self, tool: str, failures: int):
+        super().__init__(f"{tool} unavailable: skipped after {failures} consecutive failures")
+        self.tool = tool
+
+class ToolHealth:
+    """Latency samples, breaker state and failure counts for one operation."""
+
+    def __init__(self):
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_running = False
+        # calls, attempts, retries, timeouts, crashes, spawn_errors, short_circuited, trips
+        self.stats = Counter()
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Latency at the given fraction of the recorded samples, or None without samples."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class ToolPolicy:
+    """Runs tools through a ToolRunner with adaptive timeouts, retries and a circuit breaker."""
+
+    def __init__(self, runner: ToolRunner, on_spawn: Optional[Callable[[str], None]] = None,
+                 min_timeout: float = MIN_TIMEOUT, timeout_factor: float = TIMEOUT_FACTOR,
+                 min_samples: int = MIN_SAMPLES, retries: int = RETRIES, backoff: float = RETRY_BACKOFF,
+                 failure_threshold: int = FAILURE_THRESHOLD, cooldown: float = COOLDOWN):
+        """
+        Args:
+            runner: Runner that starts the processes
+            on_spawn: Called with the tool name before every process is started
+            min_timeout: Lower bound for adaptive timeouts (seconds)
+            timeout_factor: Adaptive timeout as a multiple of the p95 latency
+            min_samples: Successful calls needed before timeouts adapt
+            retries: Extra attempts after a transient failure
+            backoff: Base retry delay (seconds), doubled per attempt and jittered
+            failure_threshold: Consecutive failed attempts that open the breaker
+            cooldown: Seconds the breaker stays open before a trial call
+        """
+        self.runner = runner
+        self.on_spawn = on_spawn
+        self.min_timeout = min_timeout
+        self.timeout_factor = timeout_factor
+        self.min_samples = min_samples
+        self.retries = retries
+        self.backoff = backoff
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.tools: Dict[str, ToolHealth] = {}
+        self._lock = threading.Lock()
+
+    def _health(self, tool: str) -> ToolHealth:
+        # Callers hold self._lock
+        if tool not in self.tools:
+            self.tools[tool] = ToolHealth()
+        return self.tools[tool]
+
+    def timeout_for(self, tool: str, ceiling: float = DEFAULT_TIMEOUT) -> float:
+        """
+        Timeout for the next call of an operation.
+
+        Args:
+            tool: Operation key (see operation_key)
+            ceiling: Timeout requested by the caller, the upper bound
+
+        Returns:
+            Seconds the next attempt may run
+        """
+        with self._lock:
+            health = self._health(tool)
+            if len(health.latencies) < max(1, self.min_samples):
+                return ceiling
+            p95 = health.percentile(0.95)
+        return min(ceiling, max(self.min_timeout, self.timeout_factor * p95))
+
+    def _admit(self, tool: str) -> bool:
+        """Count a call; raise if the breaker is open. Returns True for a half-open trial call."""
+        with self._lock:
+            health = self._health(tool)
+            health.stats['calls'] += 1
+            if health.opened_at is None:
+                return False
+            if health.trial_running or time.monotonic() - health.opened_at < self.cooldown:
+                health.stats['short_circuited'] += 1
+                raise ToolUnavailableError(tool, health.consecutive_failures)
+            health.trial_running = True
+            return True
+
+    def _check_open(self, tool: str) -> None:
+        """Raise if the breaker opened (e.g. through another thread's calls)."""
+        with self._lock:
+            health = self._health(tool)
+            if health.opened_at is not None:
+                health.stats['short_circuited'] += 1
+                raise ToolUnavailableError(tool, health.consecutive_failures)
+
+    def _record_success(self, tool: str, elapsed: float) -> None:
+        with self._lock:
+            health = self._health(tool)
+            health.latencies.append(elapsed)
+            health.consecutive_failures = 0
+            if health.opened_at is not None:
+                logger.info(f"{tool} is working again")
+            health.opened_at = None
+
+    def _record_failure(self, tool: str, kind: str, trial: bool) -> None:
+        with self._lock:
+            health = self._health(tool)
+            health.stats[kind] += 1
+            health.consecutive_failures += 1
+            if trial:
+                # The trial call failed: stay open for another cooldown
+                health.opened_at = time.monotonic()
+            elif health.opened_at is None and health.consecutive_failures >= self.failure_threshold:
+                health.opened_at = time.monotonic()
+                health.stats['trips'] += 1
+                logger.warning(f"{tool} failed {health.consecutive_failures} times in a row, "
+                               f"skipping it for {self.cooldown:.0f}s")
+
+    def _count(self, tool: str, key: str) -> None:
+        with self._lock:
+            self._health(tool).stats[key] += 1
+
+    def run(self, args: List[str], timeout: float = DEFAULT_TIMEOUT) -> subprocess.CompletedProcess:
+        """
+        Run a tool under the policy.
+
+        Args:
+            args: Command line, starting with the tool name
+            timeout: Longest timeout any attempt may get
+
+        Returns:
+            Completed process (a process killed by a signal is returned once
+            its retries are used up)
+
+        Raises:
+            ToolUnavailableError: If the operation's circuit breaker is open
+            subprocess.TimeoutExpired: If the last attempt timed out
+            subprocess.SubprocessError: If the call was cancelled
+            OSError: If the tool could not be started
+        """
+        tool = operation_key(args)
+        trial = self._admit(tool)
+        try:
+            return self._attempt(tool, args, timeout, trial)
+        finally:
+            if trial:
+                with self._lock:
+                    self._health(tool).trial_running = False
+
+    def _attempt(self, tool: str, args: List[str], timeout: float, trial: bool) -> subprocess.CompletedProcess:
+        attempt_timeout = self.timeout_for(tool, timeout)
+        attempts = 1 if trial else 1 + self.retries
+
+        for attempt in range(attempts):
+            if attempt:
+                delay = self.backoff * 2 ** (attempt - 1)
+                time.sleep(delay / 2 + random.uniform(0, delay / 2))
+                self._check_open(tool)
+                self._count(tool, 'retries')
+            last_attempt = attempt == attempts - 1
+
+            self._count(tool, 'attempts')
+            if self.on_spawn is not None:
+                self.on_spawn(Path(args[0]).name)
+            start = time.monotonic()
+            try:
+                result = self.runner.run(args, timeout=attempt_timeout)
+            except subprocess.TimeoutExpired:
+                self._record_failure(tool, 'timeouts', trial)
+                logger.debug(f"{tool} timed out after {attempt_timeout:.1f}s: {args[1:]}")
+                if last_attempt:
+                    raise
+                attempt_timeout = min(timeout, attempt_timeout * 2)
+                continue
+            except OSError as e:
+                if e.errno not in TRANSIENT_ERRNOS:
+                    # Not installed or not executable: retrying cannot help
+                    self._count(tool, 'spawn_errors')
+                    raise
+                self._record_failure(tool, 'spawn_errors', trial)
+                if last_attempt:
+                    raise
+                continue
+
+            if result.returncode < 0:
+                self._record_failure(tool, 'crashes', trial)
+                logger.debug(f"{tool} was killed by signal {-result.returncode}: {args[1:]}")
+                if last_attempt:
+                    return result
+                continue
+
+            self._record_success(tool, time.monotonic() - start)
+            return result
+
+    def unavailable_tools(self) -> List[str]:
+        """Operations (see operation_key) whose circuit breaker is currently open."""
+        with self._lock:
+            return sorted(tool for tool, health in self.tools.items() if health.opened_at is not None)
+
+    def summary(self) -> Dict[str, Dict]:
+        """
+        Per-operation call and failure counts.
+
+        Returns:
+            JSON-serializable dictionary of operation key -> counts, p50/p95 latency,
+            current timeout and breaker state ("closed" or "open")
+        """
+        with self._lock:
+            tools = sorted(self.tools)
+        summary = {}
+        for tool in tools:
+            timeout = self.timeout_for(tool, float('inf'))
+            with self._lock:
+                health = self.tools[tool]
+                p50, p95 = health.percentile(0.5), health.percentile(0.95)
+                summary[tool] = {
+                    **{key: health.stats[key] for key in ('calls', 'attempts', 'retries', 'timeouts', 'crashes',
+                                                           'spawn_errors', 'short_circuited', 'trips')},
+                    'p50': round(p50, 6) if p50 is not None else None,
+                    'p95': round(p95, 6) if p95 is not None else None,
+                    'adaptive_timeout': round(timeout, 3) if timeout != float('inf') else None,
+                    'state': 'open' if health.opened_at is not None else 'closed',
+                }
+        return summary
+
+    def format_summary(self) -> List[str]:
+        """One line per operation that had failures (empty if none did)."""
+        lines = []
+        for tool, stats in self.summary().items():
+            failures = stats['timeouts'] + stats['crashes'] + stats['spawn_errors']
+            if not failures and not stats['short_circuited']:
+                continue
+            line = (f"{tool}: {stats['calls']} calls, {stats['timeouts']} timed out, {stats['crashes']} crashed, "
+                    f"{stats['spawn_errors']} failed to start, {stats['retries']} retried, "
+                    f"{stats['short_circuited']} skipped (marked unavailable)")
+            if stats['adaptive_timeout'] is not None:
+                line += f", timeout {stats['adaptive_timeout']:.1f}s (p95 {stats['p95']:.2f}s)"
+            if stats['state'] == 'open':
+                line += " [circuit open]"
+            lines.append(line)
+        return lines
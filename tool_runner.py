@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Asyncio-based runner for the external tools used by the collector.
+
+Tool processes are started with asyncio.create_subprocess_exec on a single
+background event loop. Each tool (codesign, plutil, sips, find, ...) has its
+own semaphore, so the number of concurrent processes per tool is bounded no
+matter how many worker threads submit calls. Every call has its own timeout;
+a process that times out or whose call is cancelled is killed and reaped.
+
+Worker threads use the blocking ToolRunner.run(); coroutines running on the
+runner's loop can await ToolRunner.run_async() directly.
+"""
+
+import asyncio
+import logging
+import subprocess
+import threading
+from concurrent.futures import CancelledError as FutureCancelledError
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Maximum concurrent processes per tool
+DEFAULT_TOOL_LIMITS = {
+    'codesign': 8,
+    'plutil': 8,
+    'sips': 4,
+    'find': 2,
+}
+DEFAULT_LIMIT = 4
+DEFAULT_TIMEOUT = 30
+
+class ToolRunner:
+    """Runs external tools on a background asyncio loop with per-tool limits."""
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None, default_limit: int = DEFAULT_LIMIT):
+        self.limits = dict(DEFAULT_TOOL_LIMITS)
+        self.limits.update(limits or {})
+        self.default_limit = default_limit
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._tasks = set()
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=loop.run_forever, name="tool-runner", daemon=True)
+                self._thread.start()
+                self._loop = loop
+            return self._loop
+
+    def _semaphore(self, tool: str) -> asyncio.Semaphore:
+        # Only touched from the loop thread, so no locking is needed
+        if tool not in self._semaphores:
+            self._semaphores[tool] = asyncio.Semaphore(self.limits.get(tool, self.default_limit))
+        return self._semaphores[tool]
+
+    async def run_async(self, args: List[str], timeout: float = DEFAULT_TIMEOUT) -> subprocess.CompletedProcess:
+        """
+        Run a tool and capture its output. Must be awaited on the runner's loop.
+
+        Args:
+            args: Command line, starting with the tool name or path
+            timeout: Seconds the process may run (time spent waiting for a
+                     semaphore slot does not count)
+
+        Returns:
+            Completed process with stdout/stderr decoded as UTF-8
+
+        Raises:
+            subprocess.TimeoutExpired: If the process ran longer than timeout
+            OSError: If the tool could not be started
+        """
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        try:
+            async with self._semaphore(Path(args[0]).name):
+                process = await asyncio.create_subprocess_exec(
+                    *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+                )
+                try:
+                    stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+                except asyncio.TimeoutError:
+                    await self._kill(process)
+                    raise subprocess.TimeoutExpired(args, timeout)
+                except asyncio.CancelledError:
+                    await self._kill(process)
+                    raise
+        finally:
+            self._tasks.discard(task)
+
+        return subprocess.CompletedProcess(
+            args, process.returncode,
+            stdout.decode('utf-8', errors='replace'),
+            stderr.decode('utf-8', errors='replace'),
+        )
+
+    @staticmethod
+    async def _kill(process: asyncio.subprocess.Process) -> None:
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+        await process.wait()
+
+    def run(self, args: List[str], timeout: float = DEFAULT_TIMEOUT) -> subprocess.CompletedProcess:
+        """
+        Blocking wrapper around run_async() for worker threads.
+
+        Raises:
+            subprocess.TimeoutExpired: If the process ran longer than timeout
+            subprocess.SubprocessError: If the call was cancelled via cancel_all()
+            OSError: If the tool could not be started
+        """
+        future = asyncio.run_coroutine_threadsafe(self.run_async(args, timeout), self._ensure_loop())
+        try:
+            return future.result()
+        except FutureCancelledError:
+            raise subprocess.SubprocessError(f"{args[0]} was cancelled")
+        except BaseException:
+            # e.g. KeyboardInterrupt in the calling thread: don't leave the process running
+            future.cancel()
+            raise
+
+    async def _cancel_tasks(self) -> None:
+        tasks = [task for task in self._tasks if not task.done()]
+        for task in tasks:
+            task.cancel()
+        # Let the cancelled calls kill and reap their processes
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def cancel_all(self) -> None:
+        """Cancel every in-flight tool call, killing its process."""
+        with self._lock:
+            loop = self._loop
+        if loop is not None:
+            asyncio.run_coroutine_threadsafe(self._cancel_tasks(), loop).result()
+
+    def close(self) -> None:
+        """Cancel outstanding calls and stop the background loop."""
+        self.cancel_all()
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        loop.close()
+        self._semaphores.clear()
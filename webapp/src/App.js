@@ -1,6 +1,7 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Search, Package, X } from 'lucide-react';
 import Fuse from 'fuse.js';
+import { searchApps } from './searchIndex';
 
 function App() {
   const [apps, setApps] = useState([]);
@@ -10,66 +11,110 @@ function App() {
   const [error, setError] = useState(null);
   const [selectedApp, setSelectedApp] = useState(null);
   const [activeTab, setActiveTab] = useState('info');
-  const [fuse, setFuse] = useState(null);
+  const [searchIndex, setSearchIndex] = useState(null);
+  const fuseRef = useRef(null);
 
   useEffect(() => {
     loadAppsData();
   }, []);
 
+  // Fuse is only built on demand: for data without a prebuilt search index,
+  // and as a typo-tolerant fallback when the index has no matches
   useEffect(() => {
-    if (apps.length > 0) {
-      const fuseInstance = new Fuse(apps, {
+    fuseRef.current = null;
+  }, [apps]);
+
+  const fuzzySearch = (term) => {
+    if (!fuseRef.current) {
+      fuseRef.current = new Fuse(apps, {
         keys: ['name', 'path', 'codesign.identifier'],
         threshold: 0.3,
         includeScore: true
       });
-      setFuse(fuseInstance);
     }
-  }, [apps]);
+    return fuseRef.current.search(term).map(result => result.item);
+  };
 
   useEffect(() => {
     if (searchTerm === '') {
       setFilteredApps(apps);
-    } else if (fuse) {
-      const results = fuse.search(searchTerm);
-      setFilteredApps(results.map(result => result.item));
+    } else if (searchIndex) {
+      const appsById = new Map(apps.map(app => [app.id, app]));
+      const results = searchApps(searchIndex, searchTerm)
+        .map(appId => appsById.get(appId))
+        .filter(app => app !== undefined);
+      setFilteredApps(results.length > 0 ? results : fuzzySearch(searchTerm));
+    } else if (apps.length > 0) {
+      setFilteredApps(fuzzySearch(searchTerm));
     }
-  }, [searchTerm, apps, fuse]);
+    // fuzzySearch only depends on apps
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [searchTerm, apps, searchIndex]);
+
+  const loadSearchIndex = async (indexName) => {
+    try {
+      const response = await fetch(`./data/${indexName}`);
+      return response.ok ? await response.json() : null;
+    } catch (err) {
+      console.warn('Failed to load search index, falling back to Fuse:', err);
+      return null;
+    }
+  };
+
+  const loadAppsBundle = async (bundleName) => {
+    const response = await fetch(`./data/${bundleName}`);
+    if (!response.ok) {
+      throw new Error('Failed to load app data bundle');
+    }
+    const bundle = await response.json();
+    return bundle.apps;
+  };
+
+  const loadManifests = async (appNames) => {
+    const appPromises = appNames.map(async (appName) => {
+      try {
+        const manifestResponse = await fetch(`./data/${appName}/manifest.json`);
+        if (manifestResponse.ok) {
+          const manifest = await manifestResponse.json();
+          return {
+            ...manifest,
+            id: appName
+          };
+        }
+        return null;
+      } catch (err) {
+        console.warn(`Failed to load manifest for ${appName}:`, err);
+        return null;
+      }
+    });
+    
+    const loadedApps = await Promise.all(appPromises);
+    return loadedApps.filter(app => app !== null);
+  };
 
   const loadAppsData = async () => {
     try {
       setLoading(true);
       
-      // First, try to load the data index
-      const response = await fetch('./data/index.json');
+      // Revalidate the index so a new content-hashed bundle is picked up
+      const response = await fetch('./data/index.json', { cache: 'no-cache' });
       if (!response.ok) {
         throw new Error('Failed to load app data index');
       }
       
       const appIndex = await response.json();
       
-      // Load manifest data for each app
-      const appPromises = appIndex.apps.map(async (appName) => {
-        try {
-          const manifestResponse = await fetch(`./data/${appName}/manifest.json`);
-          if (manifestResponse.ok) {
-            const manifest = await manifestResponse.json();
-            return {
-              ...manifest,
-              id: appName
-            };
-          }
-          return null;
-        } catch (err) {
-          console.warn(`Failed to load manifest for ${appName}:`, err);
-          return null;
-        }
-      });
-      
-      const loadedApps = await Promise.all(appPromises);
-      const validApps = loadedApps.filter(app => app !== null);
+      // All manifests are bundled into one pre-sorted file; fall back to
+      // fetching them one by one for data generated before the bundle existed
+      const [validApps, loadedSearchIndex] = await Promise.all([
+        appIndex.apps_bundle
+          ? loadAppsBundle(appIndex.apps_bundle)
+          : loadManifests(appIndex.apps),
+        appIndex.search_index ? loadSearchIndex(appIndex.search_index) : null
+      ]);
       
       setApps(validApps);
+      setSearchIndex(loadedSearchIndex);
       setFilteredApps(validApps);
       setError(null);
     } catch (err) {
@@ -80,49 +125,88 @@ function App() {
     }
   };
 
-  const loadAppDetails = async (app) => {
-    try {
-      const [entitlementsResponse, infoPlistResponse, sandboxResponse, sdefIndexResponse] = await Promise.all([
-        fetch(`./data/${app.id}/entitlements.plist`),
-        fetch(`./data/${app.id}/info.plist`),
-        fetch(`./data/${app.id}/sandbox.txt`),
-        fetch(`./data/${app.id}/sdef_index.json`)
-      ]);
+  // Detail requests by app id, shared between hover prefetches and clicks
+  const detailRequests = useRef(new Map());
 
-      const entitlements = entitlementsResponse.ok ? await entitlementsResponse.text() : 'Not available';
-      const infoPlist = infoPlistResponse.ok ? await infoPlistResponse.text() : 'Not available';
-      const sandbox = sandboxResponse.ok ? await sandboxResponse.text() : 'Not available';
+  const fetchAppDetail = (app) => {
+    const requests = detailRequests.current;
+    if (!requests.has(app.id)) {
+      const request = fetch(`./data/${app.id}/detail.json`)
+        .then(response => (response.ok ? response.json() : null))
+        .catch(() => null)
+        .then(detail => {
+          if (!detail) {
+            requests.delete(app.id);
+          }
+          return detail;
+        });
+      requests.set(app.id, request);
+    }
+    return requests.get(app.id);
+  };
+
+  // Data generated before detail.json existed: fetch each file separately
+  const loadLegacyDetails = async (app) => {
+    const [entitlementsResponse, infoPlistResponse, sandboxResponse, sdefIndexResponse] = await Promise.all([
+      fetch(`./data/${app.id}/entitlements.plist`),
+      fetch(`./data/${app.id}/info.plist`),
+      fetch(`./data/${app.id}/sandbox.txt`),
+      fetch(`./data/${app.id}/sdef_index.json`)
+    ]);
+
+    const entitlements = entitlementsResponse.ok ? await entitlementsResponse.text() : 'Not available';
+    const infoPlist = infoPlistResponse.ok ? await infoPlistResponse.text() : 'Not available';
+    const sandbox = sandboxResponse.ok ? await sandboxResponse.text() : 'Not available';
+    
+    // Load SDEF files based on index
+    let sdefFiles = [];
+    if (sdefIndexResponse.ok) {
+      const sdefIndex = await sdefIndexResponse.json();
       
-      // Load SDEF files based on index
-      let sdefFiles = [];
-      if (sdefIndexResponse.ok) {
-        const sdefIndex = await sdefIndexResponse.json();
-        
-        // Load each SDEF file listed in the index
-        const sdefPromises = sdefIndex.files.map(async (fileName) => {
-          try {
-            const sdefResponse = await fetch(`./data/${app.id}/sdef/${fileName}`);
-            if (sdefResponse.ok) {
-              const sdefContent = await sdefResponse.text();
-              return { name: fileName, content: sdefContent };
-            }
-            return null;
-          } catch (err) {
-            console.warn(`Failed to load SDEF file ${fileName}:`, err);
-            return null;
+      // Load each SDEF file listed in the index, from the shared blob
+      // store when the index names one, else from the app's sdef/ folder
+      const sdefBlobs = sdefIndex.blobs || {};
+      const sdefPromises = sdefIndex.files.map(async (fileName) => {
+        try {
+          const sdefUrl = sdefBlobs[fileName]
+            ? `./data/_blobs/${sdefBlobs[fileName]}`
+            : `./data/${app.id}/sdef/${fileName}`;
+          const sdefResponse = await fetch(sdefUrl);
+          if (sdefResponse.ok) {
+            const sdefContent = await sdefResponse.text();
+            return { name: fileName, content: sdefContent };
           }
+          return null;
+        } catch (err) {
+          console.warn(`Failed to load SDEF file ${fileName}:`, err);
+          return null;
+        }
+      });
+      
+      const loadedSdefFiles = await Promise.all(sdefPromises);
+      sdefFiles = loadedSdefFiles.filter(file => file !== null);
+    }
+
+    return { entitlements, infoPlist, sandbox, sdefFiles };
+  };
+
+  const loadAppDetails = async (app) => {
+    try {
+      const detail = await fetchAppDetail(app);
+      if (detail) {
+        setSelectedApp({
+          ...app,
+          entitlements: detail.entitlements ?? 'Not available',
+          infoPlist: detail.info_plist ?? 'Not available',
+          sandbox: detail.sandbox ?? 'Not available',
+          sdefFiles: detail.sdef_files
         });
-        
-        const loadedSdefFiles = await Promise.all(sdefPromises);
-        sdefFiles = loadedSdefFiles.filter(file => file !== null);
+        return;
       }
 
       setSelectedApp({
         ...app,
-        entitlements,
-        infoPlist,
-        sandbox,
-        sdefFiles
+        ...(await loadLegacyDetails(app))
       });
     } catch (err) {
       console.error('Error loading app details:', err);
@@ -136,6 +220,36 @@ function App() {
     }
   };
 
+  // Large SDEFs are not inlined in detail.json; fetch them when the tab is shown
+  useEffect(() => {
+    if (activeTab !== 'sdef' || !selectedApp) {
+      return;
+    }
+    const pending = selectedApp.sdefFiles.filter(sdefFile => sdefFile.content === undefined);
+    if (pending.length === 0) {
+      return;
+    }
+
+    const appId = selectedApp.id;
+    Promise.all(pending.map(async (sdefFile) => {
+      try {
+        const sdefResponse = await fetch(`./data/${sdefFile.url}`);
+        return [sdefFile.name, sdefResponse.ok ? await sdefResponse.text() : 'Failed to load SDEF file'];
+      } catch (err) {
+        console.warn(`Failed to load SDEF file ${sdefFile.name}:`, err);
+        return [sdefFile.name, 'Failed to load SDEF file'];
+      }
+    })).then(loaded => {
+      const contents = new Map(loaded);
+      setSelectedApp(current => (current && current.id === appId ? {
+        ...current,
+        sdefFiles: current.sdefFiles.map(sdefFile => (
+          contents.has(sdefFile.name) ? { ...sdefFile, content: contents.get(sdefFile.name) } : sdefFile
+        ))
+      } : current));
+    });
+  }, [activeTab, selectedApp]);
+
   const openAppModal = (app) => {
     loadAppDetails(app);
   };
@@ -149,7 +263,12 @@ function App() {
     const iconPath = app.has_icon ? `./data/${app.id}/${app.icon_path}` : null;
     
     return (
-      <div key={app.id} className="app-card" onClick={() => openAppModal(app)}>
+      <div
+        key={app.id}
+        className="app-card"
+        onClick={() => openAppModal(app)}
+        onMouseEnter={() => fetchAppDetail(app)}
+      >
         <div className="app-header">
           <div className="app-icon">
             {iconPath ? (
@@ -259,7 +378,7 @@ function App() {
                   {selectedApp.sdefFiles?.map((sdefFile, index) => (
                     <div key={index}>
                       <h4>{sdefFile.name}</h4>
-                      <div className="code-block">{sdefFile.content}</div>
+                      <div className="code-block">{sdefFile.content ?? 'Loading SDEF file...'}</div>
                     </div>
                   ))}
                 </div>
@@ -322,7 +441,7 @@ function App() {
           <input
             type="text"
             className="search-input"
-            placeholder="Search applications by name, bundle ID, or path..."
+            placeholder="Search by name, bundle ID, path, team ID, entitlement or AppleScript command..."
             value={searchTerm}
             onChange={(e) => setSearchTerm(e.target.value)}
           />
@@ -0,0 +1,68 @@
+// Lookup over the prebuilt search index written by generate_webapp_data.py
+// (see search_index.py for the format and the reference implementation).
+
+const FIELD_BITS = 3;
+const FIELD_MASK = (1 << FIELD_BITS) - 1;
+
+const queryWords = (query) => query.toLowerCase().match(/[a-z0-9]+/g) || [];
+
+// Index of the first term >= word
+const lowerBound = (terms, word) => {
+  let low = 0;
+  let high = terms.length;
+  while (low < high) {
+    const middle = (low + high) >>> 1;
+    if (terms[middle] < word) {
+      low = middle + 1;
+    } else {
+      high = middle;
+    }
+  }
+  return low;
+};
+
+// Every query word must prefix-match a term; apps are ranked by the weight
+// of the best field each word matched (exact terms count double).
+export const searchApps = (index, query) => {
+  const words = queryWords(query);
+  if (words.length === 0) {
+    return [];
+  }
+
+  const { terms, postings, fields, apps } = index;
+  let scores = null;
+  for (const word of words) {
+    const wordScores = new Map();
+    for (let position = lowerBound(terms, word);
+      position < terms.length && terms[position].startsWith(word);
+      position++) {
+      const exact = terms[position] === word ? 2 : 1;
+      for (const posting of postings[position]) {
+        const appIndex = posting >> FIELD_BITS;
+        const score = (fields.length - (posting & FIELD_MASK)) * exact;
+        if (score > (wordScores.get(appIndex) || 0)) {
+          wordScores.set(appIndex, score);
+        }
+      }
+    }
+
+    if (scores === null) {
+      scores = wordScores;
+    } else {
+      const combined = new Map();
+      for (const [appIndex, score] of wordScores) {
+        if (scores.has(appIndex)) {
+          combined.set(appIndex, scores.get(appIndex) + score);
+        }
+      }
+      scores = combined;
+    }
+    if (scores.size === 0) {
+      return [];
+    }
+  }
+
+  return [...scores.keys()]
+    .sort((a, b) => scores.get(b) - scores.get(a) || a - b)
+    .map(appIndex => apps[appIndex]);
+};